@@ -1,16 +1,187 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, simpledialog, filedialog
+import tkinter.font as tkfont
 import os
+import queue
+import threading
+from itertools import islice
+
+from student_core import (COURSEWORK_MAX, EXAM_MAX, GRADES, SAMPLE_STUDENTS,
+                          TOTAL_POSSIBLE, MarksRepository, apply_edit, class_statistics,
+                          compute_student_stats, grade_for_percentage, grade_index,
+                          record_text_error, validate_student)
+from student_records import (LoadReport, RecordArchive, StudentTable,
+                             grade_range, import_records, parse_marks_record,
+                             top_k_indices)
+from student_stats import histogram_lines
 
 # Configuration constants: centralize common values so they're easy to change
+# (mark limits and grades are part of the record model, in student_core)
+STORAGE_BACKEND = "text"  # "text" (DATA_FILE + journal) or "sqlite" (DATABASE_FILE)
 DATA_FILE = "studentMarks.txt"  # file used to persist student records
-COURSEWORK_MAX = 60  # total possible coursework marks (3 items x 20 each) 
-EXAM_MAX = 100      # max exam mark
-TOTAL_POSSIBLE = COURSEWORK_MAX + EXAM_MAX  # combined total for percentage calcs
+DATABASE_FILE = "studentMarks.db"  # SQLite database used by the "sqlite" backend
+JOURNAL_COMPACT_THRESHOLD = 500  # journal entries before a background compaction starts
+USE_SNAPSHOT = True  # keep a binary snapshot of DATA_FILE for fast start-up
+FSYNC_POLICY = "always"  # "always", "batched" or "off": how often saves are fsynced
+AUTOSAVE_DELAY_MS = 500   # quiet time after the last edit before edits are written
+AUTOSAVE_MAX_EDITS = 50   # pending edits that are written straight away
+WATCH_FILE = True         # start with File > Watch File for Changes ticked
+WATCH_INTERVAL_MS = 2000  # how often the file's size/mtime are polled
+PICKER_RESULTS = 50  # matches listed by the student picker as you type
 # UI colors
 MAIN_BG = "#0ff3e0"   # soft light blue
 BUTTON_BG = "#1de5ff" # soft light green
 
+class VirtualTable(tk.Frame):
+    """Scrollable read-only text table that only renders the lines in view.
+
+    The table is given a line count and a `line_source(i)` function that
+    formats line i on demand. Only the lines that fit in the window are
+    inserted into the Text widget (in one call), and the scrollbar is driven
+    manually, so first paint and scrolling cost the same whatever the
+    roster size.
+    """
+
+    def __init__(self, parent, font=("Courier", 10), width=90, height=28):
+        super().__init__(parent, bg="white")
+        self.font = tkfont.Font(font=font)
+        self.text = tk.Text(self, font=self.font, bg="white", wrap=tk.NONE,
+                            width=width, height=height, state=tk.DISABLED)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        self.text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.line_count = 0
+        self.line_source = None
+        self.first = 0          # index of the top line currently shown
+        self.visible = height   # number of lines that fit in the widget
+
+        # Recompute the page size on resize; wire up wheel and keyboard scrolling
+        self.text.bind("<Configure>", self.on_resize)
+        self.text.bind("<MouseWheel>", self.on_mousewheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll_to(self.first - 3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_to(self.first + 3))
+        self.text.bind("<Button-1>", lambda event: self.text.focus_set())
+        self.text.bind("<Up>", lambda event: self.scroll_to(self.first - 1))
+        self.text.bind("<Down>", lambda event: self.scroll_to(self.first + 1))
+        self.text.bind("<Prior>", lambda event: self.scroll_to(self.first - self.visible))
+        self.text.bind("<Next>", lambda event: self.scroll_to(self.first + self.visible))
+        self.text.bind("<Home>", lambda event: self.scroll_to(0))
+        self.text.bind("<End>", lambda event: self.scroll_to(self.line_count))
+
+    def show(self, line_count, line_source, keep_position=False):
+        """Display `line_count` lines produced by `line_source`, from the top.
+
+        With `keep_position` the current top line stays in place instead,
+        e.g. when a few rows of the same listing changed.
+        """
+        self.line_count = line_count
+        self.line_source = line_source
+        if keep_position:
+            self.scroll_to(self.first, force=True)
+        else:
+            self.first = 0
+            self.render()
+
+    def on_scroll(self, action, amount, unit=None):
+        """Scrollbar callback: 'moveto' a fraction or 'scroll' units/pages."""
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * self.line_count))
+        elif action == 'scroll':
+            step = self.visible if unit == 'pages' else 1
+            self.scroll_to(self.first + int(amount) * step)
+
+    def on_mousewheel(self, event):
+        """Scroll three lines per wheel notch (Windows and macOS)."""
+        return self.scroll_to(self.first + (-3 if event.delta > 0 else 3))
+
+    def on_resize(self, event):
+        """Adjust the page size to the widget height and redraw."""
+        # Leave room for the widget's border and padding
+        self.visible = max(1, (event.height - 8) // self.font.metrics('linespace'))
+        self.scroll_to(self.first, force=True)
+
+    def scroll_to(self, first, force=False):
+        """Make line `first` the top line (clamped to the valid range)."""
+        first = max(0, min(first, self.line_count - self.visible))
+        if force or first != self.first:
+            self.first = first
+            self.render()
+        # Stop the default Text bindings from scrolling the widget itself
+        return "break"
+
+    def render(self):
+        """Format just the visible lines and insert them in one call."""
+        last = min(self.first + self.visible, self.line_count)
+        lines = [self.line_source(i) for i in range(self.first, last)] if self.line_source else []
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        self.text.configure(state=tk.DISABLED)
+        if self.line_count:
+            self.scrollbar.set(self.first / self.line_count, last / self.line_count)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+class BackgroundWorker:
+    """Runs jobs one at a time on a worker thread and reports back to Tk.
+
+    `submit(job, on_done, on_error)` queues `job()`; when it finishes,
+    `on_done(result)` or `on_error(exception)` is called on the Tk thread
+    (results are handed over through a queue polled with `root.after`,
+    since Tk must not be called from other threads). Jobs run in the order
+    they were submitted. `on_idle` is called whenever the queue drains,
+    unless only `quiet` jobs (e.g. background polling) ran since.
+    """
+
+    def __init__(self, root, on_idle=None, poll_ms=50):
+        self.root = root
+        self.on_idle = on_idle
+        self.poll_ms = poll_ms
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        threading.Thread(target=self.run, daemon=True).start()
+        self.root.after(self.poll_ms, self.poll)
+
+    def submit(self, job, on_done=None, on_error=None, quiet=False):
+        """Queue `job` to run on the worker thread."""
+        self.pending += 1
+        self.jobs.put((job, on_done, on_error, quiet))
+
+    def run(self):
+        """Worker thread loop: run each job and post its outcome back."""
+        while True:
+            job, on_done, on_error, quiet = self.jobs.get()
+            try:
+                self.results.put((on_done, job(), quiet))
+            except Exception as e:
+                self.results.put((on_error, e, quiet))
+            finally:
+                self.jobs.task_done()
+
+    def poll(self):
+        """Deliver finished jobs' callbacks on the Tk thread."""
+        finished = False
+        while True:
+            try:
+                callback, value, quiet = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            finished = finished or not quiet
+            if callback:
+                callback(value)
+        if finished and self.pending == 0 and self.on_idle:
+            self.on_idle()
+        self.root.after(self.poll_ms, self.poll)
+
+    def wait_until_idle(self):
+        """Block until every queued job has run (used on exit)."""
+        self.jobs.join()
+
 class StudentMarksApp:
     def __init__(self, root):
         # Keep a reference to the main Tk root window
@@ -19,128 +190,236 @@ class StudentMarksApp:
         self.root.title("Student Records")
         self.root.geometry("900x700")
 
-        # In-memory list of student dicts. Each entry has keys:
-        # 'code' (int), 'name' (str), 'course_marks' (list of 3 ints), 'exam_mark' (int)
-        self.students = []
-        # Load existing data from disk (or create sample data if missing)
-        self.load_data()
+        # In-memory roster, stored column-wise. It behaves like a list of
+        # student dicts with keys: 'code' (int), 'name' (str),
+        # 'course_marks' (list of 3 ints), 'exam_mark' (int)
+        self.students = StudentTable()
+        # Counts from the most recent load (records read, malformed lines)
+        self.load_report = LoadReport()
+        # All file I/O runs on one background worker, so jobs never overlap
+        # and the window stays responsive. The state below is only touched
+        # on the Tk thread.
+        self.worker = BackgroundWorker(self.root, on_idle=self.show_ready)
+        self.journal_entries = 0     # journal lines written since the last full save
+        self.loading = False         # a load or import is in progress; edits must wait
+        self.save_in_flight = False  # a full save is queued or running
+        self.save_requested = False  # another full save was asked for meanwhile
+        self.pending_edits = []      # edits not yet handed to the worker (see append_journal)
+        self.flush_timer = None      # pending autosave timer, if any
+        # Memory-mapped archive opened from the Archive menu, if any
+        self.archive = None
+        # The roster on disk: DATA_FILE plus its journal, or the SQLite
+        # database (see student_core.MarksRepository, which also locks and
+        # merges when other sessions use DATA_FILE). Like the files, it is
+        # only used from the worker thread; `store` is its database, or None.
+        self.repository = MarksRepository(
+            DATA_FILE, DATABASE_FILE if STORAGE_BACKEND == "sqlite" else None,
+            fsync_policy=FSYNC_POLICY, use_snapshot=USE_SNAPSHOT)
+        self.store = self.repository.store
+        self.watch_in_flight = False  # a watch check is queued on the worker
+        self.table_refresh = None     # redraws the live view shown (roster, extremes, statistics)
 
-        # Build the UI: menu and main display area
+        # Build the UI first (menu and main display area) so the window
+        # appears straight away
         self.create_menu()
         self.create_main_display()
+        self.root.protocol("WM_DELETE_WINDOW", self.exit_app)
+
+        # Load existing data from disk (or create sample data if missing)
+        self.load_data(on_loaded=self.view_all_students)
+        # Poll DATA_FILE for changes made by other sessions
+        self.root.after(WATCH_INTERVAL_MS, self.poll_data_file)
         
-    def load_data(self):
-        """Load student data from the file"""
-        try:
-            # If the data file does not exist, populate with sample data and exit
-            if not os.path.exists(DATA_FILE):
+    def load_data(self, on_loaded=None):
+        """Load student data from the file on the worker thread
+
+        The window stays responsive while the file is parsed and the status
+        bar shows progress. `on_loaded` runs on the Tk thread once the new
+        roster is in place.
+        """
+        if self.loading:
+            return
+        # Write pending edits first so the reload includes them
+        self.flush_edits()
+        self.loading = True
+        report = LoadReport()
+        self.set_status("Loading student data...", busy=True)
+        self.show_load_progress(report)
+
+        def loaded(result):
+            self.loading = False
+            if result is None:
+                # The data file does not exist: populate with sample data
                 self.create_sample_data()
-                return
+            else:
+                self.students, self.journal_entries = result
+                self.load_report = report
+            self.update_summary()
+            if on_loaded:
+                on_loaded()
 
-            # Read all lines from the file. The expected format is:
-            # Line 1: number of student records (N)
-            # Next N lines: code,name,mark1,mark2,mark3,exam
-            with open(DATA_FILE, 'r') as file:
-                lines = file.readlines()
-
-            # Reset the in-memory list before loading
-            self.students = []
-
-            # If file contains content, parse it cautiously to avoid crashes
-            if lines:
-                # First line should be an integer count
-                num_students = int(lines[0].strip())
-
-                # Iterate over up to num_students lines (but don't exceed file length)
-                for i in range(1, min(num_students + 1, len(lines))):
-                    line = lines[i].strip()
-                    if not line:
-                        # Skip empty lines gracefully
-                        continue
-                    parts = line.split(',')
-                    if len(parts) < 6:
-                        # Skip malformed lines that don't have expected fields
-                        continue
-
-                    # Parse fields; convert numeric strings to ints
-                    student_code = int(parts[0])
-                    student_name = parts[1]
-                    course_marks = [int(parts[2]), int(parts[3]), int(parts[4])]
-                    exam_mark = int(parts[5])
-
-                    # Build a student dict and append to the list
-                    student = {
-                        'code': student_code,
-                        'name': student_name,
-                        'course_marks': course_marks,
-                        'exam_mark': exam_mark
-                    }
-                    self.students.append(student)
-                        
-        except Exception as e:
+        def failed(error):
             # On any error while loading, inform the user and fall back to sample data
-            messagebox.showerror("Error", f"Failed to load data: {str(e)}")
+            self.loading = False
+            messagebox.showerror("Error", f"Failed to load data: {str(error)}")
             self.create_sample_data()
+            self.update_summary()
+            if on_loaded:
+                on_loaded()
+
+        self.worker.submit(lambda: self.repository.load(report), loaded, failed)
+
+    def show_load_progress(self, report):
+        """Update the status bar from `report` until the load finishes"""
+        if not self.loading:
+            return
+        if report.expected:
+            # The header gives the record count, so show real progress
+            self.progress.stop()
+            self.progress.configure(mode='determinate', maximum=report.expected,
+                                    value=report.loaded)
+        self.status_var.set(f"Loading student data... {report.loaded} records")
+        self.root.after(100, lambda: self.show_load_progress(report))
     
     def save_data(self):
-        """Save student data to the file"""
-        try:
-            # Write the count line followed by one student per line in CSV format
-            with open(DATA_FILE, 'w') as file:
-                file.write(f"{len(self.students)}\n")
-                for student in self.students:
-                    # Maintain the same CSV format the original code expected
-                    file.write(
-                        f"{student['code']},{student['name']},{student['course_marks'][0]},{student['course_marks'][1]},{student['course_marks'][2]},{student['exam_mark']}\n"
-                    )
-            return True
-        except Exception as e:
-            # If saving fails, surface an error to the user and return False
-            messagebox.showerror("Error", f"Failed to save data: {str(e)}")
-            return False
+        """Save the whole roster to the file on the worker thread
+
+        The table is copied first, so edits made while the save is running
+        are not mixed in. Save requests made while one is already in flight
+        are coalesced into a single follow-up save of the latest data.
+        """
+        # Pending edits are part of the snapshot; write them first to keep their callbacks
+        self.flush_edits()
+        if self.save_in_flight:
+            self.save_requested = True
+            return
+        self.save_in_flight = True
+        snapshot = self.students.copy()
+        # The rewrite supersedes every journal entry queued before it
+        self.journal_entries = 0
+        self.set_status("Saving...", busy=True)
+
+        def saved(merge_report=None):
+            self.save_in_flight = False
+            if self.save_requested:
+                self.save_requested = False
+                self.save_data()
+            self.show_merge_report(merge_report)
+
+        def failed(error):
+            # If saving fails, surface an error to the user
+            saved()
+            messagebox.showerror("Error", f"Failed to save data: {str(error)}")
+
+        self.worker.submit(lambda: self.repository.save(snapshot), saved, failed)
+
+    def append_journal(self, op, student, on_done=None, on_error=None):
+        """Record a single edit in the journal instead of rewriting the file.
+
+        `op` is 'A' (add), 'U' (update) or 'D' (delete). Edits are held in
+        memory and written together (see flush_edits) once no further edit
+        has arrived for AUTOSAVE_DELAY_MS, or as soon as AUTOSAVE_MAX_EDITS
+        are waiting, so a run of quick corrections costs one write. After
+        that write `on_done()` or `on_error(error)` runs on the Tk thread.
+        Without `on_error`, failures are reported in a message box.
+        """
+        self.pending_edits.append((op, student, on_done, on_error))
+        if len(self.pending_edits) >= AUTOSAVE_MAX_EDITS:
+            self.flush_edits()
+            return
+
+        # Restart the quiet period on every edit
+        if self.flush_timer is not None:
+            self.root.after_cancel(self.flush_timer)
+        self.flush_timer = self.root.after(AUTOSAVE_DELAY_MS, self.flush_edits)
+        self.status_var.set(f"{len(self.pending_edits)} unsaved change(s)...")
+
+    def flush_edits(self):
+        """Queue every pending edit as one write on the worker thread.
+
+        Journal lines are appended together (one sync under FSYNC_POLICY);
+        with the SQLite backend the edits go in one transaction. Called by
+        the autosave timer, and before anything that reads the data back
+        (loads, full saves, database queries, exit).
+        """
+        if self.flush_timer is not None:
+            self.root.after_cancel(self.flush_timer)
+            self.flush_timer = None
+        if not self.pending_edits:
+            return
+        edits, self.pending_edits = self.pending_edits, []
+
+        changes = [(op, student) for op, student, _, _ in edits]
+
+        def done(_result=None):
+            for _, _, on_done, _ in edits:
+                if on_done:
+                    on_done()
+
+        def failed(error):
+            reported = False
+            for _, _, _, on_error in edits:
+                if on_error:
+                    on_error(error)
+                elif not reported:
+                    messagebox.showerror("Error", f"Failed to save data: {str(error)}")
+                    reported = True
+
+        self.set_status("Saving...", busy=True)
+        self.worker.submit(lambda: self.repository.write_edits(changes), done, failed)
+        if self.store is None:
+            self.journal_entries += len(edits)
+            if self.journal_entries >= JOURNAL_COMPACT_THRESHOLD:
+                self.start_compaction()
+
+    def start_compaction(self):
+        """Queue a job that folds the journal into DATA_FILE.
+
+        The snapshot is taken now, on the Tk thread. Every journal write
+        queued before the job holds an edit already in the snapshot, and
+        every later one goes to a fresh journal, because the worker runs
+        jobs in order.
+        """
+        self.journal_entries = 0
+        snapshot = self.students.copy()
+        self.worker.submit(lambda: self.repository.compact(snapshot), self.show_merge_report)
+
+    def show_merge_report(self, merge_report):
+        """Reload after changes from another session were merged (Tk thread)
+
+        The merged roster is on disk but not in this window yet, so it is
+        read back, then the merge outcome (and any conflicts) is shown.
+        """
+        if merge_report is None:
+            return
+
+        def reloaded():
+            self.view_all_students()
+            if merge_report.conflicts:
+                messagebox.showwarning("Merged With Other Session",
+                                       "\n".join(merge_report.summary_lines()))
+            else:
+                self.set_status("Merged changes from another session - "
+                                f"{len(self.students)} students")
+
+        self.load_data(on_loaded=reloaded)
     
     def create_sample_data(self):
         """Create sample data for testing"""
         # Provide a small set of sample students so the UI is usable on first run
-        sample_students = [
-            {"code": 8439, "name": "Jake Hobbs", "course_marks": [10, 11, 10], "exam_mark": 43},
-            {"code": 7562, "name": "Sarah Smith", "course_marks": [15, 14, 16], "exam_mark": 78},
-            {"code": 9123, "name": "Mike Johnson", "course_marks": [12, 13, 11], "exam_mark": 65},
-            {"code": 6347, "name": "Emma Wilson", "course_marks": [18, 17, 19], "exam_mark": 92},
-            {"code": 5289, "name": "Tom Brown", "course_marks": [8, 9, 7], "exam_mark": 35}
-        ]
-        self.students = sample_students
+        self.students = StudentTable(SAMPLE_STUDENTS)
         # Persist sample data so subsequent runs will load it
         self.save_data()
     
     def calculate_student_stats(self, student):
-        """Calculate statistics for a student"""
-        # Sum the three coursework marks and add the exam mark
-        total_coursework = sum(student['course_marks'])
-        total_marks = total_coursework + student['exam_mark']
-        # Compute percentage against the defined total possible marks
-        percentage = (total_marks / TOTAL_POSSIBLE) * 100
-
-        # Determine grade using standard cutoffs used by the original code
-        if percentage >= 70:
-            grade = 'A'
-        elif percentage >= 60:
-            grade = 'B'
-        elif percentage >= 50:
-            grade = 'C'
-        elif percentage >= 40:
-            grade = 'D'
-        else:
-            grade = 'F'
-
-        # Return a small stats dict used by multiple display routines
-        return {
-            'total_coursework': total_coursework,
-            'exam_mark': student['exam_mark'],
-            'percentage': percentage,
-            'grade': grade
-        }
-    
+        """Return statistics for a single student
+
+        Only single-record views use this; listings, sorts and class
+        statistics read whole columns from the table (see
+        StudentTable.percentages and the running aggregates).
+        """
+        return compute_student_stats(student)
+
     def create_menu(self):
         """Create the main menu"""
         menubar = tk.Menu(self.root)
@@ -150,8 +429,11 @@ class StudentMarksApp:
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Refresh Data", command=self.refresh_data)
+        self.watch_var = tk.BooleanVar(value=WATCH_FILE)
+        file_menu.add_checkbutton(label="Watch File for Changes", variable=self.watch_var)
+        file_menu.add_command(label="Import CSV/TSV...", command=self.import_students)
         file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=self.root.quit)
+        file_menu.add_command(label="Exit", command=self.exit_app)
 
         # View menu: show all / individual / highest / lowest
         view_menu = tk.Menu(menubar, tearoff=0)
@@ -161,6 +443,16 @@ class StudentMarksApp:
         view_menu.add_separator()
         view_menu.add_command(label="Highest Overall Mark", command=self.show_highest_mark)
         view_menu.add_command(label="Lowest Overall Mark", command=self.show_lowest_mark)
+        view_menu.add_command(label="Top K Students...", command=lambda: self.show_ranked_students(True))
+        view_menu.add_command(label="Bottom K Students...", command=lambda: self.show_ranked_students(False))
+        view_menu.add_command(label="Class Statistics", command=self.show_class_statistics)
+        grade_menu = tk.Menu(view_menu, tearoff=0)
+        view_menu.add_cascade(label="Students by Grade", menu=grade_menu)
+        for grade in GRADES:
+            grade_menu.add_command(label=f"Grade {grade}",
+                                   command=lambda grade=grade: self.show_grade_filter([grade]))
+        grade_menu.add_separator()
+        grade_menu.add_command(label="Grade Range...", command=self.ask_grade_filter)
 
         # Sort menu: multiple sorting options (delegates to sort_students)
         sort_menu = tk.Menu(menubar, tearoff=0)
@@ -178,6 +470,18 @@ class StudentMarksApp:
         manage_menu.add_command(label="Add Student Record", command=self.add_student_record)
         manage_menu.add_command(label="Delete Student Record", command=self.delete_student_record)
         manage_menu.add_command(label="Update Student Record", command=self.update_student_record)
+
+        # Archive menu: single-record access to a memory-mapped archive file
+        archive_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Archive", menu=archive_menu)
+        archive_menu.add_command(label="Export Roster to Archive...", command=self.export_archive)
+        archive_menu.add_command(label="Open Archive...", command=self.open_archive)
+        archive_menu.add_separator()
+        archive_menu.add_command(label="View Student by Code...", command=self.view_archive_student)
+        archive_menu.add_command(label="Update Student by Code...", command=self.update_archive_student)
+        archive_menu.add_command(label="Delete Student by Code...", command=self.delete_archive_student)
+        archive_menu.add_separator()
+        archive_menu.add_command(label="Close Archive", command=self.close_archive)
     
     def create_main_display(self):
         """Create the main display area"""
@@ -207,6 +511,26 @@ class StudentMarksApp:
                                                   font=("Courier", 10), bg="white")
         self.text_area.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
+        # The full roster is shown in a virtualized table occupying the same
+        # cell; only one of the two widgets is visible at a time
+        self.table_view = VirtualTable(main_frame)
+        self.table_view.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.table_view.grid_remove()
+
+        # Live class summary, kept current after every change (see update_summary)
+        self.summary_var = tk.StringVar(value="")
+        tk.Label(main_frame, textvariable=self.summary_var, bg=MAIN_BG, anchor=tk.W,
+                 font=("Arial", 10, "bold")).grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(6, 0))
+
+        # Status bar: current activity plus a progress bar while the worker is busy
+        status_frame = tk.Frame(main_frame, bg=MAIN_BG)
+        status_frame.grid(row=4, column=0, sticky=(tk.W, tk.E), pady=(6, 0))
+        self.status_var = tk.StringVar(value="Ready")
+        tk.Label(status_frame, textvariable=self.status_var, bg=MAIN_BG).pack(side=tk.LEFT)
+        self.progress = ttk.Progressbar(status_frame, length=200)
+        self.progress.pack(side=tk.RIGHT)
+        self.progress.pack_forget()
+
         # Configure grid weights so the text area expands with the window
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
@@ -214,14 +538,194 @@ class StudentMarksApp:
         main_frame.rowconfigure(2, weight=1)
     
     def refresh_data(self):
-        """Refresh data from file"""
-        # Reload data from disk and update the display
-        self.load_data()
-        self.clear_display()
-        self.display_text("Data refreshed from file.\n")
+        """Refresh data from file
+
+        Only records that changed on disk since this session last read or
+        wrote the file are applied (see MarksRepository.read_external_changes);
+        if nothing changed, nothing is re-read.
+        """
+        if self.store is not None:
+            def refreshed():
+                self.clear_display()
+                self.display_text("Data refreshed from the database.\n")
+                self.display_text(f"{self.load_report.summary()}\n")
+
+            self.load_data(on_loaded=refreshed)
+            return
+
+        def checked(changes):
+            self.clear_display()
+            if changes is None:
+                self.display_text("Data is up to date: the file has not changed.\n")
+                return
+            inserted, changed, removed = self.apply_external_changes(changes)
+            self.display_text("Data refreshed from file.\n")
+            self.display_text(f"{inserted} added, {changed} changed, {removed} removed\n")
+
+        self.flush_edits()
+        self.worker.submit(self.repository.read_external_changes, checked)
+
+    def poll_data_file(self):
+        """Check DATA_FILE for outside changes every WATCH_INTERVAL_MS (Tk thread)
+
+        The check itself runs on the worker and only compares file sizes,
+        mtimes and the generation stamp (the standard library has no
+        portable change notification). Changed records are then applied to
+        the roster in place.
+        """
+        self.root.after(WATCH_INTERVAL_MS, self.poll_data_file)
+        # WATCH_FILE only sets the menu checkbox's initial state
+        if (self.store is not None or self.loading
+                or self.watch_in_flight or not self.watch_var.get()):
+            return
+
+        def checked(changes):
+            self.watch_in_flight = False
+            if changes is not None and not self.loading:
+                inserted, changed, removed = self.apply_external_changes(changes)
+                if inserted or changed or removed:
+                    self.set_status(f"File changed: {inserted} added, {changed} changed, "
+                                    f"{removed} removed - {len(self.students)} students")
+
+        def failed(error):
+            # Try again on the next poll; the file may be mid-update
+            self.watch_in_flight = False
+
+        self.watch_in_flight = True
+        self.worker.submit(self.repository.read_external_changes, checked, failed, quiet=True)
+
+    def apply_external_changes(self, changes):
+        """Apply records changed on disk to the roster and redraw (Tk thread)
+
+        Students with edits still waiting for the autosave keep this
+        session's version. Returns the (inserted, changed, removed) counts.
+        """
+        inserted, changed, removed = changes
+        pending = {student['code'] for _, student, _, _ in self.pending_edits}
+        for student in inserted + changed:
+            if student['code'] not in pending:
+                apply_edit(self.students, 'U', student)
+        for code in removed:
+            if code not in pending:
+                apply_edit(self.students, 'D', {'code': code})
+        self.update_summary()
+        if self.table_refresh is not None and (inserted or changed or removed):
+            self.table_refresh()
+        return len(inserted), len(changed), len(removed)
+
+    def import_students(self):
+        """Bulk-import student records from a CSV/TSV file
+
+        The file is streamed and validated on the worker thread (mark limits
+        and unique codes, in one pass); accepted rows are then added in one
+        go and written with a single full save.
+        """
+        if not self.data_ready():
+            return
+        filename = filedialog.askopenfilename(
+            parent=self.root, title="Import Students",
+            filetypes=[("CSV/TSV files", "*.csv *.tsv *.txt"), ("All files", "*.*")])
+        if not filename:
+            return
+
+        # Edits are held off until the import lands, so this snapshot of the
+        # codes stays accurate for the duplicate check on the worker
+        self.loading = True
+        existing_codes = set(self.students.column('code'))
+        staging = StudentTable()
+        self.set_status(f"Importing {os.path.basename(filename)}...", busy=True)
+
+        def imported(report):
+            self.loading = False
+            self.students.extend(staging)
+            self.update_summary()
+            if report.accepted:
+                self.save_data()
+            self.clear_display()
+            self.display_lines([f"IMPORT FROM {filename}", "=" * 60, ""] + report.summary_lines())
+
+        def failed(error):
+            self.loading = False
+            messagebox.showerror("Error", f"Failed to import students: {str(error)}")
+
+        self.worker.submit(
+            lambda: import_records(filename, parse_marks_record, validate_student,
+                                   existing_codes, staging),
+            imported, failed)
+
+    def set_status(self, text, busy=False):
+        """Show `text` in the status bar, with a running progress bar if busy"""
+        self.status_var.set(text)
+        if busy:
+            self.progress.configure(mode='indeterminate')
+            self.progress.pack(side=tk.RIGHT)
+            self.progress.start(15)
+        else:
+            self.progress.stop()
+            self.progress.pack_forget()
+
+    def show_ready(self):
+        """Reset the status bar once the worker has nothing left to do"""
+        self.set_status(f"Ready - {len(self.students)} students")
+
+    def update_summary(self):
+        """Refresh the summary bar (count, average, spread, extremes, grades)
+
+        Call after any change to the roster; it reads running aggregates
+        and the ends of the percentage-sorted view, never the whole roster.
+        """
+        stats = class_statistics(self.students)
+        if not stats.count:
+            self.summary_var.set("No students")
+            return
+        order = self.students.sorted_view('percentage')
+        highest = self.students.find(next(order.codes(reverse=True)))
+        lowest = self.students.find(next(order.codes()))
+        grades = stats.grade_distribution(grades=GRADES)
+        self.summary_var.set(
+            f"{stats.count} students | Average {stats.mean:.1f}% (SD {stats.std:.1f}) | "
+            f"Highest {highest['name']} {stats.maximum:.1f}% | "
+            f"Lowest {lowest['name']} {stats.minimum:.1f}% | "
+            + " ".join(f"{grade}:{count}" for grade, count in grades.items()))
+
+    def data_ready(self):
+        """Return True if records can be edited (i.e. no load is in progress)"""
+        if self.loading:
+            messagebox.showinfo("Please wait", "Student data is still loading or importing.")
+            return False
+        return True
+
+    def exit_app(self):
+        """Wait for queued saves to reach the disk, then close the app"""
+        # Waiting for the worker blocks the Tk main loop, with no timeout, so
+        # the window does not redraw until the queued writes are done: say
+        # so before it freezes
+        self.status_var.set("Finishing queued saves before closing...")
+        self.root.update_idletasks()
+        # Write edits still waiting for the autosave
+        self.flush_edits()
+        self.worker.wait_until_idle()
+        if self.save_requested:
+            # A save asked for while another was running is started from
+            # that save's callback, which would only run from the main loop
+            self.save_requested = False
+            try:
+                self.repository.save(self.students.copy())
+            except OSError as e:
+                messagebox.showerror("Error", f"Failed to save data: {str(e)}")
+        # Settle writes a "batched" policy has not synced yet (the worker is idle)
+        self.repository.sync_pending_writes()
+        if self.archive is not None:
+            self.archive.close()
+        self.repository.close()
+        self.root.quit()
     
     def clear_display(self):
         """Clear the text display area"""
+        # Bring the text area back in front of the roster table
+        self.table_refresh = None
+        self.table_view.grid_remove()
+        self.text_area.grid()
         # Delete everything in the text widget
         self.text_area.delete(1.0, tk.END)
     
@@ -230,42 +734,63 @@ class StudentMarksApp:
         # Insert text at the end and scroll to show it
         self.text_area.insert(tk.END, text)
         self.text_area.see(tk.END)
+
+    def display_lines(self, lines):
+        """Display many lines with a single insert (and a single scroll)"""
+        self.display_text("\n".join(lines) + "\n")
     
-    def view_all_students(self):
-        """Display all student records"""
-        self.clear_display()
-        
+    def view_all_students(self, order=None, title=None, keep_position=False):
+        """Display all student records
+
+        `order` optionally gives the student codes in display order as an
+        indexable sequence (e.g. a sorted view's positions); by default rows are shown in stored order. `title` is
+        printed above the table. `keep_position` keeps the scroll position
+        (used when the same listing is redrawn after records changed).
+        """
         if not self.students:
+            self.clear_display()
             self.display_text("No student data available.\n")
             return
         
-        # Header
-        header = f"{'Name':<20} {'Code':<8} {'Coursework':<12} {'Exam':<6} {'Percentage':<10} {'Grade':<6}\n"
-        separator = "-" * 70 + "\n"
-        self.display_text(header)
-        self.display_text(separator)
+        # Header (preceded by the title, if any)
+        separator = "-" * 70
+        head = title.splitlines() if title else []
+        head.append(f"{'Name':<20} {'Code':<8} {'Coursework':<12} {'Exam':<6} {'Percentage':<10} {'Grade':<6}")
+        head.append(separator)
         
-        total_percentage = 0
+        # Nothing is computed for the roster as a whole: the table view asks
+        # for a line only when it scrolls into view, and that line reads its
+        # one row (looking its code up when the listing has an order)
+        count = len(self.students) if order is None else len(order)
 
-        # For each student compute stats and append a nicely formatted line
-        for student in self.students:
-            stats = self.calculate_student_stats(student)
+        # Summary block showing count and average percentage (from the
+        # running aggregates, not another pass over the percentages)
+        shown, label = f"Number of students: {count}", "Average percentage"
+        if count != len(self.students):
+            # A filtered listing: the average is still the whole class's
+            shown, label = f"{shown} of {len(self.students)}", "Class average percentage"
+        tail = [separator, "", "Summary:", shown,
+                f"{label}: {class_statistics(self.students).mean:.1f}%"]
 
-            student_line = f"{student['name']:<20} {student['code']:<8} " \
-                          f"{stats['total_coursework']:<12} {stats['exam_mark']:<6} " \
-                          f"{stats['percentage']:<10.1f} {stats['grade']:<6}\n"
-            self.display_text(student_line)
-
-            # Keep a running total of percentages for the summary
-            total_percentage += stats['percentage']
-
-        # Summary block showing count and average percentage
-        self.display_text(separator)
-        avg_percentage = total_percentage / len(self.students)
-        summary = f"\nSummary:\n"
-        summary += f"Number of students: {len(self.students)}\n"
-        summary += f"Average percentage: {avg_percentage:.1f}%\n"
-        self.display_text(summary)
+        def line_source(line):
+            if line < len(head):
+                return head[line]
+            line -= len(head)
+            if line >= count:
+                return tail[line - count]
+            student = self.students[line if order is None else self.students.index_of(order[line])]
+            coursework = sum(student['course_marks'])
+            percentage = (coursework + student['exam_mark']) / TOTAL_POSSIBLE * 100
+            return f"{student['name']:<20} {student['code']:<8} " \
+                   f"{coursework:<12} {student['exam_mark']:<6} " \
+                   f"{percentage:<10.1f} {grade_for_percentage(percentage):<6}"
+
+        self.text_area.grid_remove()
+        self.table_view.grid()
+        self.table_view.show(len(head) + count + len(tail), line_source, keep_position)
+        # Redraw on outside changes; sort_students sets its own redraw for ordered listings
+        self.table_refresh = ((lambda: self.view_all_students(title=title, keep_position=True))
+                              if order is None else None)
     
     def view_individual_student(self):
         """Display individual student record"""
@@ -273,18 +798,25 @@ class StudentMarksApp:
             messagebox.showwarning("Warning", "No student data available.")
             return
         
-        student_index = self.select_student_dialog("Select Student to View")
-        if student_index is not None:
-            self.display_individual_student(student_index)
+        student_code = self.select_student_dialog("Select Student to View")
+        if student_code is not None:
+            student_index = self.students.index_of(student_code)
+            if student_index is None:
+                self.student_removed(student_code)
+            else:
+                self.display_individual_student(student_index)
     
     def display_individual_student(self, student_index):
         """Display individual student record in main window"""
+        self.display_student_record(self.students[student_index])
+
+    def display_student_record(self, student, heading="INDIVIDUAL STUDENT RECORD"):
+        """Display one student record (from the roster or an archive)"""
         self.clear_display()
         
-        student = self.students[student_index]
         stats = self.calculate_student_stats(student)
         
-        self.display_text("INDIVIDUAL STUDENT RECORD\n")
+        self.display_text(f"{heading}\n")
         self.display_text("=" * 40 + "\n\n")
         
         self.display_text(f"Student Name: {student['name']}\n")
@@ -308,101 +840,153 @@ class StudentMarksApp:
     
     def show_highest_mark(self):
         """Display student with highest overall mark"""
-        self.clear_display()
-        
         if not self.students:
+            self.clear_display()
             self.display_text("No student data available.\n")
             return
         
-        # Iterate over students and track the one with the highest percentage
-        highest_student = None
-        highest_percentage = -1
-
-        for student in self.students:
-            stats = self.calculate_student_stats(student)
-            if stats['percentage'] > highest_percentage:
-                highest_percentage = stats['percentage']
-                highest_student = student
-                highest_stats = stats
-        
-        self.display_text("STUDENT WITH HIGHEST OVERALL MARK\n")
-        self.display_text("=" * 45 + "\n\n")
-        
-        if highest_student:
-            self.display_text(f"Student Name: {highest_student['name']}\n")
-            self.display_text(f"Student Code: {highest_student['code']}\n")
-            self.display_text(f"Coursework Marks: {highest_student['course_marks']}\n")
-            self.display_text(f"Total Coursework: {highest_stats['total_coursework']}/60\n")
-            self.display_text(f"Exam Mark: {highest_stats['exam_mark']}/100\n")
-            self.display_text(f"Overall Percentage: {highest_stats['percentage']:.1f}%\n")
-            self.display_text(f"Grade: {highest_stats['grade']}\n")
+        # The top of the percentage-sorted view, which edits keep current
+        code = next(self.students.sorted_view('percentage').codes(reverse=True))
+        self.display_mark_extreme(self.students.find(code), "HIGHEST")
+        # Stay on screen: redraw when other sessions change the roster
+        self.table_refresh = self.show_highest_mark
     
     def show_lowest_mark(self):
         """Display student with lowest overall mark"""
-        self.clear_display()
-        
         if not self.students:
+            self.clear_display()
             self.display_text("No student data available.\n")
             return
         
-        # Iterate and find the minimum percentage
-        lowest_student = None
-        lowest_percentage = 101
+        code = next(self.students.sorted_view('percentage').codes())
+        self.display_mark_extreme(self.students.find(code), "LOWEST")
+        self.table_refresh = self.show_lowest_mark
 
-        for student in self.students:
+    def display_mark_extreme(self, student, label):
+        """Display the student found by show_highest_mark / show_lowest_mark"""
+        self.clear_display()
+        heading = f"STUDENT WITH {label} OVERALL MARK"
+        self.display_text(heading + "\n")
+        self.display_text("=" * (len(heading) + 12) + "\n\n")
+        
+        if student:
             stats = self.calculate_student_stats(student)
-            if stats['percentage'] < lowest_percentage:
-                lowest_percentage = stats['percentage']
-                lowest_student = student
-                lowest_stats = stats
-        
-        self.display_text("STUDENT WITH LOWEST OVERALL MARK\n")
-        self.display_text("=" * 44 + "\n\n")
-        
-        if lowest_student:
-            self.display_text(f"Student Name: {lowest_student['name']}\n")
-            self.display_text(f"Student Code: {lowest_student['code']}\n")
-            self.display_text(f"Coursework Marks: {lowest_student['course_marks']}\n")
-            self.display_text(f"Total Coursework: {lowest_stats['total_coursework']}/60\n")
-            self.display_text(f"Exam Mark: {lowest_stats['exam_mark']}/100\n")
-            self.display_text(f"Overall Percentage: {lowest_stats['percentage']:.1f}%\n")
-            self.display_text(f"Grade: {lowest_stats['grade']}\n")
+            self.display_text(f"Student Name: {student['name']}\n")
+            self.display_text(f"Student Code: {student['code']}\n")
+            self.display_text(f"Coursework Marks: {student['course_marks']}\n")
+            self.display_text(f"Total Coursework: {stats['total_coursework']}/60\n")
+            self.display_text(f"Exam Mark: {stats['exam_mark']}/100\n")
+            self.display_text(f"Overall Percentage: {stats['percentage']:.1f}%\n")
+            self.display_text(f"Grade: {stats['grade']}\n")
     
-    def sort_students(self, sort_by, ascending=True):
-        """Sort students by specified field"""
+    def show_ranked_students(self, largest=True):
+        """Display the top (or bottom) k students by overall percentage"""
         if not self.students:
             messagebox.showwarning("Warning", "No student data available.")
             return
-        
-        # Pair each student with its computed stats so we can sort by percentage
-        students_with_stats = []
-        for student in self.students:
+
+        label = "Top" if largest else "Bottom"
+        k = simpledialog.askinteger(f"{label} Students", "How many students?",
+                                    parent=self.root, minvalue=1,
+                                    initialvalue=min(20, len(self.students)))
+        if k is None:
+            return
+
+        # Select the k rows with a bounded heap; the stored order is untouched
+        # and nothing is written to disk
+        indices = top_k_indices(self.students.percentages(TOTAL_POSSIBLE), k, largest)
+
+        # Build the whole report first and insert it in one go
+        lines = [f"{label.upper()} {len(indices)} STUDENTS BY OVERALL PERCENTAGE",
+                 "=" * 60, "",
+                 f"{'Rank':<6} {'Name':<20} {'Code':<8} {'Coursework':<12} "
+                 f"{'Exam':<6} {'Percentage':<10} {'Grade':<6}",
+                 "-" * 76]
+        for rank, index in enumerate(indices, 1):
+            student = self.students[index]
             stats = self.calculate_student_stats(student)
-            students_with_stats.append((student, stats))
-        
-        # Sort based on the specified field
-        if sort_by == 'name':
-            students_with_stats.sort(key=lambda x: x[0]['name'].lower(), reverse=not ascending)
-        elif sort_by == 'percentage':
-            students_with_stats.sort(key=lambda x: x[1]['percentage'], reverse=not ascending)
-        elif sort_by == 'code':
-            students_with_stats.sort(key=lambda x: x[0]['code'], reverse=not ascending)
-        
-        # Replace students list with the sorted order (extract the student element)
-        self.students = [item[0] for item in students_with_stats]
+            lines.append(f"{rank:<6} {student['name']:<20} {student['code']:<8} "
+                         f"{stats['total_coursework']:<12} {stats['exam_mark']:<6} "
+                         f"{stats['percentage']:<10.1f} {stats['grade']:<6}")
+        self.clear_display()
+        self.display_lines(lines)
 
-        # Persist the new ordering to disk
-        self.save_data()
+    def show_class_statistics(self):
+        """Display the class's overall percentages: spread, percentiles, grades, histogram"""
+        if not self.students:
+            self.clear_display()
+            self.display_text("No student data available.\n")
+            return
 
-        # Show a header and display the sorted table
+        stats = class_statistics(self.students)
+        summary = stats.summary()
+        lines = ["CLASS STATISTICS (OVERALL PERCENTAGE)", "=" * 50, "",
+                 f"Number of students: {summary['count']}",
+                 f"Average percentage: {summary['mean']:.1f}%",
+                 f"Standard deviation: {summary['std']:.1f}",
+                 f"Lowest / Highest: {summary['minimum']:.1f}% / {summary['maximum']:.1f}%",
+                 f"Median: {summary['median']:.1f}%  (Q1 {summary['q1']:.1f}%, Q3 {summary['q3']:.1f}%)",
+                 "Percentiles: " + ", ".join(f"P{point} {value:.1f}%"
+                                             for point, value in summary['percentiles'].items()),
+                 "", "Grade distribution:"]
+        for grade, count in stats.grade_distribution(grades=GRADES).items():
+            lines.append(f"  {grade:<3} {count:>6}  ({count / stats.count * 100:.1f}%)")
+        lines += ["", "Histogram (overall percentage):"]
+        lines += ["  " + line for line in histogram_lines(stats.histogram())]
         self.clear_display()
+        self.display_lines(lines)
+        self.table_refresh = self.show_class_statistics
+
+    def show_grade_filter(self, grades, keep_position=False):
+        """Display the students whose grade is in `grades`, best grade first
+
+        The codes come straight from the grade index, so only the matching
+        students are touched; the listing stays live like the roster view.
+        """
+        index = grade_index(self.students)
+        order = list(index.codes(grades))
+        counts = ", ".join(f"{grade}: {index.count(grade)}" for grade in grades)
+        title = f"STUDENTS WITH GRADE {'/'.join(grades)} ({counts})\n" + "=" * 60 + "\n\n"
+        self.view_all_students(order=order, title=title, keep_position=keep_position)
+        self.table_refresh = lambda: self.show_grade_filter(grades, keep_position=True)
+
+    def ask_grade_filter(self):
+        """Ask for a grade range (e.g. "A-C" or "B, D") and display those students"""
+        text = simpledialog.askstring("Students by Grade",
+                                      f"Grade or range of grades ({', '.join(GRADES)}), e.g. A-C:",
+                                      parent=self.root)
+        if not text:
+            return
+        try:
+            grades = grade_range(text, GRADES)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid grade selection: {str(e)}")
+            return
+        self.show_grade_filter(grades)
+
+    def sort_students(self, sort_by, ascending=True, keep_position=False):
+        """Display students sorted by the specified field ('name', 'percentage' or 'code')
+
+        Sorting is presentational: rows are taken from the table's sorted
+        view, which is kept in order as records change, so the stored order
+        and the data file are left alone.
+        """
+        if not self.students:
+            messagebox.showwarning("Warning", "No student data available.")
+            return
+
+        # Show a header and display the table in the view's order
         direction = "Ascending" if ascending else "Descending"
-        self.display_text(f"STUDENT RECORDS SORTED BY {sort_by.upper()} ({direction})\n")
-        self.display_text("=" * 60 + "\n\n")
-        self.view_all_students()
+        title = f"STUDENT RECORDS SORTED BY {sort_by.upper()} ({direction})\n" + "=" * 60 + "\n\n"
+        order = self.students.sorted_view(sort_by).positions(reverse=not ascending)
+        self.view_all_students(order=order, title=title, keep_position=keep_position)
+        # Redraws re-read the sorted view, which already holds any changes
+        self.table_refresh = lambda: self.sort_students(sort_by, ascending, keep_position=True)
     
     def add_student_record(self):
         """Add a new student record"""
+        if not self.data_ready():
+            return
         add_window = tk.Toplevel(self.root)
         add_window.title("Add New Student")
         add_window.geometry("400x400")
@@ -454,8 +1038,13 @@ class StudentMarksApp:
                     messagebox.showerror("Error", "Student name cannot be empty.")
                     return
 
-                # Ensure student code is unique
-                if any(student['code'] == code for student in self.students):
+                # Names are stored in comma-separated lines without escaping
+                if record_text_error(name, "name"):
+                    messagebox.showerror("Error", "Student name cannot contain commas or control characters.")
+                    return
+
+                # Ensure student code is unique (hash lookup on the code index)
+                if code in self.students:
                     messagebox.showerror("Error", "Student code already exists.")
                     return
 
@@ -477,15 +1066,21 @@ class StudentMarksApp:
                 }
 
                 self.students.append(new_student)
+                self.update_summary()
+                add_window.destroy()
 
-                # Try to save; if successful, close dialog and refresh view
-                if self.save_data():
+                def added():
                     messagebox.showinfo("Success", "Student record added successfully!")
-                    add_window.destroy()
                     self.view_all_students()
-                else:
+
+                def failed(error):
                     # If saving failed, remove the in-memory record to keep data consistent
                     self.students.remove(new_student)
+                    self.update_summary()
+                    messagebox.showerror("Error", f"Failed to save data: {str(error)}")
+
+                # Log the new record on the worker; refresh the view once it is saved
+                self.append_journal('A', new_student, added, failed)
 
             except ValueError:
                 # Handles non-integer input parsing attempts
@@ -500,13 +1095,18 @@ class StudentMarksApp:
     
     def delete_student_record(self):
         """Delete a student record"""
+        if not self.data_ready():
+            return
         if not self.students:
             messagebox.showwarning("Warning", "No student data available.")
             return
         
-        student_index = self.select_student_dialog("Select Student to Delete")
-        if student_index is not None:
-            student = self.students[student_index]
+        student_code = self.select_student_dialog("Select Student to Delete")
+        if student_code is not None:
+            student = self.students.find(student_code)
+            if student is None:
+                self.student_removed(student_code)
+                return
 
             # Confirm destructive action with user
             confirm = messagebox.askyesno(
@@ -515,30 +1115,80 @@ class StudentMarksApp:
             )
 
             if confirm:
-                # Remove from in-memory list and attempt to save
+                # The watcher may have moved or removed rows while the
+                # question was open, so find the row again by code
+                student_index = self.students.index_of(student_code)
+                if student_index is None:
+                    self.student_removed(student_code)
+                    return
+                # Remove from in-memory list and attempt to log the deletion
                 deleted_student = self.students.pop(student_index)
-                if self.save_data():
+                self.update_summary()
+
+                def deleted():
                     messagebox.showinfo("Success", f"Student {deleted_student['name']} deleted successfully!")
                     self.view_all_students()
-                else:
+
+                def failed(error):
                     # On failure, restore the record to keep memory and disk consistent
-                    self.students.insert(student_index, deleted_student)
+                    self.students.insert(min(student_index, len(self.students)), deleted_student)
+                    self.update_summary()
                     messagebox.showerror("Error", "Failed to delete student record.")
+
+                self.append_journal('D', deleted_student, deleted, failed)
     
     def update_student_record(self):
         """Update a student record"""
+        if not self.data_ready():
+            return
         if not self.students:
             messagebox.showwarning("Warning", "No student data available.")
             return
         
-        student_index = self.select_student_dialog("Select Student to Update")
-        if student_index is not None:
-            self.show_update_dialog(student_index)
+        student_code = self.select_student_dialog("Select Student to Update")
+        if student_code is not None:
+            student = self.students.find(student_code)
+            if student is None:
+                self.student_removed(student_code)
+                return
+            self.show_update_dialog(
+                student, lambda record: self.apply_student_update(student_code, record))
+
+    def apply_student_update(self, student_code, record):
+        """Write an edited record back to the roster and journal it"""
+        # Rows may have moved while the dialog was open, so look the
+        # student up by code now
+        student_index = self.students.index_of(student_code)
+        if student_index is None:
+            self.student_removed(student_code)
+            return
+        # Apply changes to the in-memory record (rows are stored
+        # column-wise, so the whole record is written back)
+        self.students[student_index] = record
+        self.update_summary()
+
+        def updated():
+            messagebox.showinfo("Success", "Student record updated successfully!")
+            self.view_all_students()
+
+        def failed(error):
+            messagebox.showerror("Error", "Failed to update student record.")
+
+        # Persist on the worker; on success refresh the view, otherwise inform user
+        self.append_journal('U', record, updated, failed)
+
+    def student_removed(self, student_code):
+        """Tell the user a chosen student has gone from the roster"""
+        messagebox.showwarning(
+            "Warning", f"Student {student_code} was removed by another session.")
+        self.view_all_students()
     
-    def show_update_dialog(self, student_index):
-        """Show dialog for updating student record"""
-        student = self.students[student_index]
-        
+    def show_update_dialog(self, student, on_save):
+        """Show dialog for updating a student record.
+
+        `on_save` is called with the edited record once the fields pass
+        validation; it decides where the change is stored.
+        """
         update_window = tk.Toplevel(self.root)
         update_window.title(f"Update Student: {student['name']}")
         update_window.geometry("400x450")
@@ -599,6 +1249,11 @@ class StudentMarksApp:
                     messagebox.showerror("Error", "Student name cannot be empty.")
                     return
 
+                # Names are stored in comma-separated lines without escaping
+                if record_text_error(name, "name"):
+                    messagebox.showerror("Error", "Student name cannot contain commas or control characters.")
+                    return
+
                 # Validate numeric ranges
                 if not (0 <= mark1 <= 20 and 0 <= mark2 <= 20 and 0 <= mark3 <= 20):
                     messagebox.showerror("Error", "Coursework marks must be between 0 and 20.")
@@ -608,18 +1263,13 @@ class StudentMarksApp:
                     messagebox.showerror("Error", "Exam mark must be between 0 and 100.")
                     return
 
-                # Apply changes to the in-memory record
-                self.students[student_index]['name'] = name
-                self.students[student_index]['course_marks'] = [mark1, mark2, mark3]
-                self.students[student_index]['exam_mark'] = exam
-
-                # Try to persist; on success refresh the view, otherwise inform user
-                if self.save_data():
-                    messagebox.showinfo("Success", "Student record updated successfully!")
-                    update_window.destroy()
-                    self.view_all_students()
-                else:
-                    messagebox.showerror("Error", "Failed to update student record.")
+                update_window.destroy()
+                on_save({
+                    'code': student['code'],
+                    'name': name,
+                    'course_marks': [mark1, mark2, mark3],
+                    'exam_mark': exam
+                })
 
             except ValueError:
                 messagebox.showerror("Error", "Please enter valid numeric values.")
@@ -631,39 +1281,183 @@ class StudentMarksApp:
         # Configure grid weights
         update_window.columnconfigure(1, weight=1)
     
+    def export_archive(self):
+        """Write the current roster to a memory-mapped archive file"""
+        if not self.data_ready():
+            return
+        if not self.students:
+            messagebox.showwarning("Warning", "No student data available.")
+            return
+
+        filename = filedialog.asksaveasfilename(
+            title="Export Roster to Archive",
+            defaultextension=".sra",
+            filetypes=[("Student archives", "*.sra"), ("All files", "*.*")])
+        if not filename:
+            return
+
+        try:
+            # An open archive at the same path must be unmapped before it is replaced
+            if self.archive is not None and os.path.abspath(self.archive.path) == os.path.abspath(filename):
+                self.close_archive()
+            count = RecordArchive.create(filename, self.students)
+            messagebox.showinfo("Success", f"Exported {count} student records to the archive.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export archive: {str(e)}")
+
+    def open_archive(self):
+        """Open an archive file for lookups and in-place edits by student code"""
+        filename = filedialog.askopenfilename(
+            title="Open Archive",
+            filetypes=[("Student archives", "*.sra"), ("All files", "*.*")])
+        if not filename:
+            return
+
+        try:
+            archive = RecordArchive(filename, writable=True, fsync_policy=FSYNC_POLICY)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open archive: {str(e)}")
+            return
+
+        self.close_archive()
+        self.archive = archive
+        self.set_status(f"Archive: {os.path.basename(filename)} ({len(archive)} records)")
+
+    def close_archive(self):
+        """Close the open archive, if any"""
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+            self.show_ready()
+
+    def ask_archive_code(self, title):
+        """Ask for a student code and return its archive record, or None"""
+        if self.archive is None:
+            messagebox.showwarning("Warning", "Open an archive first (Archive > Open Archive...).")
+            return None
+
+        code = simpledialog.askinteger(title, "Student code:", parent=self.root)
+        if code is None:
+            return None
+
+        # Only the index pages searched and the one record slot are read
+        student = self.archive.get(code)
+        if student is None:
+            messagebox.showerror("Error", f"No student with code {code} in the archive.")
+        return student
+
+    def view_archive_student(self):
+        """Display one archived student, looked up by code"""
+        student = self.ask_archive_code("View Student by Code")
+        if student is not None:
+            self.display_student_record(student, heading="ARCHIVED STUDENT RECORD")
+
+    def update_archive_student(self):
+        """Edit one archived student in place, looked up by code"""
+        student = self.ask_archive_code("Update Student by Code")
+        if student is None:
+            return
+
+        def save(record):
+            try:
+                if not self.archive.update(record):
+                    messagebox.showerror("Error", "The record was deleted from the archive meanwhile.")
+                    return
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to update archive record: {str(e)}")
+                return
+            messagebox.showinfo("Success", "Archive record updated successfully!")
+            self.display_student_record(record, heading="ARCHIVED STUDENT RECORD")
+
+        self.show_update_dialog(student, save)
+
+    def delete_archive_student(self):
+        """Mark one archived student as deleted, looked up by code"""
+        student = self.ask_archive_code("Delete Student by Code")
+        if student is None:
+            return
+
+        if messagebox.askyesno("Confirm Delete",
+                               f"Delete {student['name']} ({student['code']}) from the archive?"):
+            try:
+                self.archive.delete(student['code'])
+                messagebox.showinfo("Success", "Archive record deleted successfully!")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to delete archive record: {str(e)}")
+
     def select_student_dialog(self, title):
-        """Generic dialog for selecting a student"""
+        """Search-as-you-type dialog for picking a student; returns the code or None
+
+        Each keystroke looks the text up in the roster's search index
+        (codes, names and surnames by prefix, then close spellings), and
+        only the best PICKER_RESULTS matches are put in the list, so the
+        dialog opens and responds at the same speed for any roster size.
+        """
         selection_window = tk.Toplevel(self.root)
         selection_window.title(title)
-        selection_window.geometry("300x150")
+        selection_window.geometry("420x360")
         selection_window.transient(self.root)
         selection_window.grab_set()
         
-        ttk.Label(selection_window, text="Select Student:").pack(pady=10)
-        
-        # Create a combobox listing each student by 'code - name'
-        student_options = [f"{s['code']} - {s['name']}" for s in self.students]
-        student_var = tk.StringVar()
-        student_combo = ttk.Combobox(selection_window, textvariable=student_var,
-                                   values=student_options, state="readonly")
-        student_combo.pack(pady=10)
+        ttk.Label(selection_window, text="Type a student code or name:").pack(pady=(10, 4))
+        query_var = tk.StringVar()
+        query_entry = ttk.Entry(selection_window, textvariable=query_var)
+        query_entry.pack(fill=tk.X, padx=10)
+        query_entry.focus_set()
+
+        # Matching students, best first ("code - name")
+        match_list = tk.Listbox(selection_window, height=12, font=("Courier", 10),
+                                exportselection=False)
+        match_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=6)
+        count_var = tk.StringVar()
+        ttk.Label(selection_window, textvariable=count_var).pack()
+
+        # Codes currently listed, in list order
+        shown_codes = []
+
+        def show_matches(*_):
+            query = query_var.get()
+            if query.strip():
+                codes = self.students.search_index().search(query, PICKER_RESULTS)
+            else:
+                # Nothing typed yet: the first students by name
+                codes = list(islice(self.students.sorted_view('name').codes(), PICKER_RESULTS))
+            shown_codes[:] = codes
+            match_list.delete(0, tk.END)
+            if codes:
+                match_list.insert(tk.END, *(f"{code} - {self.students.find(code)['name']}"
+                                            for code in codes))
+                match_list.selection_set(0)
+            count_var.set(f"Showing {len(codes)} of {len(self.students)} students"
+                          if codes else "No matching students")
+
+        query_var.trace_add('write', show_matches)
+        show_matches()
 
-        # We'll capture the selected index via a single-element list so the
+        # We'll capture the selected code via a single-element list so the
         # nested confirm_selection() can mutate it (closure over the list).
-        selected_index = [None]
+        # The code, not the row, is returned: the file watcher may move
+        # rows before the caller acts on the choice.
+        selected_code = [None]
 
-        def confirm_selection():
-            # Set the selected index from the combobox and close the dialog
-            selected_index[0] = student_combo.current()
+        def confirm_selection(event=None):
+            # Take the highlighted match (if any) and close the dialog
+            chosen = match_list.curselection()
+            if chosen:
+                selected_code[0] = shown_codes[chosen[0]]
             selection_window.destroy()
 
+        query_entry.bind("<Return>", confirm_selection)
+        query_entry.bind("<Down>", lambda event: match_list.focus_set())
+        match_list.bind("<Return>", confirm_selection)
+        match_list.bind("<Double-Button-1>", confirm_selection)
         ttk.Button(selection_window, text="Select",
-                  command=confirm_selection).pack(pady=10)
+                  command=confirm_selection).pack(pady=(0, 10))
 
-        # Block until the selection window is closed, then return the index
+        # Block until the selection window is closed, then return the code
         self.root.wait_window(selection_window)
 
-        return selected_index[0]
+        return selected_code[0]
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,519 @@
+"""Local HTTP/JSON service for the student roster.
+
+Dashboards and scripts can query and edit the same roster as the Tkinter
+app (DATA_FILE and its journal, or the SQLite database) over HTTP:
+
+    GET    /students                  list, ?offset=&limit=&sort=name|code|percentage&order=desc
+    GET    /students/<code>           one student
+    POST   /students                  add (JSON body: code, name, course_marks, exam_mark)
+    PUT    /students/<code>           update (JSON body: any of name, course_marks, exam_mark)
+    DELETE /students/<code>           delete
+    GET    /top                       best students by percentage, ?k=10&lowest=1
+    GET    /grades/<grades>           students with a grade or range, e.g. /grades/A-C
+    GET    /stats                     class statistics, grade distribution and histogram
+
+Every student comes back with its total coursework, percentage and grade.
+
+Requests are answered from the roster in memory, which only the event
+loop touches: readers never wait for a lock or the disk, and each request
+is handled start to finish without yielding, so it always sees a
+consistent roster. Lists are paged (at most MAX_PAGE_SIZE records) and
+read from the table's maintained sorted views, grade index and running
+statistics, so no request costs more than its own page. Edits are applied
+in memory straight away; a single writer task then stores them, many
+edits per journal append (see student_core.MarksRepository.write_edits),
+on a background thread, and the client is answered once its edit is
+written. If the write fails, the edit is undone and the client gets the
+error.
+
+Run with `python student-server.py` from the folder holding DATA_FILE.
+"""
+
+import asyncio
+import json
+import time
+from http import HTTPStatus
+from itertools import islice
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from student_core import (GRADES, TOTAL_POSSIBLE, MarksRepository, apply_edit,
+                          class_statistics, compute_student_stats, grade_index,
+                          validate_student)
+from student_records import LoadReport, StudentTable, grade_range
+from student_stats import DEFAULT_HISTOGRAM_BINS
+
+# Configuration constants (storage options as in student-manager.py)
+HOST = "127.0.0.1"  # only serve this machine
+PORT = 8765
+STORAGE_BACKEND = "text"  # "text" (DATA_FILE + journal) or "sqlite" (DATABASE_FILE)
+DATA_FILE = "studentMarks.txt"
+DATABASE_FILE = "studentMarks.db"
+JOURNAL_COMPACT_THRESHOLD = 500  # journal entries before the journal is folded into DATA_FILE
+USE_SNAPSHOT = True
+FSYNC_POLICY = "always"  # "always", "batched" or "off"
+WRITE_BATCH = 200          # most edits stored by one journal append
+WATCH_INTERVAL = 2.0       # seconds between checks for changes other sessions made
+PAGE_SIZE = 100            # records per page when no limit is given
+MAX_PAGE_SIZE = 1000       # most records a single response may hold
+MAX_BODY = 64 * 1024       # largest request body accepted, in bytes
+IDLE_TIMEOUT = 30.0        # seconds a connection may take to send a whole request
+LISTEN_BACKLOG = 1024      # pending connections queued by the OS
+
+
+class RequestError(Exception):
+    """A request that cannot be served, answered with `status` and a JSON error."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def student_json(student):
+    """Return a student with its coursework total, percentage and grade."""
+    stats = compute_student_stats(student)
+    return {
+        **student,
+        'total_coursework': stats['total_coursework'],
+        'percentage': round(stats['percentage'], 2),
+        'grade': stats['grade']
+    }
+
+
+def whole_number(value, field):
+    """Return `value` if it is an int (not a bool), else raise a 400 error."""
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"{field} must be a whole number")
+    return value
+
+
+def query_int(query, name, default, low, high):
+    """Read integer parameter `name` from a parsed query string, clamped to low-high."""
+    try:
+        value = int(query.get(name, [default])[0])
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"{name} must be a whole number")
+    return max(low, min(value, high))
+
+
+def path_code(text):
+    """Return the student code in URL path segment `text`, or raise a 404 error."""
+    try:
+        return int(text)
+    except ValueError:
+        raise RequestError(HTTPStatus.NOT_FOUND, f"No student with code {text!r}")
+
+
+class RosterService:
+    """The roster in memory, plus the single writer that stores its edits.
+
+    Only the event loop reads or changes `students`. The repository is
+    used by the writer task alone, one call at a time on a worker thread,
+    as it is not thread-safe.
+    """
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.students = StudentTable()
+        self.pending = []  # (op, student, previous, future) applied in memory, not yet written
+        self.wakeup = asyncio.Event()
+        self.journal_entries = 0  # journal lines written since the last full save
+        self.last_watch = time.monotonic()
+        self.writer = None
+        self.closing = False
+
+    async def start(self):
+        """Load the roster and start the writer task."""
+        report = LoadReport()
+        result = await asyncio.to_thread(self.repository.load, report)
+        if result is None:
+            # Journal entries are only replayed onto an existing data file
+            await asyncio.to_thread(self.repository.save, self.students.copy())
+        else:
+            self.students, self.journal_entries = result
+        print(report.summary())
+        self.writer = asyncio.create_task(self.run_writer())
+
+    async def stop(self):
+        """Write any pending edits, then close the repository."""
+        self.closing = True
+        self.wakeup.set()
+        if self.writer is not None:
+            await self.writer
+        await asyncio.to_thread(self.repository.sync_pending_writes)
+        self.repository.close()
+
+    # Edits (event loop)
+
+    async def change(self, op, student):
+        """Apply one edit in memory and wait until the writer has stored it."""
+        previous = self.students.find(student['code'])
+        apply_edit(self.students, op, student)
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((op, student, previous, future))
+        self.wakeup.set()
+        await future
+
+    @staticmethod
+    def restore(students, code, previous):
+        """Put student `code` back as it was before an edit (None: absent)."""
+        if previous is None:
+            apply_edit(students, 'D', {'code': code})
+        else:
+            apply_edit(students, 'U', previous)
+
+    # Writer task
+
+    async def run_writer(self):
+        """Store edits as they arrive and watch DATA_FILE in quiet moments."""
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), WATCH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            while self.pending:
+                await self.write_pending()
+            if not self.closing and time.monotonic() - self.last_watch >= WATCH_INTERVAL:
+                self.last_watch = time.monotonic()
+                await self.apply_external_changes()
+
+    async def write_pending(self):
+        """Store up to WRITE_BATCH pending edits with one write."""
+        batch, self.pending = self.pending[:WRITE_BATCH], self.pending[WRITE_BATCH:]
+        changes = [(op, student) for op, student, _, _ in batch]
+        try:
+            await asyncio.to_thread(self.repository.write_edits, changes)
+        except Exception as e:
+            # Nothing in the batch was stored: take it back out of memory
+            for _, student, previous, future in reversed(batch):
+                self.restore(self.students, student['code'], previous)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, _, _, future in batch:
+            if not future.done():
+                future.set_result(None)
+        if self.repository.store is None:
+            self.journal_entries += len(batch)
+            if self.journal_entries >= JOURNAL_COMPACT_THRESHOLD:
+                await self.compact()
+
+    async def compact(self):
+        """Fold the journal into DATA_FILE.
+
+        The snapshot must hold exactly the edits journaled so far, so edits
+        still pending are undone on the copy.
+        """
+        self.journal_entries = 0
+        snapshot = self.students.copy()
+        for _, student, previous, _ in reversed(self.pending):
+            self.restore(snapshot, student['code'], previous)
+        merge_report = await asyncio.to_thread(self.repository.compact, snapshot)
+        if merge_report is not None:
+            # Another session's changes were merged on disk: read them back
+            await self.reload()
+
+    async def reload(self):
+        """Replace the roster with the one on disk, keeping pending edits."""
+        result = await asyncio.to_thread(self.repository.load, LoadReport())
+        if result is None:
+            return
+        students, self.journal_entries = result
+        for op, student, _, _ in self.pending:
+            apply_edit(students, op, student)
+        self.students = students
+
+    async def apply_external_changes(self):
+        """Apply records another session changed on disk (see student-manager.py)."""
+        if self.repository.store is not None:
+            return
+        try:
+            changes = await asyncio.to_thread(self.repository.read_external_changes)
+        except OSError:
+            # Try again on the next check; the file may be mid-update
+            return
+        if changes is None:
+            return
+        inserted, changed, removed = changes
+        # Students with edits still waiting to be written keep this session's version
+        pending = {student['code'] for _, student, _, _ in self.pending}
+        for student in inserted + changed:
+            if student['code'] not in pending:
+                apply_edit(self.students, 'U', student)
+        for code in removed:
+            if code not in pending:
+                apply_edit(self.students, 'D', {'code': code})
+
+    # Queries (event loop; none of them yield)
+
+    def list_students(self, query):
+        offset = query_int(query, 'offset', 0, 0, len(self.students))
+        limit = query_int(query, 'limit', PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        sort = query.get('sort', [None])[0]
+        if sort is None:
+            records = self.students[offset:offset + limit]
+        elif sort in StudentTable.SORT_KEYS:
+            reverse = query.get('order', ['asc'])[0] == 'desc'
+            records = islice(self.students.sorted_records(sort, reverse), offset, offset + limit)
+        else:
+            raise RequestError(HTTPStatus.BAD_REQUEST,
+                               f"sort must be one of {', '.join(StudentTable.SORT_KEYS)}")
+        return {
+            'total': len(self.students),
+            'offset': offset,
+            'students': [student_json(student) for student in records]
+        }
+
+    def get_student(self, code):
+        student = self.students.find(code)
+        if student is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No student with code {code}")
+        return student_json(student)
+
+    def top_students(self, query):
+        """The k best (or with ?lowest=1, worst) students by percentage."""
+        k = query_int(query, 'k', 10, 1, MAX_PAGE_SIZE)
+        lowest = query.get('lowest', ['0'])[0] not in ('0', 'false', '')
+        records = islice(self.students.sorted_records('percentage', reverse=not lowest), k)
+        return {'students': [student_json(student) for student in records]}
+
+    def students_graded(self, text, query):
+        try:
+            grades = grade_range(text, GRADES)
+        except ValueError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(e))
+        index = grade_index(self.students)
+        offset = query_int(query, 'offset', 0, 0, len(self.students))
+        limit = query_int(query, 'limit', PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        codes = islice(index.codes(grades), offset, offset + limit)
+        return {
+            'grades': list(grades),
+            'total': sum(index.count(grade) for grade in grades),
+            'offset': offset,
+            'students': [student_json(self.students.find(code)) for code in codes]
+        }
+
+    def statistics(self):
+        """Class statistics of overall percentages (kept current by the table)."""
+        stats = class_statistics(self.students)
+        summary = stats.summary()
+        summary['grades'] = stats.grade_distribution(grades=GRADES)
+        summary['histogram'] = [
+            {'low': low, 'high': high, 'count': count}
+            for low, high, count in stats.histogram(DEFAULT_HISTOGRAM_BINS)
+        ]
+        summary['total_possible'] = TOTAL_POSSIBLE
+        return summary
+
+    # Edit requests
+
+    def student_from_body(self, body, existing):
+        """Build a student from a JSON body, taking missing fields from `existing`."""
+        if not isinstance(body, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "request body must be a JSON object")
+        fields = dict(existing or {})
+        fields.update({name: body[name] for name in ('code', 'name', 'course_marks', 'exam_mark')
+                       if name in body})
+        missing = [name for name in ('code', 'name', 'course_marks', 'exam_mark')
+                   if name not in fields]
+        if missing:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"missing field(s): {', '.join(missing)}")
+        marks = fields['course_marks']
+        if not isinstance(marks, list) or len(marks) != 3:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "course_marks must be a list of 3 marks")
+        if not isinstance(fields['name'], str):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "name must be a string")
+        student = {
+            'code': whole_number(fields['code'], 'code'),
+            'name': fields['name'].strip(),
+            'course_marks': [whole_number(mark, 'course_marks') for mark in marks],
+            'exam_mark': whole_number(fields['exam_mark'], 'exam_mark')
+        }
+        error = validate_student(student)
+        if error:
+            raise RequestError(HTTPStatus.BAD_REQUEST, error)
+        return student
+
+    async def add_student(self, body):
+        student = self.student_from_body(body, None)
+        if student['code'] in self.students:
+            raise RequestError(HTTPStatus.CONFLICT, "Student code already exists.")
+        await self.change('A', student)
+        return student_json(student)
+
+    async def update_student(self, code, body):
+        existing = self.students.find(code)
+        if existing is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No student with code {code}")
+        if isinstance(body, dict) and body.get('code', code) != code:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "student code cannot be changed")
+        student = self.student_from_body(body, existing)
+        await self.change('U', student)
+        return student_json(student)
+
+    async def delete_student(self, code):
+        existing = self.students.find(code)
+        if existing is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No student with code {code}")
+        await self.change('D', existing)
+        return {'deleted': code}
+
+    # Routing
+
+    async def dispatch(self, method, target, body):
+        """Answer one request; returns (status, JSON-serializable result)."""
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.split('/') if part]
+        query = parse_qs(url.query)
+
+        if parts == ['students']:
+            if method == 'GET':
+                return HTTPStatus.OK, self.list_students(query)
+            if method == 'POST':
+                return HTTPStatus.CREATED, await self.add_student(body)
+        elif len(parts) == 2 and parts[0] == 'students':
+            code = path_code(parts[1])
+            if method == 'GET':
+                return HTTPStatus.OK, self.get_student(code)
+            if method == 'PUT':
+                return HTTPStatus.OK, await self.update_student(code, body)
+            if method == 'DELETE':
+                return HTTPStatus.OK, await self.delete_student(code)
+        elif parts == ['top'] and method == 'GET':
+            return HTTPStatus.OK, self.top_students(query)
+        elif len(parts) == 2 and parts[0] == 'grades' and method == 'GET':
+            return HTTPStatus.OK, self.students_graded(parts[1], query)
+        elif parts == ['stats'] and method == 'GET':
+            return HTTPStatus.OK, self.statistics()
+        else:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No such resource: {url.path}")
+        raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed on {url.path}")
+
+
+async def read_line(reader):
+    """Read one line of a request head; a line over the stream limit is an error."""
+    try:
+        return await reader.readline()
+    except ValueError:
+        raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                           "request line or header too long")
+
+
+async def read_request(reader):
+    """Read one HTTP/1.1 request.
+
+    Returns (method, target, version, headers, body), with header names in
+    lower case and the body decoded from JSON, or None at end of stream.
+    Raises RequestError for a request that cannot be read; the rest of it
+    may then still be unread, so the connection must not be reused. The
+    whole request, from the wait for its first line to the end of its
+    body, must arrive within IDLE_TIMEOUT (else asyncio.TimeoutError), so
+    a client cannot hold a connection open by trickling bytes.
+    """
+    return await asyncio.wait_for(receive_request(reader), IDLE_TIMEOUT)
+
+
+async def receive_request(reader):
+    """Read one request for read_request, without a deadline."""
+    line = await read_line(reader)
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "malformed request line")
+    headers = {}
+    while True:
+        line = await read_line(reader)
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "bad Content-Length")
+    if length < 0:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Content-Length cannot be negative")
+    if length > MAX_BODY:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+    body = None
+    if length:
+        try:
+            body = json.loads(await reader.readexactly(length))
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "request body is not valid JSON")
+    return method.upper(), target, version, headers, body
+
+
+def response_bytes(status, result, keep_alive):
+    """Encode a JSON response, headers and body in one buffer."""
+    payload = json.dumps(result, separators=(',', ':')).encode()
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + payload
+
+
+async def handle_connection(service, reader, writer):
+    """Serve requests on one connection until the client closes it or goes idle."""
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except RequestError as e:
+                # What is left of a bad request cannot be told apart from
+                # the next one, so answer it and close the connection
+                writer.write(response_bytes(e.status, {'error': str(e)}, keep_alive=False))
+                await writer.drain()
+                break
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                break
+            if request is None:
+                break
+            method, target, version, headers, body = request
+            connection = headers.get('connection', '').lower()
+            keep_alive = (connection == 'keep-alive' if version == 'HTTP/1.0'
+                          else connection != 'close')
+            try:
+                status, result = await service.dispatch(method, target, body)
+            except RequestError as e:
+                status, result = e.status, {'error': str(e)}
+            except Exception as e:
+                status, result = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+            writer.write(response_bytes(status, result, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve():
+    repository = MarksRepository(
+        DATA_FILE, DATABASE_FILE if STORAGE_BACKEND == "sqlite" else None,
+        fsync_policy=FSYNC_POLICY, use_snapshot=USE_SNAPSHOT)
+    service = RosterService(repository)
+    await service.start()
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer),
+        HOST, PORT, backlog=LISTEN_BACKLOG)
+    print(f"Serving {len(service.students)} students on http://{HOST}:{PORT}/")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main():
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,629 @@
+"""Headless core of the student manager: records, rules and storage.
+
+Everything the Tkinter app (student-manager.py) and the command-line
+extension (Ex3extension/student-manager-extention.py) do with records that
+does not need a window or a terminal lives here, so batch jobs, servers and
+benchmarks can drive the same engine without starting Tk:
+
+- the marks-format rules (mark limits, grading, per-student figures) and
+  the exam-format grading used by the CLI
+- MarksRepository: the GUI's roster on disk -- a text file plus an edit
+  journal, or a SQLite database -- with file locking, merging of other
+  sessions' changes and crash-safe writes
+- ExamRepository: the same for the CLI's exam-format file
+
+Rosters themselves are the column tables from student_records, which also
+keep the sorted views, grade indexes, search index and running class
+statistics up to date; `class_statistics` and `grade_index` below give the
+marks-format views of those. Nothing here prints or shows dialogs: errors
+are raised and outcomes returned (LoadReport, MergeReport) for the caller
+to present.
+
+A repository is not thread-safe. Use each one from a single thread at a
+time; the GUI runs every call on its background worker.
+"""
+
+import os
+
+from student_records import (DEFAULT_BATCH_SIZE, ExamStore, ExamTable, LoadReport,
+                             MarksStore, SharedFile, StudentTable, SyncPolicy,
+                             append_text, atomic_write, diff_records, merge_records,
+                             parse_exam_record, parse_marks_record, stream_records,
+                             sync_files)
+
+# Marks format (GUI): limits and grades
+COURSEWORK_MAX = 60  # total possible coursework marks (3 items x 20 each)
+EXAM_MAX = 100       # max exam mark
+TOTAL_POSSIBLE = COURSEWORK_MAX + EXAM_MAX  # combined total for percentage calcs
+GRADES = ('A', 'B', 'C', 'D', 'F')  # grades given by grade_for_percentage, best first
+
+# Exam format (CLI): grades given by exam_grade, best first
+EXAM_GRADES = ("A+", "A", "B", "C", "D", "F")
+
+# Students written to a new data file on first run
+SAMPLE_STUDENTS = [
+    {"code": 8439, "name": "Jake Hobbs", "course_marks": [10, 11, 10], "exam_mark": 43},
+    {"code": 7562, "name": "Sarah Smith", "course_marks": [15, 14, 16], "exam_mark": 78},
+    {"code": 9123, "name": "Mike Johnson", "course_marks": [12, 13, 11], "exam_mark": 65},
+    {"code": 6347, "name": "Emma Wilson", "course_marks": [18, 17, 19], "exam_mark": 92},
+    {"code": 5289, "name": "Tom Brown", "course_marks": [8, 9, 7], "exam_mark": 35}
+]
+
+
+def grade_for_percentage(percentage):
+    """Return the letter grade for an overall percentage."""
+    # Standard cutoffs used by the original code
+    if percentage >= 70:
+        return 'A'
+    elif percentage >= 60:
+        return 'B'
+    elif percentage >= 50:
+        return 'C'
+    elif percentage >= 40:
+        return 'D'
+    else:
+        return 'F'
+
+
+def record_text_error(text, field):
+    """Return why `text` cannot be stored as a record field, or None.
+
+    Records are written as comma-separated lines (data files and the
+    journal) with no escaping, so a comma, newline or other control
+    character would split the field or start a forged record.
+    """
+    if ',' in text or any(ord(char) < 32 or ord(char) == 127 for char in text):
+        return f"{field} cannot contain commas or control characters"
+    return None
+
+
+def validate_student(student):
+    """Return why `student` breaks the mark limits, or None if it is valid."""
+    item_max = COURSEWORK_MAX // 3  # each of the three coursework items
+    if not student['name']:
+        return "student name is empty"
+    error = record_text_error(student['name'], "student name")
+    if error:
+        return error
+    if any(not 0 <= mark <= item_max for mark in student['course_marks']):
+        return f"coursework marks must be between 0 and {item_max}"
+    if not 0 <= student['exam_mark'] <= EXAM_MAX:
+        return f"exam mark must be between 0 and {EXAM_MAX}"
+    return None
+
+
+def compute_student_stats(student):
+    """Return a marks-format student's coursework total, percentage and grade."""
+    # Sum the three coursework marks and add the exam mark
+    total_coursework = sum(student['course_marks'])
+    total_marks = total_coursework + student['exam_mark']
+    # Compute percentage against the defined total possible marks
+    percentage = (total_marks / TOTAL_POSSIBLE) * 100
+    return {
+        'total_coursework': total_coursework,
+        'exam_mark': student['exam_mark'],
+        'percentage': percentage,
+        'grade': grade_for_percentage(percentage)
+    }
+
+
+def class_statistics(students):
+    """Return the running statistics of overall percentages in a StudentTable.
+
+    The table keeps them up to date as students are added, changed and
+    deleted, so this is O(1) once built.
+    """
+    return students.statistics('total', TOTAL_POSSIBLE, 100 / TOTAL_POSSIBLE,
+                               grade_for_percentage)
+
+
+def grade_index(students):
+    """Return the grade -> students index of a StudentTable (kept current by the table)."""
+    return students.grade_index('total', grade_for_percentage, 100 / TOTAL_POSSIBLE)
+
+
+def exam_grade(mark):
+    """Return a grade string for a numeric exam mark using simple cutoffs.
+
+    This mapping is intentionally simple: >=90 => A+, >=80 => A, etc.
+    """
+    if mark >= 90:
+        return "A+"
+    elif mark >= 80:
+        return "A"
+    elif mark >= 70:
+        return "B"
+    elif mark >= 60:
+        return "C"
+    elif mark >= 50:
+        return "D"
+    else:
+        return "F"
+
+
+def parse_exam_import_row(fields):
+    """Build an exam-format student from an imported code,name,exam_mark[,grade] row.
+
+    Any grade in the file is ignored and recalculated from the exam mark.
+    """
+    exam_mark = int(fields[2])
+    return {
+        'code': fields[0],
+        'name': fields[1],
+        'exam_mark': exam_mark,
+        'grade': exam_grade(exam_mark)
+    }
+
+
+def validate_exam_record(student):
+    """Return why an exam-format student is invalid, or None if it is fine."""
+    if not student['code']:
+        return "student code is empty"
+    if not student['name']:
+        return "student name is empty"
+    error = (record_text_error(student['code'], "student code")
+             or record_text_error(student['name'], "student name"))
+    if error:
+        return error
+    if not 0 <= student['exam_mark'] <= EXAM_MAX:
+        return f"exam mark must be between 0 and {EXAM_MAX}"
+    return None
+
+
+def apply_edit(students, op, student):
+    """Apply one edit to a table: 'D' deletes by code, 'A'/'U' upsert by code."""
+    index = students.index_of(student['code'])
+    if op == 'D':
+        if index is not None:
+            students.pop(index)
+    elif index is not None:
+        students[index] = student
+    else:
+        students.append(student)
+
+
+def journal_line(op, student):
+    """Return the journal line recording one edit."""
+    if op == 'D':
+        return f"D,{student['code']}\n"
+    return f"{op},{student['code']},{student['name']},{student['course_marks'][0]},{student['course_marks'][1]},{student['course_marks'][2]},{student['exam_mark']}\n"
+
+
+class MarksRepository:
+    """The marks-format roster on disk: a text file plus journal, or SQLite.
+
+    The text file starts with the record count N, then N lines of
+    code,name,mark1,mark2,mark3,exam. Single edits are appended to a
+    journal next to it (see `write_edits`) and folded back in by `compact`
+    or the next full `save`. With `database_file` the roster is kept in a
+    MarksStore instead and there is no journal.
+
+    Other sessions may share the file: reads take its shared lock and
+    writes its exclusive lock and bump its generation. The file state last
+    seen (`disk_signature`) and the roster as it was then (`sync_base`, the
+    base for merges) let a write merge changes made elsewhere rather than
+    overwrite them. `fsync_policy` (see SyncPolicy) decides which writes
+    are synced to the disk; `use_snapshot` keeps a binary snapshot of the
+    file for fast loads.
+    """
+
+    def __init__(self, data_file="studentMarks.txt", database_file=None,
+                 fsync_policy='always', use_snapshot=True):
+        self.data_file = data_file
+        self.journal_file = data_file + ".journal"  # edits since the last full save
+        self.compacting_file = self.journal_file + ".compacting"  # journal being folded in
+        self.use_snapshot = use_snapshot
+        self.store = (MarksStore(database_file, fsync_policy=fsync_policy)
+                      if database_file else None)
+        self.sync_policy = SyncPolicy(fsync_policy)
+        self.shared_file = SharedFile(data_file)
+        self.disk_signature = None
+        self.sync_base = None
+
+    def close(self):
+        """Close the database connection, if any."""
+        if self.store is not None:
+            self.store.close()
+
+    # Loading
+
+    def load(self, report=None):
+        """Read the roster, replaying the journal
+
+        Returns (students, journal_entries), or None if there is no data
+        file (or, with SQLite, nothing to load). The file's generation is
+        remembered, along with a copy of the roster as read, so later writes
+        can tell whether another session changed it.
+        """
+        if report is None:
+            report = LoadReport()
+        if self.store is not None:
+            return self.load_database(report)
+        with self.shared_file.shared():
+            if not os.path.exists(self.data_file):
+                return None
+            signature = self.file_signature()
+            students, journal_entries = self.read_roster(report)
+        self.disk_signature = signature
+        self.sync_base = students.copy()
+        return students, journal_entries
+
+    def file_signature(self):
+        """Return the generation plus (mtime, size) of the data file and its journals
+
+        A different signature means the files changed since it was taken,
+        whether another session or a text editor wrote them. Call with the
+        file lock held.
+        """
+        signature = [self.shared_file.generation()]
+        for path in (self.data_file, self.journal_file, self.compacting_file):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def read_roster(self, report):
+        """Read the data file plus journals into a new table (hold the file lock)
+
+        Returns (students, journal_entries).
+        """
+        # Use the binary snapshot when it was built from the current file
+        students = StudentTable.load_snapshot(self.data_file) if self.use_snapshot else None
+        if students is not None:
+            report.expected = report.loaded = len(students)
+        else:
+            # Stream the file in batches; malformed lines are skipped and
+            # counted in `report`
+            students = self.parse_data_file(report)
+            self.write_snapshot(students)
+
+        # Apply edits logged since the last full save (a journal left over
+        # from an interrupted compaction is replayed first)
+        self.replay_journal(self.compacting_file, students)
+        journal_entries = self.replay_journal(self.journal_file, students)
+        return students, journal_entries
+
+    def parse_data_file(self, report):
+        """Parse the text data file into a new StudentTable."""
+        students = StudentTable()
+        for batch in stream_records(self.data_file, parse_marks_record, min_fields=6,
+                                    has_header=True, report=report):
+            students.extend(batch)
+        return students
+
+    def load_database(self, report):
+        """Load the roster from the SQLite store
+
+        A new database is seeded from the data file when that file exists,
+        so switching backends keeps the existing records. Returns
+        (students, 0), or None if there is nothing to load.
+        """
+        if not self.store.exists() and os.path.exists(self.data_file):
+            students = self.parse_data_file(report)
+            self.replay_journal(self.compacting_file, students)
+            self.replay_journal(self.journal_file, students)
+            self.store.replace_all(students)
+            return students, 0
+
+        students = self.store.load()
+        if not students:
+            return None
+        report.expected = report.loaded = len(students)
+        return students, 0
+
+    def replay_journal(self, journal_file, students):
+        """Apply the edits stored in `journal_file` to the `students` table.
+
+        Adds and updates are applied as upserts keyed on student code and
+        deletes ignore missing codes, so replaying an entry twice (e.g. after a
+        crash during compaction) is harmless. Returns the number of entries.
+        """
+        if not os.path.exists(journal_file):
+            return 0
+
+        entries = 0
+        with open(journal_file, 'r') as file:
+            for line in file:
+                parts = line.strip().split(',')
+                # Skip blank or torn lines (a crash can cut the last append short)
+                if parts[0] == 'D' and len(parts) == 2:
+                    apply_edit(students, 'D', {'code': int(parts[1])})
+                elif parts[0] in ('A', 'U') and len(parts) == 7:
+                    apply_edit(students, parts[0], parse_marks_record(parts[1:]))
+                else:
+                    continue
+                entries += 1
+        return entries
+
+    def read_external_changes(self):
+        """Diff the data file against the roster last seen on disk
+
+        Returns None if the files are unchanged, else (inserted, changed,
+        removed) as given by diff_records. The new contents become the base
+        for later merges.
+        """
+        with self.shared_file.shared():
+            if not os.path.exists(self.data_file):
+                return None
+            signature = self.file_signature()
+            if signature == self.disk_signature:
+                return None
+            theirs, _ = self.read_roster(LoadReport())
+        changes = diff_records(self.sync_base if self.sync_base is not None else (), theirs)
+        self.sync_base = theirs
+        self.disk_signature = signature
+        return changes
+
+    # Writing
+
+    def save(self, students):
+        """Rewrite the data file from `students` and discard the journal
+
+        Changes another session wrote meanwhile are merged in rather than
+        overwritten; the MergeReport is returned in that case, else None.
+        """
+        if self.store is not None:
+            # One transaction replaces the whole table; there is no journal
+            self.store.replace_all(students)
+            return None
+        with self.shared_file.exclusive():
+            students, merge_report = self.merge_external_changes(students)
+            self.write_base_file(students)
+            # The base file now reflects every edit, so the journals are spent
+            for journal_file in (self.journal_file, self.compacting_file):
+                if os.path.exists(journal_file):
+                    os.remove(journal_file)
+            self.mark_written(students)
+        return merge_report
+
+    def merge_external_changes(self, snapshot):
+        """Merge other sessions' changes into `snapshot` (write lock held)
+
+        If the files are as this session last saw them, nobody else wrote
+        and `snapshot` is returned as is. Otherwise the roster on
+        disk is merged with it against `sync_base`. Returns (students,
+        MergeReport or None).
+        """
+        if (self.sync_base is None or not os.path.exists(self.data_file)
+                or self.file_signature() == self.disk_signature):
+            return snapshot, None
+        theirs, _ = self.read_roster(LoadReport())
+        records, merge_report = merge_records(self.sync_base, snapshot, theirs)
+        return StudentTable(records), merge_report
+
+    def mark_written(self, students):
+        """Record that the data file now holds `students` (write lock held)"""
+        self.shared_file.bump_generation(sync=self.sync_policy.due())
+        self.disk_signature = self.file_signature()
+        self.sync_base = students.copy()
+
+    def write_base_file(self, students):
+        """Rewrite the data file from a StudentTable (or list of student dicts).
+
+        The rows go to a temporary file that then replaces the data file
+        (see `atomic_write`), so a crash part-way through never leaves a
+        truncated roster behind. The fsync policy decides whether it is
+        synced.
+        """
+        def write_rows(file):
+            # Write the count line followed by one student per line in CSV format
+            file.write(f"{len(students)}\n")
+            for student in students:
+                # Maintain the same CSV format the original code expected
+                file.write(
+                    f"{student['code']},{student['name']},{student['course_marks'][0]},{student['course_marks'][1]},{student['course_marks'][2]},{student['exam_mark']}\n"
+                )
+
+        atomic_write(self.data_file, write_rows, sync=self.sync_policy.due())
+        if isinstance(students, StudentTable):
+            self.write_snapshot(students)
+
+    def write_snapshot(self, students):
+        """Refresh the binary snapshot of the data file (best-effort cache)"""
+        if not self.use_snapshot:
+            return
+        try:
+            students.save_snapshot(self.data_file)
+        except OSError:
+            # The snapshot is only a start-up cache; the text file stays authoritative
+            pass
+
+    def write_edits(self, changes):
+        """Store a batch of (op, student) edits with one write
+
+        `op` is 'A' (add), 'U' (update) or 'D' (delete). The edits go to the
+        journal in a single append (one sync under the fsync policy), or to
+        the database in one transaction.
+        """
+        if self.store is not None:
+            self.store.apply_edits(changes)
+            return
+        entries = "".join(journal_line(op, student) for op, student in changes)
+        self.write_journal_entry(entries, changes)
+
+    def write_journal_entry(self, entries, changes):
+        """Append journal lines in one write
+
+        Journal entries only carry this session's own edits, so appending
+        never overwrites another session's work. While nobody else has
+        written, `changes` ((op, student) pairs) are applied to `sync_base`
+        too, keeping it equal to what is on disk.
+        """
+        with self.shared_file.exclusive():
+            in_sync = self.file_signature() == self.disk_signature
+            append_text(self.journal_file, entries, sync=self.sync_policy.due())
+            self.shared_file.bump_generation(sync=self.sync_policy.due())
+            if in_sync and self.sync_base is not None:
+                for op, student in changes:
+                    apply_edit(self.sync_base, op, student)
+                self.disk_signature = self.file_signature()
+
+    def compact(self, snapshot):
+        """Rewrite the data file from `snapshot` and drop the old journal
+
+        `snapshot` must hold every edit journaled so far. Like `save`,
+        returns a MergeReport if other sessions' changes had to be merged
+        in, else None.
+        """
+        with self.shared_file.exclusive():
+            if not os.path.exists(self.journal_file):
+                return None
+            snapshot, merge_report = self.merge_external_changes(snapshot)
+            if os.path.exists(self.compacting_file):
+                # An earlier compaction failed: keep its entries ahead of ours
+                with open(self.journal_file, 'r') as source, open(self.compacting_file, 'a') as target:
+                    target.write(source.read())
+                os.remove(self.journal_file)
+            else:
+                os.replace(self.journal_file, self.compacting_file)
+            self.write_base_file(snapshot)
+            # On failure the compacting file stays behind and is replayed on the next load
+            os.remove(self.compacting_file)
+            self.mark_written(snapshot)
+        return merge_report
+
+    def sync_pending_writes(self):
+        """fsync the data file and journal if unsynced writes remain"""
+        if self.sync_policy.pending:
+            sync_files(self.data_file, self.journal_file, self.compacting_file)
+            self.sync_policy.synced()
+
+
+class ExamRepository:
+    """The exam-format roster on disk: a text file, or SQLite.
+
+    The file has one line per student of code,name,exam_mark,grade, and is
+    always rewritten whole. With `database_file` the roster is kept in an
+    ExamStore instead (a new database is first filled from the file).
+
+    Reads take the file's shared lock and saves its exclusive lock. The
+    generation and roster last read or written are kept in `seen`, so a
+    save can merge changes made by other sessions instead of overwriting
+    them. `fsync_policy` and `use_snapshot` work as for MarksRepository.
+    """
+
+    def __init__(self, filename="studentMarks.txt", database_file=None,
+                 fsync_policy='always', use_snapshot=True):
+        self.filename = filename
+        self.use_snapshot = use_snapshot
+        self.store = (ExamStore(database_file, fsync_policy=fsync_policy)
+                      if database_file else None)
+        self.sync_policy = SyncPolicy(fsync_policy)
+        self.shared_file = SharedFile(filename)
+        self.seen = None  # (generation, ExamTable) as last read or written
+
+    def close(self):
+        """Close the database connection, if any."""
+        if self.store is not None:
+            self.store.close()
+
+    def load(self, report=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Return the roster as an ExamTable (empty if there is no file yet).
+
+        Malformed lines are skipped and counted in `report`, which also
+        notes whether the file was missing.
+        """
+        if report is None:
+            report = LoadReport()
+        if self.store is not None and self.store.exists():
+            return self.store.load()
+
+        with self.shared_file.shared():
+            generation = self.shared_file.generation()
+            students = self.read_file(report, batch_size, use_snapshot=self.store is None)
+        if self.store is not None:
+            self.store.replace_all(students)
+        else:
+            self.seen = (generation, students.copy())
+        return students
+
+    def read_file(self, report=None, batch_size=DEFAULT_BATCH_SIZE, use_snapshot=True):
+        """Read the file into an ExamTable (callers hold its lock)."""
+        if report is None:
+            report = LoadReport()
+        if self.use_snapshot and use_snapshot:
+            # A snapshot built from the current file is loaded with one read
+            students = ExamTable.load_snapshot(self.filename)
+            if students is not None:
+                report.loaded = len(students)
+                return students
+
+        students = ExamTable()
+        try:
+            for batch in stream_records(self.filename, parse_exam_record, min_fields=4,
+                                        batch_size=batch_size, report=report):
+                students.extend(batch)
+        except FileNotFoundError:
+            report.missing = True
+        else:
+            self.write_snapshot(students)
+        return students
+
+    def save(self, students, durable=False):
+        """Write `students` (an ExamTable or list of dicts) back to the file.
+
+        The lines go to a temporary file that then replaces the file (see
+        `atomic_write`), under the exclusive lock. If another session
+        changed the file since this one last read or wrote it, their changes
+        are merged into `students` (which is updated in place) and the
+        MergeReport is returned, else None; where both sessions changed the
+        same student, this session's version wins. The fsync policy decides
+        whether the save is synced; `durable=True` always syncs it. With
+        SQLite the database table is replaced in one transaction instead
+        (`write_edits` writes just the edited records).
+        """
+        if self.store is not None:
+            self.store.replace_all(students)
+            return None
+
+        def write_rows(file):
+            for student in students:
+                # Write a CSV line for each student (no escaping is implemented)
+                file.write(f"{student['code']},{student['name']},{student['exam_mark']},{student['grade']}\n")
+
+        merge_report = None
+        with self.shared_file.exclusive():
+            if (self.seen is not None and os.path.exists(self.filename)
+                    and self.shared_file.generation() != self.seen[0]):
+                theirs = self.read_file()
+                records, merge_report = merge_records(self.seen[1], students, theirs)
+                # Take the merged roster in place, so the caller's table has it
+                if isinstance(students, ExamTable):
+                    students.clear()
+                    students.extend(records)
+                else:
+                    students[:] = records
+
+            due = self.sync_policy.due()
+            atomic_write(self.filename, write_rows, sync=due or durable)
+            generation = self.shared_file.bump_generation(sync=due or durable)
+            if durable:
+                self.sync_policy.synced()
+            table = students if isinstance(students, ExamTable) else ExamTable(students)
+            self.seen = (generation, table.copy())
+            self.write_snapshot(table)
+        return merge_report
+
+    def write_edits(self, students, changes, durable=False):
+        """Save `students` after the (op, student) edits in `changes`.
+
+        With SQLite only the edited records are written, in one transaction
+        (`op` 'D' deletes the student's code; 'A' and 'U' upsert the record).
+        The text file has no journal, so it is saved whole as by `save`,
+        whose MergeReport (or None) is returned.
+        """
+        if self.store is not None:
+            self.store.apply_edits(changes)
+            return None
+        return self.save(students, durable)
+
+    def write_snapshot(self, students):
+        """Refresh the binary snapshot of the file (best-effort cache)."""
+        if not self.use_snapshot:
+            return
+        try:
+            students.save_snapshot(self.filename)
+        except OSError:
+            pass
@@ -0,0 +1,1723 @@
+"""Shared helpers for reading and storing student records.
+
+Both the Tkinter app (student-manager.py) and the command-line extension
+(Ex3extension/student-manager-extention.py) import this module so that large
+rosters are handled the same way in each front-end.
+
+Two on-disk formats are in use:
+- marks format (GUI): a first line holding the record count N, then N lines
+  of code,name,mark1,mark2,mark3,exam
+- exam format (CLI): one line per student of code,name,exam_mark,grade
+
+In memory, rosters are kept in column tables (StudentTable / ExamTable)
+rather than a list of dicts: every field lives in a typed array and strings
+are stored once in a shared pool, which costs a few dozen bytes per student
+instead of several hundred. A table can also be written to and read back
+from a binary snapshot file next to the text file, which makes start-up a
+single read instead of a parse of every line.
+
+Instead of the text files, rosters can also be kept in a local SQLite
+database (MarksStore / ExamStore), which answers sorts and rankings with
+indexed queries. Class statistics (see student_stats) and grade indexes
+are kept up to date by the tables themselves as records are added, changed
+and deleted.
+"""
+
+import bisect
+import contextlib
+import csv
+import errno
+import heapq
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections.abc import Sequence
+
+from student_stats import MarkStatistics
+
+# NumPy is optional: when present the column tables use it for whole-column
+# arithmetic, otherwise plain Python loops over the arrays are used
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# File locking for SharedFile: fcntl on POSIX, msvcrt on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+DEFAULT_BATCH_SIZE = 1000  # records handed back per batch by stream_records
+LOCK_ATTEMPTS = 3          # msvcrt LK_LOCK calls (about ten seconds each) before giving up
+MAX_REPORTED_LINES = 20    # malformed line numbers remembered for diagnostics
+
+# Durability of saves (see SyncPolicy)
+FSYNC_POLICIES = ('always', 'batched', 'off')
+DEFAULT_FSYNC_BATCH = 20       # 'batched': writes between syncs at most
+DEFAULT_FSYNC_INTERVAL = 1.0   # 'batched': seconds between syncs at most
+# SQLite's own durability setting for each policy
+_SQLITE_SYNCHRONOUS = {'always': 'FULL', 'batched': 'NORMAL', 'off': 'OFF'}
+
+# Value ranges of the array typecodes used by the column tables
+_TYPE_LIMITS = {'h': (-2 ** 15, 2 ** 15 - 1), 'i': (-2 ** 31, 2 ** 31 - 1)}
+
+# Binary snapshot layout (all little-endian struct fields):
+#   header: magic, format version, byte order of the column data ('l'/'b'),
+#           row count, then the mtime (ns), size, inode, ctime (ns) and
+#           CRC-32 of the text file it was built from
+#   layout: H length + ASCII description of COLUMNS (guards against loading
+#           a snapshot into the wrong kind of table)
+#   columns: for each column, Q length + the raw array bytes
+#   strings: Q count, Q length + the string pool, UTF-8, NUL separated
+SNAPSHOT_MAGIC = b'SRSN'
+SNAPSHOT_VERSION = 2
+_SNAPSHOT_HEADER = struct.Struct('<4sHcxIqqQqI')
+_CRC_CHUNK_BYTES = 1 << 20
+_LENGTH = struct.Struct('<Q')
+_LAYOUT_LENGTH = struct.Struct('<H')
+
+# Record archive layout (see RecordArchive). The data file is a header then
+# fixed-width records; the index file is a header then (code, slot) pairs
+# sorted by code.
+ARCHIVE_MAGIC = b'SRAR'
+ARCHIVE_INDEX_MAGIC = b'SRIX'
+ARCHIVE_VERSION = 1
+ARCHIVE_NAME_BYTES = 48  # longer names are truncated in the archive
+_ARCHIVE_HEADER = struct.Struct('<4sHHII')  # magic, version, record size, slot count, reserved
+_ARCHIVE_RECORD = struct.Struct(f'<i4hB{ARCHIVE_NAME_BYTES}s')  # code, marks, exam, deleted, name
+_INDEX_HEADER = struct.Struct('<4sI')  # magic, entry count
+_INDEX_ENTRY = struct.Struct('<iI')    # code, slot
+
+
+class LoadReport:
+    """Counters collected while streaming a student file.
+
+    `expected` is the N from the header (None for formats without one),
+    `loaded` the number of records parsed and `malformed` the number of
+    non-empty lines that could not be parsed. The first few offending line
+    numbers are kept in `malformed_lines`. Readers that treat a missing
+    file as an empty roster set `missing`.
+    """
+
+    def __init__(self):
+        self.expected = None
+        self.loaded = 0
+        self.malformed = 0
+        self.malformed_lines = []
+        self.missing = False
+
+    def add_malformed(self, line_number):
+        """Count a line that could not be parsed."""
+        self.malformed += 1
+        if len(self.malformed_lines) < MAX_REPORTED_LINES:
+            self.malformed_lines.append(line_number)
+
+    def summary(self):
+        """Return a one-line, human readable description of the load."""
+        text = f"{self.loaded} record(s) loaded"
+        if self.malformed:
+            text += f", {self.malformed} malformed line(s) skipped"
+        if self.expected is not None and self.expected != self.loaded:
+            text += f" (header declared {self.expected})"
+        return text
+
+
+def parse_marks_record(parts):
+    """Build a GUI-format student dict from code,name,mark1,mark2,mark3,exam."""
+    return {
+        'code': int(parts[0]),
+        'name': parts[1],
+        'course_marks': [int(parts[2]), int(parts[3]), int(parts[4])],
+        'exam_mark': int(parts[5])
+    }
+
+
+def parse_exam_record(parts):
+    """Build a CLI-format student dict from code,name,exam_mark,grade."""
+    return {
+        'code': parts[0],
+        'name': parts[1],
+        'exam_mark': int(parts[2]),
+        'grade': parts[3]
+    }
+
+
+def stream_records(filename, parse_record, min_fields, has_header=False,
+                   batch_size=DEFAULT_BATCH_SIZE, report=None):
+    """Yield parsed student records from `filename` in lists of `batch_size`.
+
+    The file is read one line at a time, so memory use depends on the batch
+    size rather than the roster size. When `has_header` is set the first
+    line must be the record count N; it is only checked once iteration
+    starts, and at most N further lines are read, matching the original
+    loader. Lines with fewer than `min_fields` fields or that `parse_record`
+    rejects with ValueError are skipped and counted in `report` (a
+    LoadReport), if one is supplied.
+
+    Raises ValueError if the header is present but not an integer, and
+    lets OSError (e.g. FileNotFoundError) propagate to the caller.
+    """
+    if report is None:
+        report = LoadReport()
+
+    with open(filename, 'r') as file:
+        limit = None
+        if has_header:
+            first_line = file.readline()
+            if not first_line:
+                # An empty file simply has no records
+                return
+            try:
+                limit = int(first_line.strip())
+            except ValueError:
+                raise ValueError(f"Invalid record count header: {first_line.strip()!r}")
+            report.expected = limit
+
+        batch = []
+        # Line numbers are 1-based and include the header when present
+        line_number = 1 if has_header else 0
+        for line in file:
+            line_number += 1
+            if limit is not None and line_number - 1 > limit:
+                break
+            line = line.strip()
+            if not line:
+                # Skip empty lines gracefully
+                continue
+            parts = line.split(',')
+            if len(parts) < min_fields:
+                report.add_malformed(line_number)
+                continue
+            try:
+                record = parse_record(parts)
+            except ValueError:
+                report.add_malformed(line_number)
+                continue
+            report.loaded += 1
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class ImportReport:
+    """Outcome of a bulk import: row counts, rejects and throughput.
+
+    `rejected` holds (line number, reason) pairs for the first
+    MAX_REPORTED_LINES rejected rows; `rejected_count` counts all of them.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.accepted = 0
+        self.rejected_count = 0
+        self.rejected = []
+        self.elapsed = 0.0
+
+    def reject(self, line_number, reason):
+        """Count a rejected row and remember why (for the first few)."""
+        self.rejected_count += 1
+        if len(self.rejected) < MAX_REPORTED_LINES:
+            self.rejected.append((line_number, reason))
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary_lines(self):
+        """Return the report as a list of display lines."""
+        lines = [f"Rows read: {self.rows}",
+                 f"Accepted: {self.accepted}",
+                 f"Rejected: {self.rejected_count}",
+                 f"Time: {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/second)"]
+        if self.rejected:
+            lines.append("")
+            lines.append("Rejected rows:")
+            for line_number, reason in self.rejected:
+                lines.append(f"  line {line_number}: {reason}")
+            if self.rejected_count > len(self.rejected):
+                lines.append(f"  ... and {self.rejected_count - len(self.rejected)} more")
+        return lines
+
+
+def import_records(filename, parse_row, validate, existing_codes, staging, report=None):
+    """Stream a CSV or TSV file of students into the `staging` table.
+
+    Each row is parsed with `parse_row(fields)` (ValueError/IndexError
+    reject the row) and checked with `validate(record)`, which returns an
+    error message or None. Codes already in `existing_codes` (anything
+    supporting `in`, such as a table or a set) or earlier in the file are
+    rejected too. A first row that does not parse is taken to be a header.
+
+    The delimiter is a tab for .tsv files and sniffed from the start of the
+    file otherwise. Nothing is written to disk: the caller merges `staging`
+    into its roster and saves once. Returns the ImportReport.
+    """
+    if report is None:
+        report = ImportReport()
+    started = time.perf_counter()
+
+    with open(filename, 'r', newline='') as file:
+        if filename.lower().endswith('.tsv'):
+            dialect = csv.excel_tab
+        else:
+            try:
+                dialect = csv.Sniffer().sniff(file.read(4096), delimiters=',\t;')
+            except csv.Error:
+                dialect = csv.excel
+            file.seek(0)
+
+        for line_number, fields in enumerate(csv.reader(file, dialect), 1):
+            if not any(field.strip() for field in fields):
+                continue
+            try:
+                record = parse_row([field.strip() for field in fields])
+            except (ValueError, IndexError):
+                if line_number == 1:
+                    # Column titles rather than data
+                    continue
+                report.rows += 1
+                report.reject(line_number, "could not parse fields")
+                continue
+            report.rows += 1
+
+            error = validate(record)
+            if error is None and (record['code'] in existing_codes
+                                  or record['code'] in staging):
+                error = f"duplicate student code {record['code']}"
+            if error is not None:
+                report.reject(line_number, error)
+                continue
+            try:
+                staging.append(record)
+            except ValueError as e:
+                report.reject(line_number, str(e))
+                continue
+            report.accepted += 1
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+class SyncPolicy:
+    """Decides which writes are fsynced before they count as saved.
+
+    - 'always': every write is flushed to the disk (slowest, safest)
+    - 'batched': one write in `batch_size`, or the first one after
+      `interval` seconds, is synced; a crash can lose the writes since then
+    - 'off': syncing is left to the operating system
+
+    Call `due()` once per write to learn whether to sync it. Under
+    'batched', `pending` counts the writes made since the last sync.
+    """
+
+    def __init__(self, mode='always', batch_size=DEFAULT_FSYNC_BATCH,
+                 interval=DEFAULT_FSYNC_INTERVAL):
+        if mode not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {mode!r} "
+                             f"(expected one of {', '.join(FSYNC_POLICIES)})")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending = 0
+        self._last_sync = time.monotonic()
+
+    def due(self):
+        """Register one write and return True if it should be synced."""
+        if self.mode != 'batched':
+            return self.mode == 'always'
+        self.pending += 1
+        if (self.pending >= self.batch_size
+                or time.monotonic() - self._last_sync >= self.interval):
+            self.synced()
+            return True
+        return False
+
+    def synced(self):
+        """Record that everything written so far has reached the disk."""
+        self.pending = 0
+        self._last_sync = time.monotonic()
+
+
+def fsync_directory(path):
+    """Sync the directory holding `path`, so a rename into it is durable.
+
+    Directories cannot be opened for syncing on Windows, where this does
+    nothing.
+    """
+    if os.name == 'nt':
+        return
+    descriptor = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def sync_files(*paths):
+    """fsync each of `paths` that exists (e.g. to settle a batched policy)."""
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, 'ab') as file:
+                os.fsync(file.fileno())
+
+
+def atomic_write(filename, write, sync=True):
+    """Replace `filename` with the text that `write(file)` writes.
+
+    The text goes to a temporary file next to `filename`, which is flushed
+    and fsynced (if `sync`) and then renamed over it. The rename is atomic,
+    so after a crash the file holds either the old or the new contents,
+    never a truncated mix. With `sync` the directory is synced as well, so
+    the rename itself survives a power cut.
+    """
+    temp_file = filename + ".tmp"
+    try:
+        with open(temp_file, 'w') as file:
+            write(file)
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temp_file, filename)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    if sync:
+        fsync_directory(filename)
+
+
+def append_text(filename, text, sync=True):
+    """Append `text` to `filename`, fsyncing it when `sync` is true."""
+    with open(filename, 'a') as file:
+        file.write(text)
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class SharedFile:
+    """Coordinates several processes working on the same data file.
+
+    Locking is advisory and uses a separate `path` + '.lock' file, because
+    the data file itself is replaced on every full save. `shared()` is held
+    while reading and `exclusive()` while writing; any number of readers
+    may hold the lock together, a writer holds it alone. The shared mode
+    has no Windows equivalent: msvcrt only has exclusive locks, so there
+    readers exclude each other as well, and a lock still held by another
+    session after LOCK_ATTEMPTS tries raises TimeoutError. Locks are
+    re-entrant within one SharedFile object, but a shared lock
+    cannot be upgraded to an exclusive one.
+
+    Every write also bumps a generation number kept in `path` + '.gen', so
+    a process can tell whether anybody changed the file since it last read
+    it (compare `generation()` with the number it saw then).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.generation_path = path + '.gen'
+        self._lock_file = None
+        self._depth = 0
+        self._exclusive = False
+
+    @contextlib.contextmanager
+    def shared(self):
+        """Hold the lock for reading."""
+        with self._locked(exclusive=False):
+            yield
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        """Hold the lock for writing."""
+        with self._locked(exclusive=True):
+            yield
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive):
+        if self._depth:
+            if exclusive and not self._exclusive:
+                raise RuntimeError("cannot upgrade a shared lock to an exclusive one")
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            return
+
+        lock_file = open(self.lock_path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            elif msvcrt is not None:
+                lock_file.seek(0)
+                for attempt in range(LOCK_ATTEMPTS):
+                    try:
+                        # LK_LOCK itself gives up after ten one-second retries
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError as e:
+                        if e.errno != errno.EDEADLOCK:
+                            raise
+                        if attempt == LOCK_ATTEMPTS - 1:
+                            raise TimeoutError(f"{self.path} is locked by another session") from e
+            self._lock_file = lock_file
+            self._depth = 1
+            self._exclusive = exclusive
+            try:
+                yield
+            finally:
+                self._depth = 0
+                self._lock_file = None
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            lock_file.close()
+
+    def generation(self):
+        """Return the current generation number (0 if none was written yet)."""
+        try:
+            with open(self.generation_path, 'r') as file:
+                return int(file.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump_generation(self, sync=True):
+        """Advance the generation after a write; hold `exclusive()` meanwhile.
+
+        Returns the new generation number.
+        """
+        generation = self.generation() + 1
+        atomic_write(self.generation_path, lambda file: file.write(f"{generation}\n"), sync=sync)
+        return generation
+
+
+class MergeReport:
+    """Outcome of merging a session's roster with changes made elsewhere.
+
+    `theirs` counts records taken from the other writer, `ours` records
+    where this session's edit was kept, and `conflicts` lists
+    (code, our record, their record) for records both sides changed
+    differently; None stands for a deleted record. Our version is kept for
+    conflicts.
+    """
+
+    def __init__(self):
+        self.theirs = 0
+        self.ours = 0
+        self.conflicts = []
+
+    def summary_lines(self):
+        """Return the report as a list of printable lines."""
+        lines = [f"Changes merged from another session: {self.theirs}",
+                 f"Changes kept from this session: {self.ours}",
+                 f"Conflicts (this session's version kept): {len(self.conflicts)}"]
+        for code, ours, theirs in self.conflicts[:MAX_REPORTED_LINES]:
+            lines.append(f"  {code}: ours {ours if ours is not None else '(deleted)'}; "
+                         f"theirs {theirs if theirs is not None else '(deleted)'}")
+        if len(self.conflicts) > MAX_REPORTED_LINES:
+            lines.append(f"  ... and {len(self.conflicts) - MAX_REPORTED_LINES} more")
+        return lines
+
+
+def merge_records(base, ours, theirs):
+    """Three-way merge of rosters of record dicts keyed by 'code'.
+
+    `base` is the roster both sides started from, `ours` this session's
+    roster and `theirs` the one now on disk. A record changed (or added, or
+    deleted) on one side only takes that side's version; one changed on
+    both sides is a conflict and keeps ours. Returns (records, MergeReport),
+    with the records in `theirs` order followed by our additions.
+    """
+    report = MergeReport()
+    base_by_code = {record['code']: record for record in base}
+    ours_by_code = {record['code']: record for record in ours}
+    merged = []
+
+    def pick(code, mine, other):
+        original = base_by_code.get(code)
+        if mine == original or mine == other:
+            if other != original:
+                report.theirs += 1
+            return other
+        if other != original:
+            report.conflicts.append((code, mine, other))
+        else:
+            report.ours += 1
+        return mine
+
+    seen = set()
+    for record in theirs:
+        code = record['code']
+        seen.add(code)
+        chosen = pick(code, ours_by_code.get(code), record)
+        if chosen is not None:
+            merged.append(chosen)
+    for record in ours:
+        code = record['code']
+        if code not in seen:
+            chosen = pick(code, record, None)
+            if chosen is not None:
+                merged.append(chosen)
+    return merged, report
+
+
+def diff_records(old, new):
+    """Compare two rosters of record dicts keyed by 'code'.
+
+    Returns (inserted, changed, removed): the records of `new` whose code is
+    not in `old`, the records of `new` that differ from `old`'s record with
+    the same code, and the codes found only in `old`.
+    """
+    old_by_code = {record['code']: record for record in old}
+    inserted, changed = [], []
+    for record in new:
+        previous = old_by_code.pop(record['code'], None)
+        if previous is None:
+            inserted.append(record)
+        elif previous != record:
+            changed.append(record)
+    return inserted, changed, list(old_by_code)
+
+
+class SortedView:
+    """Student codes kept ordered by `key(record)`.
+
+    The view holds (key, code) pairs in a sorted list: it is built once with
+    a full sort and then maintained with binary search on every add and
+    discard, so it never needs re-sorting. Equal keys are ordered by code.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._entries = []
+
+    def build(self, records):
+        """Fill the view from an iterable of records."""
+        self._entries = sorted((self.key(record), record['code']) for record in records)
+
+    def add(self, record):
+        """Insert `record` at its sorted position."""
+        bisect.insort(self._entries, (self.key(record), record['code']))
+
+    def discard(self, record):
+        """Remove `record` from the view if it is present."""
+        entry = (self.key(record), record['code'])
+        index = bisect.bisect_left(self._entries, entry)
+        if index < len(self._entries) and self._entries[index] == entry:
+            del self._entries[index]
+
+    def codes(self, reverse=False):
+        """Iterate over the student codes in ascending (or descending) order."""
+        entries = reversed(self._entries) if reverse else self._entries
+        return (code for _, code in entries)
+
+    def positions(self, reverse=False):
+        """Return the codes as a live, indexable sequence (no copy is made)."""
+        return _SortedCodes(self, reverse)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _SortedCodes(Sequence):
+    """Indexable codes of a SortedView, read from its entries on demand."""
+
+    def __init__(self, view, reverse):
+        self._view = view
+        self._reverse = reverse
+
+    def __len__(self):
+        return len(self._view)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        return self._view._entries[~position if self._reverse else position][1]
+
+    def __iter__(self):
+        return self._view.codes(self._reverse)
+
+
+class GradeIndex:
+    """Student codes grouped by grade, where `grade(record)` grades a record.
+
+    Each grade maps to its members' codes (in the order they joined), so
+    listing a grade costs only its own members and an add or discard is
+    O(1). Like SortedView it is built once and then kept current by the
+    table on every insert, delete and update.
+    """
+
+    def __init__(self, grade):
+        self.grade = grade
+        self._members = {}  # grade -> {code: None}, an insertion-ordered set
+
+    def build(self, records):
+        """Fill the index from an iterable of records."""
+        self._members = {}
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        self._members.setdefault(self.grade(record), {})[record['code']] = None
+
+    def discard(self, record):
+        members = self._members.get(self.grade(record))
+        if members is not None:
+            members.pop(record['code'], None)
+
+    def codes(self, grades):
+        """Iterate over the codes of every student with one of `grades`, grade by grade."""
+        for grade in grades:
+            yield from self._members.get(grade, ())
+
+    def count(self, grade):
+        return len(self._members.get(grade, ()))
+
+
+def _trigrams(text):
+    """Return the set of 3-letter substrings of `text`."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Type-ahead search over student names and codes.
+
+    Prefix matches come from three sorted lists of (text, code) pairs --
+    codes, full names and the later words of each name -- searched with
+    binary search, so every student whose code, name or surname starts with
+    the query is found in O(log n) plus the matches themselves. A trigram
+    -> codes map catches everything else (a query in the middle of a name,
+    or one with a typo). Text is compared in lower case. Like SortedView it
+    is built once and kept current by the table on every change.
+    """
+
+    def __init__(self):
+        self._codes = []   # (str(code).lower(), code)
+        self._names = []   # (name.lower(), code)
+        self._words = []   # (word.lower(), code) for every word after the first
+        self._trigrams = {}
+        self._names_by_code = {}
+
+    @staticmethod
+    def _entries(record):
+        code, name = record['code'], record['name'].lower()
+        return ([(str(code).lower(), code)], [(name, code)],
+                [(word, code) for word in name.split()[1:]])
+
+    def build(self, records):
+        """Fill the index from an iterable of records (only 'code' and 'name' are read)."""
+        self.__init__()
+        trigrams = self._trigrams
+        for record in records:
+            code, name = record['code'], record['name'].lower()
+            self._names_by_code[code] = name
+            self._codes.append((str(code).lower(), code))
+            self._names.append((name, code))
+            self._words.extend((word, code) for word in name.split()[1:])
+            for trigram in _trigrams(name):
+                members = trigrams.get(trigram)
+                if members is None:
+                    trigrams[trigram] = {code}
+                else:
+                    members.add(code)
+        # One sort per list, rather than an insort per student
+        for entries in (self._codes, self._names, self._words):
+            entries.sort()
+
+    def add(self, record):
+        for entries, new in zip((self._codes, self._names, self._words), self._entries(record)):
+            for entry in new:
+                bisect.insort(entries, entry)
+        name = record['name'].lower()
+        self._names_by_code[record['code']] = name
+        for trigram in _trigrams(name):
+            self._trigrams.setdefault(trigram, set()).add(record['code'])
+
+    def discard(self, record):
+        code = record['code']
+        if self._names_by_code.get(code) != record['name'].lower():
+            return
+        for entries, old in zip((self._codes, self._names, self._words), self._entries(record)):
+            for entry in old:
+                index = bisect.bisect_left(entries, entry)
+                if index < len(entries) and entries[index] == entry:
+                    del entries[index]
+        del self._names_by_code[code]
+        for trigram in _trigrams(record['name'].lower()):
+            members = self._trigrams.get(trigram)
+            if members is not None:
+                members.discard(code)
+                if not members:
+                    del self._trigrams[trigram]
+
+    @staticmethod
+    def _prefixed(entries, prefix):
+        """Yield the codes of `entries` whose text starts with `prefix`, in text order."""
+        index = bisect.bisect_left(entries, (prefix,))
+        while index < len(entries) and entries[index][0].startswith(prefix):
+            yield entries[index][1]
+            index += 1
+
+    @staticmethod
+    def _equal(entries, text):
+        """Return the codes of `entries` whose text is exactly `text`."""
+        index = bisect.bisect_left(entries, (text,))
+        codes = []
+        while index < len(entries) and entries[index][0] == text:
+            codes.append(entries[index][1])
+            index += 1
+        return codes
+
+    def named(self, name):
+        """Return the codes of every student called `name` (ignoring case)."""
+        return self._equal(self._names, name.strip().lower())
+
+    def search(self, query, limit=20):
+        """Return up to `limit` codes matching `query`, best matches first.
+
+        Ranking: an exact code or full name, then codes and names starting
+        with the query, then names with a later word starting with it (all
+        alphabetical within each group), and last, names sharing most of
+        the query's trigrams.
+        """
+        query = ' '.join(query.lower().split())
+        if not query:
+            return []
+        results = {}  # code -> None, keeps the ranking order
+
+        def take(codes):
+            for code in codes:
+                if len(results) >= limit:
+                    return True
+                results.setdefault(code, None)
+            return len(results) >= limit
+
+        exact = self._equal(self._codes, query) + self._equal(self._names, query)
+        if (take(exact) or take(self._prefixed(self._codes, query))
+                or take(self._prefixed(self._names, query))
+                or take(self._prefixed(self._words, query))):
+            return list(results)
+
+        # Fuzzy matches: students sharing at least half of the query's trigrams
+        wanted = _trigrams(query)
+        shared = {}
+        for trigram in wanted:
+            for code in self._trigrams.get(trigram, ()):
+                shared[code] = shared.get(code, 0) + 1
+        needed = max(1, len(wanted) // 2)
+        ranked = sorted((code for code, count in shared.items()
+                         if count >= needed and code not in results),
+                        key=lambda code: (-shared[code], self._names_by_code[code], code))
+        take(ranked)
+        return list(results)
+
+
+def grade_range(text, grades):
+    """Return the grades selected by `text`, in the order of `grades`.
+
+    `grades` lists every grade from best to worst. `text` is one grade
+    ("B"), a range ("A-C", either way round) or a comma-separated list of
+    those ("A+, A"); case is ignored. Raises ValueError for unknown grades.
+    """
+    lookup = {grade.upper(): position for position, grade in enumerate(grades)}
+    selected = set()
+    for part in text.upper().split(','):
+        ends = [end.strip() for end in part.split('-')]
+        if len(ends) > 2 or not all(end in lookup for end in ends):
+            raise ValueError(f"unknown grade or range: {part.strip()!r}")
+        positions = sorted(lookup[end] for end in ends)
+        selected.update(range(positions[0], positions[-1] + 1))
+    return [grades[position] for position in sorted(selected)]
+
+
+def _file_crc32(path):
+    """Return the CRC-32 of the contents of file `path`."""
+    crc = 0
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(_CRC_CHUNK_BYTES), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+class _ColumnTable:
+    """List-like container storing student records column by column.
+
+    Subclasses describe their layout in COLUMNS as (field, typecode) pairs:
+    an array typecode for integer fields, or None for strings, which are
+    kept as 'I' ids into a pool shared by all string columns. Records go in
+    and come out as plain dicts, so callers keep the same add / delete /
+    update semantics as a list of dicts; note that the dicts are built on
+    access, so changes must be written back with `table[i] = record`.
+
+    The first column must be the student code. A code -> row position hash
+    index backs `index_of` and `in`, so duplicate checks and lookups are
+    O(1). Appends and tail deletions update it in place; anything that
+    shifts rows (a delete or insert in the middle, a sort) or changes a
+    code drops it, and it is rebuilt on the next lookup.
+
+    Sorted views (see SortedView) for each field in SORT_KEYS are built the
+    first time they are asked for and then kept up to date on every insert,
+    delete and update, so presenting the roster in a different order never
+    re-sorts or reorders the stored rows. Running statistics over a score
+    in SCORES (see `statistics`), grade indexes (see `grade_index`) and
+    the name/code search index (see `search_index`) are maintained the same
+    way.
+    """
+
+    COLUMNS = ()
+    SORT_KEYS = {}  # view name -> key function over a record dict
+    SCORES = {}     # score name -> integer score of a record dict
+
+    def __init__(self, records=()):
+        self._columns = [array(typecode or 'I') for _, typecode in self.COLUMNS]
+        # Interned string pool: id -> string, plus the reverse lookup
+        self._strings = []
+        self._string_ids = {}
+        # code -> row position, or None when it needs rebuilding
+        self._code_index = {}
+        # Views built so far: sorted views by name, grade indexes by settings,
+        # the search index under ('search',)
+        self._views = {}
+        # Running statistics built so far: (score name, settings) -> MarkStatistics
+        self._statistics = {}
+        self.extend(records)
+
+    # Conversion between dict records and per-column values
+
+    def _split(self, record):
+        """Return the column values for `record` (a dict) in COLUMNS order."""
+        return [record[field] for field, _ in self.COLUMNS]
+
+    def _join(self, values):
+        """Build a record dict from one row of column values."""
+        return {field: value for (field, _), value in zip(self.COLUMNS, values)}
+
+    def _encode(self, values):
+        """Replace string values by their pool ids and range-check integers.
+
+        Raises ValueError if an integer does not fit its column type, before
+        any column has been touched.
+        """
+        encoded = []
+        for (field, typecode), value in zip(self.COLUMNS, values):
+            if typecode is None:
+                string_id = self._string_ids.get(value)
+                if string_id is None:
+                    string_id = len(self._strings)
+                    self._strings.append(sys.intern(value))
+                    self._string_ids[value] = string_id
+                value = string_id
+            else:
+                low, high = _TYPE_LIMITS[typecode]
+                if not low <= value <= high:
+                    raise ValueError(f"{field} value {value} is out of range")
+            encoded.append(value)
+        return encoded
+
+    def _code_at(self, index):
+        """Return the (decoded) student code stored at row `index`."""
+        code = self._columns[0][index]
+        return self._strings[code] if self.COLUMNS[0][1] is None else code
+
+    def _row(self, index):
+        """Return the decoded column values stored at `index`."""
+        values = []
+        for (_, typecode), column in zip(self.COLUMNS, self._columns):
+            value = column[index]
+            values.append(self._strings[value] if typecode is None else value)
+        return values
+
+    # List protocol
+
+    def __len__(self):
+        return len(self._columns[0])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._join(self._row(index))
+
+    def __setitem__(self, index, record):
+        old_record = self[index]
+        for column, value in zip(self._columns, self._encode(self._split(record))):
+            column[index] = value
+        if record['code'] != old_record['code']:
+            self._code_index = None
+        for view in self._views.values():
+            view.discard(old_record)
+            view.add(record)
+        for (name, *_), stats in self._statistics.items():
+            score = self.SCORES[name]
+            stats.replace(score(old_record), score(record))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, record):
+        """Add `record` (a dict) at the end of the table."""
+        self.insert(len(self), record)
+
+    def extend(self, records):
+        """Append every record from an iterable of dicts."""
+        for record in records:
+            self.append(record)
+
+    def insert(self, index, record):
+        """Insert `record` before position `index`, like list.insert."""
+        size = len(self)
+        for column, value in zip(self._columns, self._encode(self._split(record))):
+            column.insert(index, value)
+        if self._code_index is not None:
+            if index >= size:
+                # Appending: existing positions are unchanged. If the code is
+                # already present the earlier row keeps winning lookups.
+                self._code_index.setdefault(record['code'], size)
+            else:
+                self._code_index = None
+        for view in self._views.values():
+            view.add(record)
+        for (name, *_), stats in self._statistics.items():
+            stats.add(self.SCORES[name](record))
+
+    def pop(self, index=-1):
+        """Remove and return the record at `index`."""
+        size = len(self)
+        position = index + size if index < 0 else index
+        record = self[index]
+        for column in self._columns:
+            del column[index]
+        if self._code_index is not None:
+            if position == size - 1:
+                # Removing the last row shifts nothing else
+                if self._code_index.get(record['code']) == position:
+                    del self._code_index[record['code']]
+            else:
+                self._code_index = None
+        for view in self._views.values():
+            view.discard(record)
+        for (name, *_), stats in self._statistics.items():
+            stats.remove(self.SCORES[name](record))
+        return record
+
+    def remove(self, record):
+        """Remove the row with the same code as `record`."""
+        index = self.index_of(record['code'])
+        if index is None:
+            raise ValueError(f"Student code {record['code']} not in table")
+        self.pop(index)
+
+    def clear(self):
+        """Remove every record and empty the string pool."""
+        self.__init__()
+
+    def copy(self):
+        """Return an independent copy of the table (arrays are copied)."""
+        other = self.__class__()
+        other._columns = [array(column.typecode, column) for column in self._columns]
+        other._strings = list(self._strings)
+        other._string_ids = dict(self._string_ids)
+        other._code_index = None
+        return other
+
+    # Binary snapshots
+
+    SNAPSHOT_TAG = 'table'  # distinguishes the snapshot files of each format
+
+    @classmethod
+    def snapshot_path(cls, source):
+        """Return the snapshot file name used for text file `source`."""
+        return f"{source}.{cls.SNAPSHOT_TAG}.snapshot"
+
+    @classmethod
+    def _layout(cls):
+        return ','.join(f"{field}:{typecode or 'S'}" for field, typecode in cls.COLUMNS).encode('ascii')
+
+    def save_snapshot(self, source):
+        """Write the table as a binary snapshot of text file `source`.
+
+        The snapshot records the current mtime, size, inode and ctime of
+        `source` and a CRC-32 of its contents; call this right after
+        `source` was written from (or parsed into) this table. The file is
+        written to a temporary name and renamed into place.
+        """
+        stat = os.stat(source)
+        crc = _file_crc32(source)
+        layout = self._layout()
+        pool = '\0'.join(self._strings).encode('utf-8')
+        parts = [_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                                       sys.byteorder[0].encode('ascii'), len(self),
+                                       stat.st_mtime_ns, stat.st_size,
+                                       stat.st_ino, stat.st_ctime_ns, crc),
+                 _LAYOUT_LENGTH.pack(len(layout)), layout]
+        for column in self._columns:
+            data = column.tobytes()
+            parts.append(_LENGTH.pack(len(data)))
+            parts.append(data)
+        parts.append(_LENGTH.pack(len(self._strings)))
+        parts.append(_LENGTH.pack(len(pool)))
+        parts.append(pool)
+
+        path = self.snapshot_path(source)
+        # Processes sharing `source` may refresh the snapshot at the same time
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(b''.join(parts))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load_snapshot(cls, source, verify=False):
+        """Return the table stored in the snapshot of `source`, or None.
+
+        The snapshot is read with a single read and its columns are copied
+        straight into arrays. None is returned if there is no snapshot, or it
+        is unreadable, from another format version, byte order or table
+        layout, or was built from a different version of `source` -- the
+        caller then parses the text file and writes a fresh snapshot.
+        Whether `source` changed is decided from its mtime, size, inode and
+        ctime alone, so a cold start never reads the text file. With
+        `verify` the stored CRC-32 of `source` is checked as well, which
+        also catches a rewrite that kept the same size within the file
+        system's timestamp resolution, at the cost of reading the file.
+        """
+        try:
+            stat = os.stat(source)
+            with open(cls.snapshot_path(source), 'rb') as file:
+                data = memoryview(file.read())
+        except OSError:
+            return None
+
+        try:
+            (magic, version, byteorder, rows, mtime_ns, size,
+             inode, ctime_ns, crc) = _SNAPSHOT_HEADER.unpack_from(data, 0)
+            if (magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION
+                    or byteorder != sys.byteorder[0].encode('ascii')
+                    or mtime_ns != stat.st_mtime_ns or size != stat.st_size
+                    or inode != stat.st_ino or ctime_ns != stat.st_ctime_ns
+                    or (verify and crc != _file_crc32(source))):
+                return None
+            offset = _SNAPSHOT_HEADER.size
+            (layout_length,) = _LAYOUT_LENGTH.unpack_from(data, offset)
+            offset += _LAYOUT_LENGTH.size
+            if bytes(data[offset:offset + layout_length]) != cls._layout():
+                return None
+            offset += layout_length
+
+            table = cls()
+            columns = []
+            for column in table._columns:
+                (length,) = _LENGTH.unpack_from(data, offset)
+                offset += _LENGTH.size
+                column.frombytes(data[offset:offset + length])
+                offset += length
+                if len(column) != rows:
+                    return None
+                columns.append(column)
+            (count,) = _LENGTH.unpack_from(data, offset)
+            (length,) = _LENGTH.unpack_from(data, offset + _LENGTH.size)
+            offset += 2 * _LENGTH.size
+            pool = bytes(data[offset:offset + length]).decode('utf-8')
+            strings = pool.split('\0') if count else []
+            if len(strings) != count:
+                return None
+        except (OSError, struct.error, ValueError, UnicodeDecodeError):
+            return None
+
+        table._columns = columns
+        table._strings = strings
+        table._string_ids = {string: string_id for string_id, string in enumerate(strings)}
+        table._code_index = None
+        return table
+
+    def sorted_view(self, name):
+        """Return the SortedView `name` (a SORT_KEYS entry), building it once."""
+        view = self._views.get(name)
+        if view is None:
+            view = SortedView(self.SORT_KEYS[name])
+            view.build(self)
+            self._views[name] = view
+        return view
+
+    def statistics(self, name, max_mark, scale=1.0, grade_for=None):
+        """Return running MarkStatistics of score `name` (a SCORES entry).
+
+        The statistics are built with one pass over the rows the first time
+        they are asked for (with these settings) and then kept up to date
+        on every insert, delete and update, so reading them is O(1).
+        """
+        settings = (name, max_mark, scale, grade_for)
+        stats = self._statistics.get(settings)
+        if stats is None:
+            stats = MarkStatistics(max_mark, scale, grade_for)
+            stats.update(self.scores(name))
+            self._statistics[settings] = stats
+        return stats
+
+    def grade_index(self, name, grade_for, scale=1.0):
+        """Return the GradeIndex grading score `name` by `grade_for(score * scale)`.
+
+        Built with one pass the first time it is asked for, then kept up to
+        date like the sorted views, so `codes(grades)` lists a grade's
+        students without scanning the roster.
+        """
+        settings = ('grades', name, grade_for, scale)
+        index = self._views.get(settings)
+        if index is None:
+            score = self.SCORES[name]
+            index = GradeIndex(lambda record: grade_for(score(record) * scale))
+            index.build(self)
+            self._views[settings] = index
+        return index
+
+    def search_index(self):
+        """Return the SearchIndex over names and codes, building it once."""
+        index = self._views.get(('search',))
+        if index is None:
+            index = SearchIndex()
+            # Only the code and name columns are read, without building full records
+            index.build({'code': code, 'name': name}
+                        for code, name in zip(self.column('code'), self.column('name')))
+            self._views[('search',)] = index
+        return index
+
+    def records_graded(self, name, grade_for, grades, scale=1.0):
+        """Yield the records whose grade (see `grade_index`) is in `grades`."""
+        for code in self.grade_index(name, grade_for, scale).codes(grades):
+            yield self.find(code)
+
+    def scores(self, name):
+        """Return score `name` of every row, in row order."""
+        return [self.SCORES[name](record) for record in self]
+
+    def sorted_records(self, name, reverse=False):
+        """Yield the records in the order of sorted view `name`."""
+        for code in self.sorted_view(name).codes(reverse):
+            yield self.find(code)
+
+    def sort(self, key, reverse=False):
+        """Reorder the rows in place by `key(record)`, like list.sort."""
+        order = sorted(range(len(self)), key=lambda i: key(self[i]), reverse=reverse)
+        self._columns = [array(column.typecode, (column[i] for i in order))
+                         for column in self._columns]
+        self._code_index = None
+
+    def index_of(self, code):
+        """Return the row position of student `code`, or None."""
+        if self._code_index is None:
+            # Rebuild from the code column; the first row with a code wins,
+            # as it would for a front-to-back scan
+            self._code_index = {}
+            for index, existing in enumerate(self.column('code')):
+                self._code_index.setdefault(existing, index)
+        return self._code_index.get(code)
+
+    def find(self, code):
+        """Return the record for student `code`, or None."""
+        index = self.index_of(code)
+        return None if index is None else self[index]
+
+    def __contains__(self, code):
+        return self.index_of(code) is not None
+
+    def column(self, field):
+        """Return the values of one field for every row, in row order.
+
+        Integer columns come back as the underlying array (do not modify it);
+        string columns are decoded into a new list.
+        """
+        for (name, typecode), column in zip(self.COLUMNS, self._columns):
+            if name == field:
+                if typecode is None:
+                    strings = self._strings
+                    return [strings[string_id] for string_id in column]
+                return column
+        raise KeyError(field)
+
+
+class StudentTable(_ColumnTable):
+    """Column table for the marks format used by the Tkinter app.
+
+    Records are dicts with 'code' (int), 'name' (str), 'course_marks'
+    (list of 3 ints) and 'exam_mark' (int).
+    """
+
+    COLUMNS = (('code', 'i'), ('name', None), ('mark1', 'h'),
+               ('mark2', 'h'), ('mark3', 'h'), ('exam_mark', 'h'))
+    SNAPSHOT_TAG = 'marks'
+    # Percentage order is the same as total-mark order, which stays integral
+    SORT_KEYS = {
+        'name': lambda record: record['name'].lower(),
+        'code': lambda record: record['code'],
+        'percentage': lambda record: sum(record['course_marks']) + record['exam_mark']
+    }
+    SCORES = {
+        'total': lambda record: sum(record['course_marks']) + record['exam_mark'],
+        'exam_mark': lambda record: record['exam_mark']
+    }
+
+    def _split(self, record):
+        marks = record['course_marks']
+        return [record['code'], record['name'], marks[0], marks[1], marks[2],
+                record['exam_mark']]
+
+    def _join(self, values):
+        return {
+            'code': values[0],
+            'name': values[1],
+            'course_marks': [values[2], values[3], values[4]],
+            'exam_mark': values[5]
+        }
+
+    def coursework_totals(self):
+        """Return the summed coursework mark of every student, in row order."""
+        mark1, mark2, mark3 = self._columns[2:5]
+        if np is not None:
+            return (np.frombuffer(mark1, dtype=np.int16).astype(np.int64)
+                    + np.frombuffer(mark2, dtype=np.int16)
+                    + np.frombuffer(mark3, dtype=np.int16)).tolist()
+        return [a + b + c for a, b, c in zip(mark1, mark2, mark3)]
+
+    def scores(self, name):
+        # Whole columns at a time rather than record by record
+        if name == 'exam_mark':
+            return self.column('exam_mark')
+        if name == 'total':
+            coursework = self.coursework_totals()
+            return [c + e for c, e in zip(coursework, self.column('exam_mark'))]
+        return super().scores(name)
+
+    def percentages(self, total_possible):
+        """Return every student's overall percentage out of `total_possible`."""
+        coursework = self.coursework_totals()
+        exams = self._columns[5]
+        if np is not None:
+            totals = np.asarray(coursework) + np.frombuffer(exams, dtype=np.int16)
+            return (totals * (100 / total_possible)).tolist()
+        return [(c + e) / total_possible * 100 for c, e in zip(coursework, exams)]
+
+
+class ExamTable(_ColumnTable):
+    """Column table for the exam format used by the command-line extension.
+
+    Records are dicts with 'code' (str), 'name' (str), 'exam_mark' (int) and
+    'grade' (str).
+    """
+
+    COLUMNS = (('code', None), ('name', None), ('exam_mark', 'h'), ('grade', None))
+    SNAPSHOT_TAG = 'exam'
+    SORT_KEYS = {
+        'code': lambda record: record['code'],
+        'name': lambda record: record['name'],
+        'exam_mark': lambda record: record['exam_mark']
+    }
+    SCORES = {'exam_mark': lambda record: record['exam_mark']}
+
+    def scores(self, name):
+        if name == 'exam_mark':
+            return self.column('exam_mark')
+        return super().scores(name)
+
+
+class RecordArchive:
+    """Marks-format student records in a memory-mapped, fixed-width file.
+
+    Every record occupies the same number of bytes, and a companion index
+    file (`path` + '.idx') holds (code, slot) pairs sorted by code. Both
+    files are mapped with mmap, so looking a student up is a binary search
+    over the index followed by one record read: only those pages are
+    touched, however large the archive. Updates and deletes rewrite just
+    that record in place (a delete sets a flag).
+
+    Use `RecordArchive.create` to build an archive, then open it with
+    `RecordArchive(path, writable=True)` to change it. Close it (or use it
+    as a context manager) when done. Changed records reach the mapped
+    pages at once; `fsync_policy` (see SyncPolicy) sets how often they are
+    flushed to the disk, and `flush()` and `close()` flush the rest.
+    """
+
+    def __init__(self, path, writable=False, fsync_policy='always'):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.writable = writable
+        self.sync_policy = SyncPolicy(fsync_policy)
+        self._data_file = None
+        self._index_file = None
+        self._data_map = None
+        self._index_map = None
+        self._open_maps()
+
+    @classmethod
+    def create(cls, path, records):
+        """Write `records` (marks-format dicts) to a new archive at `path`.
+
+        Records whose code already appeared are skipped. Returns the number
+        of records written.
+        """
+        entries = {}
+        with open(path + '.tmp', 'wb') as file:
+            file.write(_ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION,
+                                            _ARCHIVE_RECORD.size, 0, 0))
+            for record in records:
+                if record['code'] in entries:
+                    continue
+                entries[record['code']] = len(entries)
+                file.write(cls._pack(record))
+            file.seek(0)
+            file.write(_ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION,
+                                            _ARCHIVE_RECORD.size, len(entries), 0))
+        cls._write_index(path + '.idx', sorted(entries.items()))
+        os.replace(path + '.tmp', path)
+        return len(entries)
+
+    # Encoding
+
+    @staticmethod
+    def _pack(record, deleted=False):
+        name = record['name'].encode('utf-8')[:ARCHIVE_NAME_BYTES]
+        marks = record['course_marks']
+        return _ARCHIVE_RECORD.pack(record['code'], marks[0], marks[1], marks[2],
+                                    record['exam_mark'], 1 if deleted else 0, name)
+
+    @staticmethod
+    def _unpack(data, offset):
+        code, mark1, mark2, mark3, exam, deleted, name = _ARCHIVE_RECORD.unpack_from(data, offset)
+        if deleted:
+            return None
+        return {
+            'code': code,
+            # A truncated multi-byte character at the end is dropped
+            'name': name.rstrip(b'\0').decode('utf-8', errors='ignore'),
+            'course_marks': [mark1, mark2, mark3],
+            'exam_mark': exam
+        }
+
+    @staticmethod
+    def _write_index(index_path, entries):
+        """Write sorted (code, slot) pairs to a fresh index file."""
+        with open(index_path + '.tmp', 'wb') as file:
+            file.write(_INDEX_HEADER.pack(ARCHIVE_INDEX_MAGIC, len(entries)))
+            for code, slot in entries:
+                file.write(_INDEX_ENTRY.pack(code, slot))
+        os.replace(index_path + '.tmp', index_path)
+
+    # Mapping
+
+    def _open_maps(self):
+        mode, access = ('r+b', mmap.ACCESS_WRITE) if self.writable else ('rb', mmap.ACCESS_READ)
+        self._data_file = open(self.path, mode)
+        self._index_file = open(self.index_path, mode)
+        self._data_map = mmap.mmap(self._data_file.fileno(), 0, access=access)
+        self._index_map = mmap.mmap(self._index_file.fileno(), 0, access=access)
+        magic, version, record_size, self._slots, _ = _ARCHIVE_HEADER.unpack_from(self._data_map, 0)
+        index_magic, self._entries = _INDEX_HEADER.unpack_from(self._index_map, 0)
+        if (magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION
+                or record_size != _ARCHIVE_RECORD.size or index_magic != ARCHIVE_INDEX_MAGIC):
+            self.close()
+            raise ValueError(f"{self.path} is not a student record archive")
+
+    def flush(self):
+        """Flush changed records to the disk."""
+        if self.writable and self._data_map is not None:
+            self._data_map.flush()
+        self.sync_policy.synced()
+
+    def close(self):
+        """Flush any changes, then unmap and close the archive files."""
+        if self.sync_policy.pending:
+            self.flush()
+        for handle in (self._data_map, self._index_map, self._data_file, self._index_file):
+            if handle is not None:
+                handle.close()
+        self._data_map = self._index_map = self._data_file = self._index_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """Number of record slots, including deleted ones."""
+        return self._slots
+
+    # Lookups
+
+    def _entry(self, position):
+        return _INDEX_ENTRY.unpack_from(self._index_map, _INDEX_HEADER.size + position * _INDEX_ENTRY.size)
+
+    def _search(self, code):
+        """Return the slot holding `code` (found by binary search), or None."""
+        low, high = 0, self._entries
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < code:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._entries:
+            entry_code, slot = self._entry(low)
+            if entry_code == code:
+                return slot
+        return None
+
+    def _offset(self, slot):
+        return _ARCHIVE_HEADER.size + slot * _ARCHIVE_RECORD.size
+
+    def get(self, code):
+        """Return the record for student `code`, or None if absent or deleted."""
+        slot = self._search(code)
+        if slot is None:
+            return None
+        return self._unpack(self._data_map, self._offset(slot))
+
+    # Changes (archive must be opened writable)
+
+    def _write_slot(self, slot, record, deleted=False):
+        offset = self._offset(slot)
+        self._data_map[offset:offset + _ARCHIVE_RECORD.size] = self._pack(record, deleted)
+        if self.sync_policy.due():
+            self.flush()
+
+    def update(self, record):
+        """Overwrite the stored record with the same code, in place.
+
+        Returns False if there is no live record with that code.
+        """
+        slot = self._search(record['code'])
+        if slot is None or self._unpack(self._data_map, self._offset(slot)) is None:
+            return False
+        self._write_slot(slot, record)
+        return True
+
+    def delete(self, code):
+        """Mark student `code` as deleted. Returns False if it was not present."""
+        slot = self._search(code)
+        if slot is None:
+            return False
+        record = self._unpack(self._data_map, self._offset(slot))
+        if record is None:
+            return False
+        self._write_slot(slot, record, deleted=True)
+        return True
+
+
+class _SQLiteStore:
+    """Base class for rosters kept in a local SQLite database.
+
+    Subclasses name their TABLE_CLASS (the column table whose COLUMNS give
+    the SQL column names), the SQL table, the indexes to create, a SCORE
+    expression used for ranking, and ORDER_KEYS mapping
+    each sort name to an indexed SQL expression. Every query is a fixed SQL
+    string with `?` parameters, so sqlite3 compiles it once and reuses the
+    prepared statement from its cache afterwards.
+
+    The connection is opened on first use and may be used from another
+    thread than the one that created the store (e.g. a background worker),
+    as long as only one thread uses it at a time. `fsync_policy` (see
+    SyncPolicy) sets how often SQLite syncs its commits to the disk.
+    """
+
+    TABLE_CLASS = None
+    TABLE = ''
+    COLUMN_TYPES = ()  # SQL column definitions, in TABLE_CLASS.COLUMNS order
+    INDEXES = {}       # index name -> indexed column list
+    SCORE = ''         # ranking expression (must match an index exactly)
+    ORDER_KEYS = {}    # sort name -> SQL expression
+
+    def __init__(self, path, fsync_policy='always'):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync_policy!r}")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self._connection = None
+        # Used only to convert between record dicts and rows
+        self._codec = self.TABLE_CLASS()
+        self._fields = ', '.join(field for field, _ in self.TABLE_CLASS.COLUMNS)
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute(f"PRAGMA synchronous = {_SQLITE_SYNCHRONOUS[self.fsync_policy]}")
+            with connection:
+                connection.execute(f"CREATE TABLE IF NOT EXISTS {self.TABLE} "
+                                   f"({', '.join(self.COLUMN_TYPES)})")
+                for name, columns in self.INDEXES.items():
+                    connection.execute(f"CREATE INDEX IF NOT EXISTS {name} "
+                                       f"ON {self.TABLE} ({columns})")
+            self._connection = connection
+        return self._connection
+
+    def exists(self):
+        """Return True if the database file is already on disk."""
+        return os.path.exists(self.path)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __len__(self):
+        return self.connection.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+    def _select(self, clause='', parameters=()):
+        """Yield the records returned by `SELECT <columns> ... <clause>`."""
+        cursor = self.connection.execute(
+            f"SELECT {self._fields} FROM {self.TABLE} {clause}", parameters)
+        while True:
+            rows = cursor.fetchmany(DEFAULT_BATCH_SIZE)
+            if not rows:
+                return
+            for row in rows:
+                yield self._codec._join(row)
+
+    # Whole-roster transfers
+
+    def load(self):
+        """Return every stored record, ordered by code, in a TABLE_CLASS table."""
+        table = self.TABLE_CLASS()
+        table.extend(self._select("ORDER BY code"))
+        return table
+
+    def replace_all(self, records):
+        """Replace the stored roster with `records` in one transaction."""
+        with self.connection as connection:
+            connection.execute(f"DELETE FROM {self.TABLE}")
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {self.TABLE} ({self._fields}) "
+                f"VALUES ({', '.join('?' * len(self.COLUMN_TYPES))})",
+                (self._codec._split(record) for record in records))
+
+    # Single-record changes (each one is its own transaction)
+
+    def upsert(self, record):
+        """Insert `record`, or replace the stored record with the same code."""
+        with self.connection as connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} ({self._fields}) "
+                f"VALUES ({', '.join('?' * len(self.COLUMN_TYPES))})",
+                self._codec._split(record))
+
+    def delete(self, code):
+        """Delete student `code`. Returns False if it was not stored."""
+        with self.connection as connection:
+            cursor = connection.execute(f"DELETE FROM {self.TABLE} WHERE code = ?", (code,))
+        return cursor.rowcount > 0
+
+    def apply_edits(self, edits):
+        """Apply (op, record) edits in one transaction, in order.
+
+        `op` is 'D' to delete the record's code, or anything else ('A' / 'U')
+        to upsert the record.
+        """
+        insert = (f"INSERT OR REPLACE INTO {self.TABLE} ({self._fields}) "
+                  f"VALUES ({', '.join('?' * len(self.COLUMN_TYPES))})")
+        with self.connection as connection:
+            for op, record in edits:
+                if op == 'D':
+                    connection.execute(f"DELETE FROM {self.TABLE} WHERE code = ?",
+                                       (record['code'],))
+                else:
+                    connection.execute(insert, self._codec._split(record))
+
+    # Indexed queries
+
+    def _order_by(self, name, reverse):
+        expression = self.ORDER_KEYS[name]
+        direction = ' DESC' if reverse else ''
+        # Ties are broken by code, like SortedView; the indexes include it
+        if expression == 'code':
+            return f"ORDER BY code{direction}"
+        return f"ORDER BY {expression}{direction}, code{direction}"
+
+    def sorted_records(self, name, reverse=False):
+        """Yield records ordered by ORDER_KEYS[`name`], read along its index."""
+        return self._select(self._order_by(name, reverse))
+
+    def sorted_codes(self, name, reverse=False):
+        """Return the student codes ordered by ORDER_KEYS[`name`]."""
+        cursor = self.connection.execute(
+            f"SELECT code FROM {self.TABLE} {self._order_by(name, reverse)}")
+        return [code for code, in cursor]
+
+    def extreme(self, largest=True):
+        """Return the record with the highest (or lowest) SCORE, or None."""
+        direction = 'DESC' if largest else 'ASC'
+        for record in self._select(f"ORDER BY {self.SCORE} {direction} LIMIT 1"):
+            return record
+        return None
+
+
+class MarksStore(_SQLiteStore):
+    """SQLite storage for the marks format (see StudentTable).
+
+    SCORE is the total mark, which orders students the same way as their
+    overall percentage.
+    """
+
+    TABLE_CLASS = StudentTable
+    TABLE = 'marks'
+    COLUMN_TYPES = ('code INTEGER PRIMARY KEY', 'name TEXT NOT NULL',
+                    'mark1 INTEGER NOT NULL', 'mark2 INTEGER NOT NULL',
+                    'mark3 INTEGER NOT NULL', 'exam_mark INTEGER NOT NULL')
+    SCORE = 'mark1 + mark2 + mark3 + exam_mark'
+    # `code` is the rowid, so every index already ends with it
+    INDEXES = {
+        'marks_name': 'name COLLATE NOCASE',
+        'marks_total': SCORE
+    }
+    ORDER_KEYS = {
+        'name': 'name COLLATE NOCASE',
+        'code': 'code',
+        'percentage': SCORE
+    }
+
+
+class ExamStore(_SQLiteStore):
+    """SQLite storage for the exam format (see ExamTable).
+
+    SCORE is the exam mark, which is also the percentage in this format.
+    """
+
+    TABLE_CLASS = ExamTable
+    TABLE = 'exam_results'
+    COLUMN_TYPES = ('code TEXT PRIMARY KEY', 'name TEXT NOT NULL',
+                    'exam_mark INTEGER NOT NULL', 'grade TEXT NOT NULL')
+    SCORE = 'exam_mark'
+    INDEXES = {
+        'exam_results_name': 'name, code',
+        'exam_results_mark': 'exam_mark, code'
+    }
+    ORDER_KEYS = {
+        'code': 'code',
+        'name': 'name',
+        'exam_mark': 'exam_mark'
+    }
+
+
+def top_k_indices(values, k, largest=True):
+    """Return the positions of the `k` largest (or smallest) `values`.
+
+    Positions come back best first; ties keep their original order. Uses a
+    bounded heap, so it runs in O(N log k) and leaves `values` untouched.
+    """
+    select = heapq.nlargest if largest else heapq.nsmallest
+    return select(k, range(len(values)), key=values.__getitem__)
+
@@ -0,0 +1,242 @@
+"""Class statistics shared by the Tkinter app and the command-line extension.
+
+Marks in both formats are small integers (an exam mark out of 100, or a
+total out of 160), so a MarkStatistics object keeps one counter per
+distinct mark next to exact integer sums (count, sum and sum of squares).
+Every mark is looked at once: the mean and standard deviation come from
+the sums, and the median, quartiles, any percentile, grade distribution and
+histogram are read from the counters afterwards. Memory stays the same
+however many marks are added, and with NumPy installed whole columns are
+added in one vectorized step.
+
+Marks can also be taken out again, in O(1): the record tables keep running
+statistics up to date on every add, update and delete (see
+`student_records._ColumnTable.statistics`), so summaries never rescan the
+roster.
+"""
+
+import bisect
+from itertools import accumulate
+
+# NumPy is optional, as in student_records
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+DEFAULT_HISTOGRAM_BINS = 10
+
+
+class MarkStatistics:
+    """Running summary of integer marks on a nominal 0-`max_mark` scale.
+
+    Values are reported multiplied by `scale`, e.g. 100 / 160 to report
+    totals out of 160 as percentages. Add marks with `add` (one at a time),
+    `update` (any iterable or array) or `add_counts` ((mark, count) pairs,
+    e.g. from a database GROUP BY), and take them out with `remove`. Marks
+    outside 0-`max_mark` are counted like any other; `max_mark` only sets
+    the histogram range.
+
+    With `grade_for` (a function grading a reported value) the number of
+    marks per grade is kept up to date as well, in `grade_counts`.
+    """
+
+    def __init__(self, max_mark, scale=1.0, grade_for=None):
+        self.max_mark = max_mark
+        self.scale = scale
+        self.grade_for = grade_for
+        self.counts = {}  # mark -> number of times it was added
+        self.grade_counts = {}
+        # Exact integer sums, so marks can be removed without drift
+        self.count = 0
+        self._total = 0
+        self._squares = 0
+        # Cached extremes (None when empty)
+        self._minimum = None
+        self._maximum = None
+
+    def _grade(self, mark):
+        return self.grade_for(mark * self.scale)
+
+    def add(self, mark, count=1):
+        """Add `mark` (`count` times)."""
+        if count <= 0:
+            return
+        self.counts[mark] = self.counts.get(mark, 0) + count
+        self.count += count
+        self._total += mark * count
+        self._squares += mark * mark * count
+        if self.grade_for is not None:
+            grade = self._grade(mark)
+            self.grade_counts[grade] = self.grade_counts.get(grade, 0) + count
+        if self._minimum is None or mark < self._minimum:
+            self._minimum = mark
+        if self._maximum is None or mark > self._maximum:
+            self._maximum = mark
+
+    def remove(self, mark):
+        """Take out one occurrence of `mark`; raises ValueError if there is none."""
+        left = self.counts.get(mark, 0) - 1
+        if left < 0:
+            raise ValueError(f"mark {mark} was not added")
+        self.count -= 1
+        self._total -= mark
+        self._squares -= mark * mark
+        if self.grade_for is not None:
+            self.grade_counts[self._grade(mark)] -= 1
+        if left:
+            self.counts[mark] = left
+            return
+        del self.counts[mark]
+        # Only losing the last copy of an extreme needs a look at the others
+        if mark == self._minimum:
+            self._minimum = min(self.counts, default=None)
+        if mark == self._maximum:
+            self._maximum = max(self.counts, default=None)
+
+    def replace(self, old_mark, new_mark):
+        """Change one occurrence of `old_mark` into `new_mark`."""
+        if old_mark != new_mark:
+            self.remove(old_mark)
+            self.add(new_mark)
+
+    def update(self, marks):
+        """Add every mark from an iterable (vectorized when NumPy is present)."""
+        if np is None:
+            for mark in marks:
+                self.add(mark)
+            return
+        data = np.asarray(marks, dtype=np.int64)
+        if data.size:
+            self.add_counts(zip(*(values.tolist() for values in
+                                  np.unique(data, return_counts=True))))
+
+    def add_counts(self, pairs):
+        """Add marks given as (mark, count) pairs."""
+        for mark, count in pairs:
+            self.add(mark, count)
+
+    # Moments
+
+    @property
+    def mean(self):
+        return self._total / self.count * self.scale if self.count else 0.0
+
+    @property
+    def variance(self):
+        """Population variance, in reported units."""
+        if not self.count:
+            return 0.0
+        spread = self.count * self._squares - self._total * self._total
+        return spread / (self.count * self.count) * self.scale ** 2
+
+    @property
+    def std(self):
+        """Population standard deviation, in reported units."""
+        return self.variance ** 0.5
+
+    @property
+    def minimum(self):
+        return None if self._minimum is None else self._minimum * self.scale
+
+    @property
+    def maximum(self):
+        return None if self._maximum is None else self._maximum * self.scale
+
+    # Order statistics (read from the counters)
+
+    def percentiles(self, points=DEFAULT_PERCENTILES):
+        """Return {p: value} for each percentile p in `points` (0-100).
+
+        Uses linear interpolation between the two nearest marks, like
+        NumPy's default method.
+        """
+        if not self.count:
+            return {point: None for point in points}
+        marks = sorted(self.counts)
+        cumulative = list(accumulate(self.counts[mark] for mark in marks))
+
+        def mark_at(rank):
+            # The smallest mark with more than `rank` marks at or below it
+            return marks[bisect.bisect_right(cumulative, rank)]
+
+        result = {}
+        for point in points:
+            rank = point / 100 * (self.count - 1)
+            lower = int(rank)
+            low, high = mark_at(lower), mark_at(min(lower + 1, self.count - 1))
+            result[point] = (low + (high - low) * (rank - lower)) * self.scale
+        return result
+
+    def percentile(self, point):
+        return self.percentiles((point,))[point]
+
+    @property
+    def median(self):
+        return self.percentile(50)
+
+    def quartiles(self):
+        """Return (Q1, median, Q3)."""
+        values = self.percentiles((25, 50, 75))
+        return values[25], values[50], values[75]
+
+    # Distributions
+
+    def grade_distribution(self, grade_for=None, grades=()):
+        """Count marks per grade, where `grade_for(value)` grades a reported value.
+
+        Defaults to the `grade_for` given at construction, whose counts are
+        already kept up to date. `grades` lists the grades to include (in
+        that order) even when no one has them. Returns a dict of grade ->
+        count.
+        """
+        distribution = {grade: 0 for grade in grades}
+        if grade_for is None or grade_for is self.grade_for:
+            for grade, count in self.grade_counts.items():
+                if count:
+                    distribution[grade] = distribution.get(grade, 0) + count
+            return distribution
+        for mark, count in sorted(self.counts.items()):
+            grade = grade_for(mark * self.scale)
+            distribution[grade] = distribution.get(grade, 0) + count
+        return distribution
+
+    def histogram(self, bins=DEFAULT_HISTOGRAM_BINS):
+        """Return `bins` equal-width (low, high, count) bins over the mark range.
+
+        Each bin holds low <= mark < high, except the last, which also
+        holds the maximum mark. Marks outside the range go in the first or
+        last bin.
+        """
+        width = self.max_mark / bins
+        totals = [0] * bins
+        for mark, count in self.counts.items():
+            totals[max(0, min(int(mark / width), bins - 1))] += count
+        return [(i * width * self.scale, (i + 1) * width * self.scale, totals[i])
+                for i in range(bins)]
+
+    def summary(self, points=DEFAULT_PERCENTILES):
+        """Return the headline figures as a dict (values in reported units)."""
+        q1, median, q3 = self.quartiles()
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'std': self.std,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'median': median,
+            'q1': q1,
+            'q3': q3,
+            'percentiles': self.percentiles(points)
+        }
+
+
+def histogram_lines(histogram, width=40, label_format="{:5.1f}-{:5.1f}"):
+    """Render histogram bins as text bar lines, scaled to `width` characters."""
+    peak = max((count for _, _, count in histogram), default=0)
+    lines = []
+    for low, high, count in histogram:
+        bar = '#' * (round(count / peak * width) if peak else 0)
+        lines.append(f"{label_format.format(low, high)} | {bar} {count}")
+    return lines
@@ -0,0 +1,99 @@
+"""Tests for grade filters (student_records.GradeIndex and grade_range)."""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_core import GRADES, compute_student_stats, grade_index
+from student_records import GradeIndex, StudentTable, grade_range
+
+EXAM_GRADES = ('A+', 'A', 'B', 'C', 'D', 'F')
+
+
+def student(code, exam_mark, marks=(10, 10, 10)):
+    return {'code': code, 'name': f"Student {code}", 'course_marks': list(marks),
+            'exam_mark': exam_mark}
+
+
+class GradeRangeTest(unittest.TestCase):
+
+    def test_single_grades_ranges_and_lists(self):
+        self.assertEqual(grade_range('B', GRADES), ['B'])
+        self.assertEqual(grade_range('A-C', GRADES), ['A', 'B', 'C'])
+        self.assertEqual(grade_range('a+, a', EXAM_GRADES), ['A+', 'A'])
+        self.assertEqual(grade_range('F, A-B', GRADES), ['A', 'B', 'F'])
+
+    def test_reversed_and_overlapping_ranges(self):
+        self.assertEqual(grade_range('C-A', GRADES), ['A', 'B', 'C'])
+        self.assertEqual(grade_range(' d - b ,C', GRADES), ['B', 'C', 'D'])
+        self.assertEqual(grade_range('A-A', GRADES), ['A'])
+
+    def test_invalid_selections(self):
+        for text in ('Z', 'A-Z', 'A-B-C', 'A-', '', 'A,,B', 'A+'):
+            with self.assertRaises(ValueError, msg=text):
+                grade_range(text, GRADES)
+
+
+class GradeIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        # Exam marks 90 / 50 / 30 with 30 coursework give A / C / F
+        self.table = StudentTable([student(1, 90), student(2, 50), student(3, 30),
+                                   student(4, 90), student(5, 50)])
+        self.index = grade_index(self.table)
+
+    def members(self, *grades):
+        return list(self.index.codes(grades))
+
+    def brute_force(self, grades):
+        return sorted(record['code'] for record in self.table
+                      if compute_student_stats(record)['grade'] in grades)
+
+    def test_codes_grade_by_grade_in_joining_order(self):
+        self.assertEqual(self.members('A'), [1, 4])
+        self.assertEqual(self.members('C', 'A'), [2, 5, 1, 4])
+        self.assertEqual(self.members(*grade_range('A-C', GRADES)), [1, 4, 2, 5])
+        self.assertEqual(self.members('B'), [])
+        self.assertEqual([self.index.count(grade) for grade in GRADES], [2, 0, 2, 0, 1])
+
+    def test_table_keeps_the_index_current(self):
+        self.table.append(student(6, 70))                           # B
+        self.table[self.table.index_of(1)] = student(1, 30)         # A -> F
+        self.table.pop(self.table.index_of(2))                      # C gone
+        self.assertIs(grade_index(self.table), self.index)
+        self.assertEqual(self.members('A'), [4])
+        self.assertEqual(self.members('B'), [6])
+        self.assertEqual(self.members('C'), [5])
+        self.assertEqual(self.members('F'), [3, 1])
+
+    def test_random_edits_match_brute_force(self):
+        generator = random.Random(3)
+        for _ in range(300):
+            code = generator.randrange(30)
+            record = student(code, generator.randint(0, 100),
+                             [generator.randint(0, 20) for _ in range(3)])
+            index = self.table.index_of(code)
+            if index is None:
+                self.table.append(record)
+            elif generator.random() < 0.6:
+                self.table[index] = record
+            else:
+                self.table.pop(index)
+        for text in ('A', 'A-C', 'D-F', 'A-F'):
+            grades = grade_range(text, GRADES)
+            self.assertEqual(sorted(self.members(*grades)), self.brute_force(grades), text)
+            self.assertEqual(sum(map(self.index.count, grades)), len(self.brute_force(grades)))
+
+    def test_discarding_an_unknown_record_does_nothing(self):
+        index = GradeIndex(lambda record: 'P' if record['exam_mark'] >= 40 else 'F')
+        index.build([student(1, 50)])
+        index.discard(student(2, 50))
+        index.discard(student(3, 10))  # a grade with no members yet
+        self.assertEqual(list(index.codes(['P', 'F'])), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
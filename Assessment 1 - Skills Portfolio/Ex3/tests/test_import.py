@@ -0,0 +1,120 @@
+"""Tests for bulk import (student_records.import_records and ImportReport)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_core import (SAMPLE_STUDENTS, MarksRepository, parse_exam_import_row,
+                          validate_exam_record, validate_student)
+from student_records import ExamTable, StudentTable, import_records, parse_marks_record
+
+# 8439 is already on the roster (SAMPLE_STUDENTS); 1001 appears twice in the file
+CSV_ROWS = """code,name,mark1,mark2,mark3,exam
+1001,Ann Lee,20,19,18,99
+1002,Bob Ray,21,10,10,50
+1003,Cat Day,10,10,10,101
+8439,Jake Again,10,10,10,40
+1001,Ann Twice,1,1,1,1
+1004,Dee Fox,ten,10,10,40
+1005,Eve Kim,0,0,0,0
+"""
+
+
+class ImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.directory, 'studentMarks.txt')
+        self.repository = MarksRepository(self.data_file, fsync_policy='off')
+        self.repository.save(StudentTable(SAMPLE_STUDENTS))
+        self.students, _ = self.repository.load()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        return path
+
+    def import_marks(self, path):
+        staging = StudentTable()
+        report = import_records(path, parse_marks_record, validate_student,
+                                self.students, staging)
+        return staging, report
+
+    def test_csv_rows_are_validated_in_one_pass(self):
+        staging, report = self.import_marks(self.write('new.csv', CSV_ROWS))
+        self.assertEqual([student['code'] for student in staging], [1001, 1005])
+        self.assertEqual((report.rows, report.accepted, report.rejected_count), (7, 2, 5))
+        # Line numbers count the header line
+        self.assertEqual(report.rejected, [
+            (3, "coursework marks must be between 0 and 20"),
+            (4, "exam mark must be between 0 and 100"),
+            (5, "duplicate student code 8439"),
+            (6, "duplicate student code 1001"),
+            (7, "could not parse fields"),
+        ])
+
+    def test_tab_separated_files(self):
+        rows = CSV_ROWS.replace(',', '\t')
+        for name in ('new.tsv', 'new.txt'):  # by extension, then sniffed
+            staging, report = self.import_marks(self.write(name, rows))
+            self.assertEqual([student['code'] for student in staging], [1001, 1005], name)
+            self.assertEqual(report.rejected_count, 5, name)
+
+    def test_report_lines(self):
+        _, report = self.import_marks(self.write('new.csv', CSV_ROWS))
+        lines = report.summary_lines()
+        self.assertEqual(lines[:3], ["Rows read: 7", "Accepted: 2", "Rejected: 5"])
+        self.assertIn("rows/second", lines[3])
+        self.assertGreater(report.rows_per_second, 0)
+        self.assertIn("  line 7: could not parse fields", lines)
+
+    def test_rejected_rows_beyond_the_limit_are_only_counted(self):
+        rows = "".join(f"{2000 + i},Student {i},1,1,1,500\n" for i in range(30))
+        _, report = self.import_marks(self.write('bad.csv', rows))
+        self.assertEqual((report.rejected_count, len(report.rejected)), (30, 20))
+        self.assertEqual(report.summary_lines()[-1], "  ... and 10 more")
+
+    def test_accepted_rows_are_committed_with_one_save(self):
+        staging, _ = self.import_marks(self.write('new.csv', CSV_ROWS))
+        self.students.extend(staging)
+        self.repository.save(self.students)
+        self.assertFalse(os.path.exists(self.repository.journal_file))
+        students, _ = MarksRepository(self.data_file).load()
+        self.assertEqual(len(students), len(SAMPLE_STUDENTS) + 2)
+        self.assertEqual(students.find(1001)['name'], "Ann Lee")
+
+    def test_failed_commit_leaves_the_data_file_untouched(self):
+        with open(self.data_file, 'rb') as file:
+            before = file.read()
+        staging, _ = self.import_marks(self.write('new.csv', CSV_ROWS))
+        self.students.extend(staging)
+        with mock.patch('student_records.os.replace', side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.repository.save(self.students)
+        with open(self.data_file, 'rb') as file:
+            self.assertEqual(file.read(), before)
+        self.assertFalse([name for name in os.listdir(self.directory) if name.endswith('.tmp')])
+
+    def test_exam_format_import_recalculates_grades(self):
+        path = self.write('exam.csv', "S1,Ann,95,F\nS2,Bob,x\nS3,,50\nS1,Ann Again,60\n")
+        staging = ExamTable()
+        report = import_records(path, parse_exam_import_row, validate_exam_record,
+                                set(), staging)
+        self.assertEqual(list(staging), [{'code': 'S1', 'name': 'Ann', 'exam_mark': 95,
+                                          'grade': 'A+'}])
+        self.assertEqual([reason for _, reason in report.rejected],
+                         ["could not parse fields", "student name is empty",
+                          "duplicate student code S1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Tests for the marks-format edit journal (student_core.MarksRepository)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_core import SAMPLE_STUDENTS, MarksRepository, journal_line
+from student_records import StudentTable
+
+
+def student(code, name, marks=(10, 10, 10), exam_mark=50):
+    return {'code': code, 'name': name, 'course_marks': list(marks), 'exam_mark': exam_mark}
+
+
+class JournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.directory, 'studentMarks.txt')
+        self.repository = self.open_repository()
+        self.repository.save(StudentTable(SAMPLE_STUDENTS))
+        self.students, _ = self.repository.load()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open_repository(self):
+        return MarksRepository(self.data_file, fsync_policy='off')
+
+    def reload(self):
+        return self.open_repository().load()
+
+    def test_journal_lines(self):
+        self.assertEqual(journal_line('D', {'code': 1234}), "D,1234\n")
+        self.assertEqual(journal_line('A', student(1234, 'Ann Lee', (1, 2, 3), 40)),
+                         "A,1234,Ann Lee,1,2,3,40\n")
+
+    def test_edits_round_trip_through_the_journal(self):
+        added = student(1111, 'New Student', (20, 19, 18), 99)
+        updated = dict(SAMPLE_STUDENTS[0], exam_mark=88)
+        self.repository.write_edits([('A', added), ('U', updated),
+                                     ('D', {'code': SAMPLE_STUDENTS[1]['code']})])
+        self.assertTrue(os.path.exists(self.repository.journal_file))
+
+        students, journal_entries = self.reload()
+        self.assertEqual(journal_entries, 3)
+        self.assertEqual(students.find(1111), added)
+        self.assertEqual(students.find(updated['code']), updated)
+        self.assertIsNone(students.find(SAMPLE_STUDENTS[1]['code']))
+        self.assertEqual(len(students), len(SAMPLE_STUDENTS))
+
+    def test_replaying_an_entry_twice_is_harmless(self):
+        edit = [('U', dict(SAMPLE_STUDENTS[2], name='Renamed'))]
+        self.repository.write_edits(edit)
+        self.repository.write_edits(edit)
+        self.repository.write_edits([('D', {'code': 4242})])  # not on the roster
+        students, journal_entries = self.reload()
+        self.assertEqual(journal_entries, 3)
+        self.assertEqual(students.find(SAMPLE_STUDENTS[2]['code'])['name'], 'Renamed')
+        self.assertEqual(len(students), len(SAMPLE_STUDENTS))
+
+    def test_torn_last_line_is_skipped(self):
+        self.repository.write_edits([('A', student(2222, 'Kept'))])
+        with open(self.repository.journal_file, 'a') as journal:
+            journal.write("A,3333,Torn")
+        students, journal_entries = self.reload()
+        self.assertEqual(journal_entries, 1)
+        self.assertIsNotNone(students.find(2222))
+        self.assertIsNone(students.find(3333))
+
+    def test_compaction_folds_the_journal_into_the_file(self):
+        added = student(5555, 'Compacted')
+        self.repository.write_edits([('A', added)])
+        self.students.append(added)
+
+        self.assertIsNone(self.repository.compact(self.students.copy()))
+        self.assertFalse(os.path.exists(self.repository.journal_file))
+        self.assertFalse(os.path.exists(self.repository.compacting_file))
+        students, journal_entries = self.reload()
+        self.assertEqual(journal_entries, 0)
+        self.assertEqual(list(students), list(self.students))
+
+    def test_leftover_compacting_journal_is_replayed(self):
+        # A crash during compaction leaves the renamed journal behind
+        self.repository.write_edits([('A', student(6666, 'Recovered'))])
+        os.replace(self.repository.journal_file, self.repository.compacting_file)
+        students, _ = self.reload()
+        self.assertIsNotNone(students.find(6666))
+
+    def test_other_sessions_journal_is_merged_on_save(self):
+        other = self.open_repository()
+        other.load()
+        other.write_edits([('A', student(7777, 'From Elsewhere'))])
+
+        self.students.append(student(8888, 'From Here'))
+        merge_report = self.repository.save(self.students)
+        self.assertIsNotNone(merge_report)
+        self.assertEqual(merge_report.theirs, 1)
+        students, journal_entries = self.reload()
+        self.assertEqual(journal_entries, 0)
+        self.assertIsNotNone(students.find(7777))
+        self.assertIsNotNone(students.find(8888))
+
+
+if __name__ == '__main__':
+    unittest.main()
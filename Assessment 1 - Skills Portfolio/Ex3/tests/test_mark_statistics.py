@@ -0,0 +1,153 @@
+"""Tests for class statistics (student_stats.MarkStatistics), against brute force."""
+
+import os
+import random
+import statistics
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_core import class_statistics
+from student_records import StudentTable
+from student_stats import DEFAULT_PERCENTILES, MarkStatistics, histogram_lines
+
+
+def percentile(marks, point):
+    """Linear interpolation between the closest ranks (NumPy's default)."""
+    ordered = sorted(marks)
+    rank = point / 100 * (len(ordered) - 1)
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def histogram(marks, max_mark, bins):
+    width = max_mark / bins
+    totals = [0] * bins
+    for mark in marks:
+        totals[max(0, min(int(mark / width), bins - 1))] += 1
+    return totals
+
+
+def letter(value):
+    return 'P' if value >= 40 else 'F'
+
+
+class StatisticsTestCase(unittest.TestCase):
+    """A random class of totals out of 160, and a brute-force comparison."""
+
+    def setUp(self):
+        generator = random.Random(5)
+        self.marks = [generator.randint(0, 160) for _ in range(1001)]
+        self.stats = MarkStatistics(160, scale=100 / 160, grade_for=letter)
+        self.stats.update(self.marks)
+
+    def assert_matches(self, stats, marks, scale=100 / 160):
+        values = [mark * scale for mark in marks]
+        self.assertEqual(stats.count, len(marks))
+        self.assertAlmostEqual(stats.mean, statistics.fmean(values))
+        self.assertAlmostEqual(stats.std, statistics.pstdev(values))
+        self.assertAlmostEqual(stats.minimum, min(values))
+        self.assertAlmostEqual(stats.maximum, max(values))
+        for point, value in stats.percentiles(DEFAULT_PERCENTILES + (0, 1, 99, 100)).items():
+            self.assertAlmostEqual(value, percentile(marks, point) * scale, msg=point)
+        self.assertEqual([count for _, _, count in stats.histogram(8)],
+                         histogram(marks, 160, 8))
+        grades = {}
+        for value in values:
+            grades[letter(value)] = grades.get(letter(value), 0) + 1
+        self.assertEqual(stats.grade_distribution(), grades)
+
+
+class MarkStatisticsTest(StatisticsTestCase):
+
+    def test_summary_matches_brute_force(self):
+        self.assert_matches(self.stats, self.marks)
+        summary = self.stats.summary()
+        self.assertAlmostEqual(summary['median'], statistics.median(self.marks) * 100 / 160)
+        self.assertEqual((summary['q1'], summary['median'], summary['q3']), self.stats.quartiles())
+
+    def test_adding_one_at_a_time_or_as_counts_agrees(self):
+        one_by_one = MarkStatistics(160, scale=100 / 160, grade_for=letter)
+        for mark in self.marks:
+            one_by_one.add(mark)
+        counted = MarkStatistics(160, scale=100 / 160, grade_for=letter)
+        counted.add_counts((mark, self.marks.count(mark)) for mark in set(self.marks))
+        for stats in (one_by_one, counted):
+            self.assert_matches(stats, self.marks)
+
+    def test_histogram_bins_and_edges(self):
+        stats = MarkStatistics(100)
+        stats.update([0, 9, 10, 99, 100, 150, -5])
+        bins = stats.histogram(10)
+        self.assertEqual((bins[0][0], bins[0][1], bins[-1][1]), (0, 10, 100))
+        # Out-of-range marks go to the end bins; the maximum is in the last bin
+        self.assertEqual([count for _, _, count in bins], [3, 1, 0, 0, 0, 0, 0, 0, 0, 3])
+        self.assertEqual(histogram_lines([(0, 50, 2), (50, 100, 4)], width=4),
+                         ["  0.0- 50.0 | ## 2", " 50.0-100.0 | #### 4"])
+
+    def test_grade_distribution_lists_requested_grades(self):
+        stats = MarkStatistics(100)
+        stats.update([30, 80])
+        self.assertEqual(stats.grade_distribution(letter, grades=('P', 'M', 'F')),
+                         {'P': 1, 'M': 0, 'F': 1})
+
+    def test_empty(self):
+        stats = MarkStatistics(100)
+        self.assertEqual((stats.count, stats.mean, stats.std), (0, 0.0, 0.0))
+        self.assertIsNone(stats.minimum)
+        self.assertIsNone(stats.median)
+        self.assertEqual(sum(count for _, _, count in stats.histogram()), 0)
+
+
+class RunningStatisticsTest(StatisticsTestCase):
+    """Marks taken out and changed in place, as the record tables do."""
+
+    def test_remove_and_replace_match_brute_force(self):
+        generator = random.Random(9)
+        marks = list(self.marks)
+        for _ in range(600):
+            position = generator.randrange(len(marks))
+            if generator.random() < 0.5:
+                self.stats.remove(marks.pop(position))
+            else:
+                new_mark = generator.randint(0, 160)
+                self.stats.replace(marks[position], new_mark)
+                marks[position] = new_mark
+        self.assert_matches(self.stats, marks)
+
+    def test_extremes_follow_the_last_copy(self):
+        stats = MarkStatistics(100)
+        stats.update([10, 10, 50, 90])
+        stats.remove(90)
+        stats.remove(10)
+        self.assertEqual((stats.minimum, stats.maximum), (10, 50))
+        stats.remove(10)
+        self.assertEqual((stats.minimum, stats.maximum), (50, 50))
+        stats.remove(50)
+        self.assertEqual((stats.count, stats.minimum, stats.maximum, stats.mean), (0, None, None, 0.0))
+
+    def test_removing_a_mark_never_added_is_an_error(self):
+        with self.assertRaises(ValueError):
+            self.stats.remove(161)
+        self.assert_matches(self.stats, self.marks)
+
+    def test_table_keeps_class_statistics_current(self):
+        table = StudentTable({'code': code, 'name': f"S{code}", 'course_marks': [code % 21, 5, 5],
+                              'exam_mark': code % 101} for code in range(300))
+        stats = class_statistics(table)
+        table.append({'code': 1000, 'name': 'New', 'course_marks': [20, 20, 20], 'exam_mark': 100})
+        table[table.index_of(7)] = {'code': 7, 'name': 'S7', 'course_marks': [0, 0, 0],
+                                    'exam_mark': 0}
+        table.pop(table.index_of(42))
+        self.assertIs(class_statistics(table), stats)
+        totals = [sum(student['course_marks']) + student['exam_mark'] for student in table]
+        self.assertEqual(stats.count, len(totals))
+        self.assertAlmostEqual(stats.mean, statistics.fmean(totals) * 100 / 160)
+        self.assertAlmostEqual(stats.std, statistics.pstdev(totals) * 100 / 160)
+        self.assertEqual((stats.minimum, stats.maximum), (0, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
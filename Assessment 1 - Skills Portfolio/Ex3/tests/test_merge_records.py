@@ -0,0 +1,88 @@
+"""Tests for the three-way roster merge (student_records.merge_records)."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_records import diff_records, merge_records
+
+
+def record(code, name, exam_mark=50):
+    return {'code': code, 'name': name, 'exam_mark': exam_mark, 'grade': 'C'}
+
+
+class MergeRecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.base = [record('1', 'Ann'), record('2', 'Bob'), record('3', 'Cat')]
+
+    def test_unchanged_rosters_merge_to_base(self):
+        merged, report = merge_records(self.base, list(self.base), list(self.base))
+        self.assertEqual(merged, self.base)
+        self.assertEqual((report.theirs, report.ours, report.conflicts), (0, 0, []))
+
+    def test_change_on_one_side_takes_that_side(self):
+        ours = [record('1', 'Ann', 90), record('2', 'Bob'), record('3', 'Cat')]
+        theirs = [record('1', 'Ann'), record('2', 'Bob', 10), record('3', 'Cat')]
+        merged, report = merge_records(self.base, ours, theirs)
+        self.assertEqual(merged, [record('1', 'Ann', 90), record('2', 'Bob', 10), record('3', 'Cat')])
+        self.assertEqual((report.ours, report.theirs, report.conflicts), (1, 1, []))
+
+    def test_additions_from_both_sides_are_kept(self):
+        ours = self.base + [record('4', 'Dan')]
+        theirs = self.base + [record('5', 'Eve')]
+        merged, report = merge_records(self.base, ours, theirs)
+        # `theirs` order, then our additions
+        self.assertEqual([r['code'] for r in merged], ['1', '2', '3', '5', '4'])
+        self.assertEqual((report.ours, report.theirs), (1, 1))
+
+    def test_deletion_on_one_side_is_applied(self):
+        ours = [record('1', 'Ann'), record('3', 'Cat')]
+        theirs = [record('1', 'Ann'), record('2', 'Bob')]
+        merged, report = merge_records(self.base, ours, theirs)
+        self.assertEqual([r['code'] for r in merged], ['1'])
+        self.assertEqual((report.ours, report.theirs, report.conflicts), (1, 1, []))
+
+    def test_same_change_on_both_sides_is_not_a_conflict(self):
+        changed = [record('1', 'Ann', 70), record('2', 'Bob'), record('3', 'Cat')]
+        merged, report = merge_records(self.base, changed, list(changed))
+        self.assertEqual(merged, changed)
+        self.assertEqual(report.conflicts, [])
+
+    def test_conflicting_changes_keep_ours(self):
+        ours = [record('1', 'Ann', 80), record('2', 'Bob'), record('3', 'Cat')]
+        theirs = [record('1', 'Ann', 20), record('2', 'Bob'), record('3', 'Cat')]
+        merged, report = merge_records(self.base, ours, theirs)
+        self.assertEqual(merged[0], record('1', 'Ann', 80))
+        self.assertEqual(report.conflicts, [('1', record('1', 'Ann', 80), record('1', 'Ann', 20))])
+
+    def test_our_edit_beats_their_delete(self):
+        ours = [record('1', 'Ann'), record('2', 'Bobby'), record('3', 'Cat')]
+        theirs = [record('1', 'Ann'), record('3', 'Cat')]
+        merged, report = merge_records(self.base, ours, theirs)
+        self.assertIn(record('2', 'Bobby'), merged)
+        self.assertEqual(report.conflicts, [('2', record('2', 'Bobby'), None)])
+
+    def test_our_delete_beats_their_edit(self):
+        ours = [record('1', 'Ann'), record('3', 'Cat')]
+        theirs = [record('1', 'Ann'), record('2', 'Bobby'), record('3', 'Cat')]
+        merged, report = merge_records(self.base, ours, theirs)
+        self.assertNotIn('2', [r['code'] for r in merged])
+        self.assertEqual(report.conflicts, [('2', None, record('2', 'Bobby'))])
+
+
+class DiffRecordsTest(unittest.TestCase):
+
+    def test_reports_inserted_changed_and_removed(self):
+        old = [record('1', 'Ann'), record('2', 'Bob'), record('3', 'Cat')]
+        new = [record('1', 'Ann'), record('2', 'Bob', 99), record('4', 'Dan')]
+        inserted, changed, removed = diff_records(old, new)
+        self.assertEqual(inserted, [record('4', 'Dan')])
+        self.assertEqual(changed, [record('2', 'Bob', 99)])
+        self.assertEqual(removed, ['3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
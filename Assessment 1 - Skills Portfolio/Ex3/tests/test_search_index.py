@@ -0,0 +1,63 @@
+"""Tests for the type-ahead student search (student_records.SearchIndex)."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_records import SearchIndex, StudentTable
+
+
+def student(code, name):
+    return {'code': code, 'name': name, 'course_marks': [10, 10, 10], 'exam_mark': 50}
+
+
+ROSTER = [student(1001, 'Sarah Smith'), student(1002, 'Sam Brown'),
+          student(1003, 'Tom Samson'), student(2001, 'Emma Wilson'),
+          student(1004, 'Sarah Smith'), student(3010, 'Jake Hobbs')]
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.build(ROSTER)
+
+    def test_exact_code_comes_first(self):
+        self.assertEqual(self.index.search('1003')[0], 1003)
+
+    def test_code_prefix(self):
+        self.assertEqual(self.index.search('100'), [1001, 1002, 1003, 1004])
+
+    def test_name_prefix_then_later_words(self):
+        # Names starting with "sam" (alphabetical), then the surname match
+        self.assertEqual(self.index.search('sam'), [1002, 1003])
+
+    def test_exact_name_ignores_case_and_spacing(self):
+        self.assertEqual(self.index.search('  SARAH   smith '), [1001, 1004])
+        self.assertEqual(self.index.named('sarah smith'), [1001, 1004])
+
+    def test_typo_falls_back_to_trigrams(self):
+        self.assertEqual(self.index.search('wilsen')[0], 2001)
+        self.assertEqual(self.index.search('hobs')[0], 3010)
+
+    def test_limit_and_empty_query(self):
+        self.assertEqual(len(self.index.search('s', limit=2)), 2)
+        self.assertEqual(self.index.search('   '), [])
+        self.assertEqual(self.index.search('zzzz'), [])
+
+    def test_table_keeps_the_index_current(self):
+        table = StudentTable(ROSTER)
+        index = table.search_index()
+        table.append(student(4000, 'Zara Quinn'))
+        self.assertEqual(index.search('zara')[0], 4000)
+        table[table.index_of(1002)] = student(1002, 'Samuel Brown')
+        self.assertEqual(index.named('sam brown'), [])
+        self.assertEqual(index.named('samuel brown'), [1002])
+        table.pop(table.index_of(2001))
+        self.assertNotIn(2001, index.search('wilson'))
+
+
+if __name__ == '__main__':
+    unittest.main()
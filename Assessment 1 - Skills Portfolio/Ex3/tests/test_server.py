@@ -0,0 +1,257 @@
+"""Tests for the HTTP service (student-server.py), run in-process."""
+
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+EX3 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, EX3)
+
+from student_core import SAMPLE_STUDENTS, MarksRepository, apply_edit
+from student_records import StudentTable
+
+# The script's name has a hyphen, so it is loaded from its path
+_spec = importlib.util.spec_from_file_location('student_server', os.path.join(EX3, 'student-server.py'))
+server = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(server)
+
+
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.directory, 'studentMarks.txt')
+        MarksRepository(self.data_file, fsync_policy='off').save(StudentTable(SAMPLE_STUDENTS))
+        self.service = server.RosterService(MarksRepository(self.data_file, fsync_policy='off'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            await self.service.start()
+        self.server = await asyncio.start_server(
+            lambda reader, writer: server.handle_connection(self.service, reader, writer),
+            '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+        await self.service.stop()
+        shutil.rmtree(self.directory)
+
+    async def response(self):
+        """Read one response; returns (status, headers, decoded body)."""
+        head = await asyncio.wait_for(self.reader.readuntil(b'\r\n\r\n'), 5)
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1])
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        body = await self.reader.readexactly(int(headers['content-length']))
+        return status, headers, json.loads(body)
+
+    async def request(self, method, target, body=None, raw_body=None):
+        payload = raw_body if raw_body is not None else (
+            json.dumps(body).encode() if body is not None else b'')
+        self.writer.write(f"{method} {target} HTTP/1.1\r\nHost: test\r\n"
+                          f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+        await self.writer.drain()
+        return await self.response()
+
+    async def assert_closed(self):
+        self.assertEqual(await asyncio.wait_for(self.reader.read(), 5), b'')
+
+    def on_disk(self):
+        """The roster as another session would load it now."""
+        students, _ = MarksRepository(self.data_file, use_snapshot=False).load()
+        return students
+
+    async def codes(self, target):
+        status, _, body = await self.request('GET', target)
+        self.assertEqual(status, 200, target)
+        return [student['code'] for student in body['students']]
+
+    def new_student(self, **fields):
+        student = {'code': 1234, 'name': 'Ann Lee', 'course_marks': [10, 12, 14], 'exam_mark': 70}
+        student.update(fields)
+        return student
+
+    async def test_add_then_get_on_one_connection(self):
+        status, headers, body = await self.request('POST', '/students', self.new_student())
+        self.assertEqual(status, 201)
+        self.assertEqual(headers['connection'], 'keep-alive')
+        self.assertEqual(body['name'], 'Ann Lee')
+        status, _, body = await self.request('GET', '/students/1234')
+        self.assertEqual((status, body['exam_mark']), (200, 70))
+
+    async def test_list_is_paged_in_stored_order(self):
+        status, _, body = await self.request('GET', '/students?offset=1&limit=2')
+        self.assertEqual((status, body['total'], body['offset']), (200, 5, 1))
+        self.assertEqual([student['code'] for student in body['students']], [7562, 9123])
+        sarah = body['students'][0]
+        self.assertEqual((sarah['total_coursework'], sarah['percentage'], sarah['grade']),
+                         (45, 76.88, 'A'))
+        # Out-of-range paging is clamped rather than refused
+        self.assertEqual(await self.codes('/students?offset=99'), [])
+        self.assertEqual(len(await self.codes('/students?limit=0')), 1)
+
+    async def test_list_sorted_by_a_maintained_view(self):
+        self.assertEqual(await self.codes('/students?sort=name'),
+                         [6347, 8439, 9123, 7562, 5289])
+        self.assertEqual(await self.codes('/students?sort=percentage&order=desc&limit=2'),
+                         [6347, 7562])
+        self.assertEqual(await self.codes('/students?sort=code&offset=3'), [8439, 9123])
+        status, _, body = await self.request('GET', '/students?sort=grade')
+        self.assertEqual(status, 400)
+        self.assertIn('sort must be one of', body['error'])
+
+    async def test_top_and_bottom_students(self):
+        self.assertEqual(await self.codes('/top?k=2'), [6347, 7562])
+        self.assertEqual(await self.codes('/top?k=1&lowest=1'), [5289])
+        status, _, _ = await self.request('GET', '/top?k=many')
+        self.assertEqual(status, 400)
+
+    async def test_students_by_grade_range(self):
+        status, _, body = await self.request('GET', '/grades/A-C')
+        self.assertEqual((status, body['grades'], body['total']), (200, ['A', 'B', 'C'], 3))
+        self.assertEqual(sorted(student['code'] for student in body['students']),
+                         [6347, 7562, 9123])
+        # A reversed range means the same grades; paging applies across them
+        self.assertEqual(len(await self.codes('/grades/C-A?offset=2')), 1)
+        status, _, body = await self.request('GET', '/grades/Z')
+        self.assertEqual((status, body['error']), (400, "unknown grade or range: 'Z'"))
+
+    async def test_statistics(self):
+        status, _, body = await self.request('GET', '/stats')
+        self.assertEqual((status, body['count'], body['total_possible']), (200, 5, 160))
+        self.assertAlmostEqual(body['mean'], (46.25 + 76.875 + 63.125 + 91.25 + 36.875) / 5)
+        self.assertEqual(body['grades'], {'A': 2, 'B': 1, 'C': 0, 'D': 1, 'F': 1})
+        self.assertEqual(sum(row['count'] for row in body['histogram']), 5)
+
+    async def test_update_and_delete_are_stored(self):
+        status, _, body = await self.request('PUT', '/students/8439', {'exam_mark': 90})
+        self.assertEqual((status, body['name'], body['exam_mark'], body['grade']),
+                         (200, 'Jake Hobbs', 90, 'A'))
+        status, _, _ = await self.request('PUT', '/students/8439', {'code': 1})
+        self.assertEqual(status, 400)
+        status, _, body = await self.request('DELETE', '/students/5289')
+        self.assertEqual((status, body), (200, {'deleted': 5289}))
+        for method in ('GET', 'PUT', 'DELETE'):
+            status, _, _ = await self.request(method, '/students/5289', {'exam_mark': 1})
+            self.assertEqual(status, 404, method)
+        # Both edits were written before they were answered
+        students = self.on_disk()
+        self.assertEqual(students.find(8439)['exam_mark'], 90)
+        self.assertIsNone(students.find(5289))
+
+    async def test_failed_write_is_undone_and_reported(self):
+        before = list(self.service.students)
+        with mock.patch.object(self.service.repository, 'write_edits',
+                               side_effect=OSError("disk full")):
+            # One batch holding an add, an update and a delete
+            results = await asyncio.gather(
+                self.service.change('A', self.new_student()),
+                self.service.change('U', dict(SAMPLE_STUDENTS[0], exam_mark=90)),
+                self.service.change('D', SAMPLE_STUDENTS[1]),
+                return_exceptions=True)
+            self.assertEqual([str(result) for result in results], ["disk full"] * 3)
+            self.assertCountEqual(list(self.service.students), before)
+            self.assertEqual(self.service.pending, [])
+
+            status, headers, body = await self.request('DELETE', '/students/8439')
+            self.assertEqual((status, body), (500, {'error': "disk full"}))
+            self.assertEqual(headers['connection'], 'keep-alive')
+            self.assertIn(8439, self.service.students)
+        self.assertCountEqual(list(self.on_disk()), before)
+
+    async def test_compaction_leaves_out_edits_still_pending(self):
+        status, _, _ = await self.request('PUT', '/students/8439', {'exam_mark': 90})
+        self.assertEqual(status, 200)
+        # Applied in memory but not handed to the writer yet
+        edited = dict(SAMPLE_STUDENTS[2], name='Not Yet Written')
+        previous = self.service.students.find(edited['code'])
+        apply_edit(self.service.students, 'U', edited)
+        future = asyncio.get_running_loop().create_future()
+        self.service.pending.append(('U', edited, previous, future))
+
+        await self.service.compact()
+        self.assertFalse(os.path.exists(self.service.repository.journal_file))
+        students = self.on_disk()
+        self.assertEqual(students.find(8439)['exam_mark'], 90)
+        self.assertEqual(students.find(edited['code'])['name'], 'Mike Johnson')
+        self.assertEqual(self.service.students.find(edited['code'])['name'], 'Not Yet Written')
+
+        # Once written, the pending edit reaches the file too
+        self.service.wakeup.set()
+        await asyncio.wait_for(future, 5)
+        self.assertEqual(self.on_disk().find(edited['code'])['name'], 'Not Yet Written')
+
+    async def test_invalid_records_are_rejected_with_400(self):
+        for student in (self.new_student(name='Lee,Ann'), self.new_student(name='Ann\nD,8439'),
+                        self.new_student(exam_mark=101), self.new_student(course_marks=[1, 2])):
+            status, headers, body = await self.request('POST', '/students', student)
+            self.assertEqual(status, 400, student)
+            self.assertIn('error', body)
+            # A rejected record leaves the connection usable
+            self.assertEqual(headers['connection'], 'keep-alive')
+        self.assertNotIn(1234, self.service.students)
+        self.assertIn(8439, self.service.students)
+
+    async def test_body_that_is_not_json_is_a_400(self):
+        status, headers, body = await self.request('POST', '/students', raw_body=b'{not json')
+        self.assertEqual(status, 400)
+        self.assertEqual(headers['connection'], 'close')
+        await self.assert_closed()
+
+    async def test_malformed_request_line_closes_the_connection(self):
+        self.writer.write(b"garbage\r\n\r\n")
+        status, headers, _ = await self.response()
+        self.assertEqual((status, headers['connection']), (400, 'close'))
+        await self.assert_closed()
+
+    async def test_negative_content_length_is_a_400(self):
+        self.writer.write(b"POST /students HTTP/1.1\r\nContent-Length: -5\r\n\r\n")
+        status, headers, body = await self.response()
+        self.assertEqual((status, headers['connection']), (400, 'close'))
+        self.assertEqual(body['error'], "Content-Length cannot be negative")
+        await self.assert_closed()
+
+    async def test_whole_request_must_arrive_within_the_timeout(self):
+        with mock.patch.object(server, 'IDLE_TIMEOUT', 0.2):
+            reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+            # The request line arrives promptly, the rest of the head never does
+            writer.write(b"GET /students HTTP/1.1\r\nHost: test\r\n")
+            await writer.drain()
+            self.assertEqual(await asyncio.wait_for(reader.read(), 5), b'')
+            writer.close()
+
+    async def test_oversized_body_is_a_413_and_is_not_read_as_a_request(self):
+        # The body itself holds a valid request; it must not be answered
+        smuggled = b"DELETE /students/8439 HTTP/1.1\r\nContent-Length: 0\r\n\r\n"
+        payload = smuggled + b' ' * (server.MAX_BODY + 1 - len(smuggled))
+        self.writer.write(f"POST /students HTTP/1.1\r\nContent-Length: {len(payload)}\r\n\r\n"
+                          .encode() + payload)
+        await self.writer.drain()
+        status, headers, _ = await self.response()
+        self.assertEqual((status, headers['connection']), (413, 'close'))
+        await self.assert_closed()
+        self.assertIn(8439, self.service.students)
+
+    async def test_unknown_resource_and_method(self):
+        status, _, _ = await self.request('GET', '/nowhere')
+        self.assertEqual(status, 404)
+        status, _, _ = await self.request('PATCH', '/students')
+        self.assertEqual(status, 405)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Tests for the binary start-up snapshot (student_records._ColumnTable snapshots)."""
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import student_records
+from student_core import SAMPLE_STUDENTS, MarksRepository
+from student_records import ExamTable, StudentTable
+
+# Header fields: magic, version, byte order, row count, then the stat and CRC of the text file
+HEADER = student_records._SNAPSHOT_HEADER
+VERSION_OFFSET = 4
+CRC_OFFSET = HEADER.size - 4
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.directory, 'studentMarks.txt')
+        self.repository = MarksRepository(self.data_file, fsync_policy='off')
+        self.repository.save(StudentTable(SAMPLE_STUDENTS))
+        self.snapshot = StudentTable.snapshot_path(self.data_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def patch_snapshot(self, offset, fmt, value):
+        with open(self.snapshot, 'r+b') as file:
+            data = bytearray(file.read())
+            struct.pack_into(fmt, data, offset, value)
+            file.seek(0)
+            file.write(data)
+
+    def test_save_writes_a_snapshot_that_loads_back(self):
+        self.assertTrue(os.path.exists(self.snapshot))
+        table = StudentTable.load_snapshot(self.data_file)
+        self.assertEqual(list(table), SAMPLE_STUDENTS)
+        # The loaded table is fully usable, indexes included
+        self.assertEqual(table.find(SAMPLE_STUDENTS[2]['code']), SAMPLE_STUDENTS[2])
+        table.append({'code': 1, 'name': 'New', 'course_marks': [1, 2, 3], 'exam_mark': 4})
+        self.assertEqual(len(table), len(SAMPLE_STUDENTS) + 1)
+
+    def test_cold_start_does_not_read_the_text_file(self):
+        with mock.patch.object(student_records, '_file_crc32') as crc, \
+                mock.patch.object(MarksRepository, 'parse_data_file') as parse:
+            students, _ = MarksRepository(self.data_file).load()
+        crc.assert_not_called()
+        parse.assert_not_called()
+        self.assertEqual(list(students), SAMPLE_STUDENTS)
+
+    def test_editing_the_text_file_makes_the_snapshot_stale(self):
+        with open(self.data_file) as file:
+            text = file.read()
+        with open(self.data_file, 'w') as file:
+            file.write(text.replace("Jake Hobbs", "Jake Hobbes"))
+        self.assertIsNone(StudentTable.load_snapshot(self.data_file))
+        students, _ = MarksRepository(self.data_file).load()
+        self.assertEqual(students.find(8439)['name'], "Jake Hobbes")
+        # The fresh parse rewrote the snapshot
+        self.assertEqual(StudentTable.load_snapshot(self.data_file).find(8439)['name'],
+                         "Jake Hobbes")
+
+    def test_stat_changes_alone_make_it_stale(self):
+        stat = os.stat(self.data_file)
+        os.utime(self.data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(StudentTable.load_snapshot(self.data_file))
+
+    def test_another_format_version_is_ignored(self):
+        self.patch_snapshot(VERSION_OFFSET, '<H', student_records.SNAPSHOT_VERSION + 1)
+        self.assertIsNone(StudentTable.load_snapshot(self.data_file))
+        students, _ = MarksRepository(self.data_file).load()
+        self.assertEqual(list(students), SAMPLE_STUDENTS)
+
+    def test_crc_is_only_checked_on_request(self):
+        self.patch_snapshot(CRC_OFFSET, '<I', 0)
+        self.assertIsNotNone(StudentTable.load_snapshot(self.data_file))
+        self.assertIsNone(StudentTable.load_snapshot(self.data_file, verify=True))
+
+    def test_other_table_layouts_and_damaged_files_are_ignored(self):
+        shutil.copy(self.snapshot, ExamTable.snapshot_path(self.data_file))
+        self.assertIsNone(ExamTable.load_snapshot(self.data_file))
+        with open(self.snapshot, 'r+b') as file:
+            file.truncate(HEADER.size + 10)
+        self.assertIsNone(StudentTable.load_snapshot(self.data_file))
+        os.remove(self.snapshot)
+        self.assertIsNone(StudentTable.load_snapshot(self.data_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Tests for the maintained sort orders (student_records.SortedView)."""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_records import SortedView, StudentTable
+
+
+def student(code, name, marks=(10, 10, 10), exam_mark=50):
+    return {'code': code, 'name': name, 'course_marks': list(marks), 'exam_mark': exam_mark}
+
+
+def brute_force(table, name, reverse=False):
+    """The codes of `table` sorted from scratch, ties broken by code."""
+    key = StudentTable.SORT_KEYS[name]
+    entries = sorted((key(record), record['code']) for record in table)
+    return [code for _, code in (reversed(entries) if reverse else entries)]
+
+
+class SortedViewTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = StudentTable([student(3, 'cat', exam_mark=70), student(1, 'Bob'),
+                                   student(2, 'amy', exam_mark=30), student(4, 'bob')])
+
+    def assert_views_sorted(self):
+        for name in StudentTable.SORT_KEYS:
+            view = self.table.sorted_view(name)
+            for reverse in (False, True):
+                expected = brute_force(self.table, name, reverse)
+                self.assertEqual(list(view.codes(reverse)), expected, (name, reverse))
+                self.assertEqual(list(view.positions(reverse)), expected, (name, reverse))
+
+    def test_built_in_order_with_ties_by_code(self):
+        self.assertEqual(list(self.table.sorted_view('name').codes()), [2, 1, 4, 3])
+        self.assertEqual(list(self.table.sorted_view('percentage').codes(reverse=True)),
+                         [3, 4, 1, 2])
+        self.assert_views_sorted()
+
+    def test_insert_update_and_delete_keep_the_order(self):
+        self.assert_views_sorted()  # build the views before changing the table
+        self.table.append(student(5, 'Aaron', exam_mark=95))
+        self.table.insert(0, student(6, 'Zoe', exam_mark=0))
+        self.assert_views_sorted()
+        self.table[self.table.index_of(1)] = student(1, 'Yves', exam_mark=100)
+        self.assert_views_sorted()
+        self.table.pop(self.table.index_of(3))
+        self.table.remove(student(2, 'amy'))
+        self.assert_views_sorted()
+        self.assertEqual(len(self.table.sorted_view('code')), 4)
+
+    def test_random_edits(self):
+        generator = random.Random(11)
+        self.assert_views_sorted()
+        for step in range(300):
+            code = generator.randrange(40)
+            record = student(code, generator.choice(['ann', 'Ben', 'cy', 'Dot']),
+                             [generator.randint(0, 20) for _ in range(3)],
+                             generator.randint(0, 100))
+            index = self.table.index_of(code)
+            if index is None:
+                self.table.insert(generator.randint(0, len(self.table)), record)
+            elif generator.random() < 0.5:
+                self.table[index] = record
+            else:
+                self.table.pop(index)
+            if step % 25 == 0:
+                self.assert_views_sorted()
+        self.assert_views_sorted()
+
+    def test_positions_are_indexable_and_live(self):
+        positions = self.table.sorted_view('code').positions(reverse=True)
+        self.assertEqual((len(positions), positions[0], positions[-1]), (4, 4, 1))
+        self.assertEqual(positions[1:3], [3, 2])
+        self.table.append(student(9, 'Last'))
+        self.assertEqual((len(positions), positions[0]), (5, 9))
+        with self.assertRaises(IndexError):
+            positions[5]
+
+    def test_discarding_an_absent_record_does_nothing(self):
+        view = SortedView(StudentTable.SORT_KEYS['percentage'])
+        view.build([student(1, 'a'), student(2, 'b')])
+        view.discard(student(7, 'x'))
+        view.discard(student(1, 'a', exam_mark=99))  # not the key it was added with
+        self.assertEqual(list(view.codes()), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
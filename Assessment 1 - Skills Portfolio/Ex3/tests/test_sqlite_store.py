@@ -0,0 +1,146 @@
+"""Tests for the SQLite backends (student_records.MarksStore and ExamStore)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_core import SAMPLE_STUDENTS, MarksRepository
+from student_records import ExamStore, MarksStore, StudentTable
+
+
+def student(code, name, marks=(10, 10, 10), exam_mark=50):
+    return {'code': code, 'name': name, 'course_marks': list(marks), 'exam_mark': exam_mark}
+
+
+class StoreTestCase(unittest.TestCase):
+
+    STORE_CLASS = None
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'studentMarks.db')
+        self.store = self.STORE_CLASS(self.path, fsync_policy='off')
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.store.close()
+        self.store = self.STORE_CLASS(self.path, fsync_policy='off')
+        return self.store
+
+
+class MarksStoreTest(StoreTestCase):
+
+    STORE_CLASS = MarksStore
+
+    def setUp(self):
+        super().setUp()
+        self.store.replace_all(SAMPLE_STUDENTS)
+
+    def test_round_trip_in_code_order(self):
+        self.assertTrue(self.store.exists())
+        students = self.reopen().load()
+        self.assertIsInstance(students, StudentTable)
+        self.assertEqual(list(students), sorted(SAMPLE_STUDENTS, key=lambda s: s['code']))
+        self.assertEqual(len(self.store), len(SAMPLE_STUDENTS))
+
+    def test_replace_all_drops_records_not_given(self):
+        self.store.replace_all([student(1, 'Only One')])
+        self.assertEqual(list(self.reopen().load()), [student(1, 'Only One')])
+
+    def test_single_changes_and_edit_batches(self):
+        self.store.upsert(student(1, 'Ann'))
+        self.store.upsert(dict(SAMPLE_STUDENTS[0], exam_mark=99))
+        self.assertTrue(self.store.delete(SAMPLE_STUDENTS[1]['code']))
+        self.assertFalse(self.store.delete(4242))
+        self.store.apply_edits([('A', student(2, 'Bob')), ('U', student(2, 'Bobby')),
+                                ('D', {'code': 1}), ('D', {'code': 4242})])
+        students = self.reopen().load()
+        self.assertEqual(students.find(SAMPLE_STUDENTS[0]['code'])['exam_mark'], 99)
+        self.assertIsNone(students.find(SAMPLE_STUDENTS[1]['code']))
+        self.assertIsNone(students.find(1))
+        self.assertEqual(students.find(2)['name'], 'Bobby')
+        self.assertEqual(len(students), len(SAMPLE_STUDENTS))
+
+    def test_sorted_codes_follow_the_in_memory_views(self):
+        self.store.upsert(student(1, 'emma wilson', (18, 17, 19), 92))  # ties on name and total
+        table = self.store.load()
+        for name in ('name', 'code', 'percentage'):
+            for reverse in (False, True):
+                expected = list(table.sorted_view(name).codes(reverse))
+                self.assertEqual(self.store.sorted_codes(name, reverse), expected,
+                                 (name, reverse))
+                self.assertEqual([record['code'] for record in
+                                  self.store.sorted_records(name, reverse)], expected)
+
+    def test_extremes_by_total_mark(self):
+        self.assertEqual(self.store.extreme()['name'], 'Emma Wilson')
+        self.assertEqual(self.store.extreme(largest=False)['name'], 'Tom Brown')
+        self.store.replace_all([])
+        self.assertIsNone(self.store.extreme())
+
+
+class ExamStoreTest(StoreTestCase):
+
+    STORE_CLASS = ExamStore
+    ROSTER = [{'code': 'S2', 'name': 'Bob Ray', 'exam_mark': 45, 'grade': 'D'},
+              {'code': 'S1', 'name': 'Ann Lee', 'exam_mark': 82, 'grade': 'A'},
+              {'code': 'S3', 'name': 'Cat Day', 'exam_mark': 91, 'grade': 'A+'}]
+
+    def setUp(self):
+        super().setUp()
+        self.store.replace_all(self.ROSTER)
+
+    def test_round_trip_and_queries(self):
+        self.assertEqual([record['code'] for record in self.reopen().load()], ['S1', 'S2', 'S3'])
+        self.assertEqual(self.store.sorted_codes('exam_mark', reverse=True), ['S3', 'S1', 'S2'])
+        self.assertEqual(self.store.sorted_codes('name'), ['S1', 'S2', 'S3'])
+        self.assertEqual(self.store.extreme(largest=False)['code'], 'S2')
+
+    def test_apply_edits(self):
+        self.store.apply_edits([('U', dict(self.ROSTER[0], exam_mark=95, grade='A+')),
+                                ('D', {'code': 'S3'}),
+                                ('A', {'code': 'S4', 'name': 'Dee', 'exam_mark': 12, 'grade': 'F'})])
+        students = self.reopen().load()
+        self.assertEqual(students.find('S2')['exam_mark'], 95)
+        self.assertIsNone(students.find('S3'))
+        self.assertEqual(self.store.extreme()['code'], 'S2')
+
+
+class DatabaseRepositoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.directory, 'studentMarks.txt')
+        self.database = os.path.join(self.directory, 'studentMarks.db')
+        MarksRepository(self.data_file, fsync_policy='off').save(StudentTable(SAMPLE_STUDENTS))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open_repository(self):
+        return MarksRepository(self.data_file, self.database, fsync_policy='off')
+
+    def test_new_database_is_seeded_from_the_text_file_and_keeps_edits(self):
+        repository = self.open_repository()
+        students, _ = repository.load()
+        self.assertEqual(len(students), len(SAMPLE_STUDENTS))
+        repository.write_edits([('A', student(1, 'Ann')), ('D', SAMPLE_STUDENTS[0])])
+        repository.close()
+
+        repository = self.open_repository()
+        students, _ = repository.load()
+        repository.close()
+        self.assertIsNotNone(students.find(1))
+        self.assertIsNone(students.find(SAMPLE_STUDENTS[0]['code']))
+        self.assertFalse(os.path.exists(repository.journal_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
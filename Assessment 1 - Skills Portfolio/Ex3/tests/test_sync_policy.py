@@ -0,0 +1,119 @@
+"""Tests for durable writes (student_records.atomic_write and SyncPolicy)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_core import SAMPLE_STUDENTS, MarksRepository
+from student_records import StudentTable, SyncPolicy, atomic_write
+
+
+class SyncPolicyTest(unittest.TestCase):
+
+    def test_always_and_off(self):
+        always, off = SyncPolicy('always'), SyncPolicy('off')
+        self.assertEqual([always.due() for _ in range(3)], [True] * 3)
+        self.assertEqual([off.due() for _ in range(3)], [False] * 3)
+        self.assertEqual((always.pending, off.pending), (0, 0))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            SyncPolicy('sometimes')
+
+    def test_batched_syncs_one_write_in_batch_size(self):
+        policy = SyncPolicy('batched', batch_size=3, interval=3600)
+        self.assertEqual([policy.due() for _ in range(7)],
+                         [False, False, True, False, False, True, False])
+        self.assertEqual(policy.pending, 1)
+        policy.synced()
+        self.assertEqual(policy.pending, 0)
+
+    def test_batched_syncs_the_first_write_after_the_interval(self):
+        with mock.patch('student_records.time.monotonic', return_value=100.0) as clock:
+            policy = SyncPolicy('batched', batch_size=100, interval=1.0)
+            self.assertFalse(policy.due())
+            clock.return_value = 100.5
+            self.assertFalse(policy.due())
+            clock.return_value = 101.0
+            self.assertTrue(policy.due())
+            self.assertEqual(policy.pending, 0)
+            # The interval restarts from that sync
+            clock.return_value = 101.5
+            self.assertFalse(policy.due())
+
+
+class AtomicWriteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'marks.txt')
+        with open(self.path, 'w') as file:
+            file.write("old\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def contents(self):
+        with open(self.path) as file:
+            return file.read()
+
+    def test_replaces_the_file_and_syncs_it(self):
+        with mock.patch('student_records.os.fsync', wraps=os.fsync) as fsync:
+            atomic_write(self.path, lambda file: file.write("new\n"))
+        self.assertEqual(self.contents(), "new\n")
+        self.assertGreaterEqual(fsync.call_count, 1)
+        self.assertEqual(os.listdir(self.directory), ['marks.txt'])
+
+    def test_without_sync_nothing_is_fsynced(self):
+        with mock.patch('student_records.os.fsync') as fsync:
+            atomic_write(self.path, lambda file: file.write("new\n"), sync=False)
+        self.assertEqual(self.contents(), "new\n")
+        fsync.assert_not_called()
+
+    def test_a_failed_write_keeps_the_old_file(self):
+        def write(file):
+            file.write("half of the ")
+            raise ValueError("bad record")
+
+        with self.assertRaises(ValueError):
+            atomic_write(self.path, write)
+        self.assertEqual(self.contents(), "old\n")
+        self.assertEqual(os.listdir(self.directory), ['marks.txt'])
+
+
+class BatchedRepositoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.repository = MarksRepository(os.path.join(self.directory, 'studentMarks.txt'),
+                                          fsync_policy='batched', use_snapshot=False)
+        self.repository.save(StudentTable(SAMPLE_STUDENTS))
+        self.repository.sync_pending_writes()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_journal_writes_are_synced_later_in_one_go(self):
+        edit = [('U', dict(SAMPLE_STUDENTS[0], exam_mark=1))]
+        with mock.patch('student_records.os.fsync') as fsync:
+            for _ in range(3):
+                self.repository.write_edits(edit)
+            fsync.assert_not_called()
+            self.assertGreater(self.repository.sync_policy.pending, 0)
+
+            self.repository.sync_pending_writes()
+            # The data file and the journal (there is no compacting journal)
+            self.assertEqual(fsync.call_count, 2)
+            self.assertEqual(self.repository.sync_policy.pending, 0)
+
+            self.repository.sync_pending_writes()
+            self.assertEqual(fsync.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
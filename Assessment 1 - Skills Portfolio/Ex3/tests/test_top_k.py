@@ -0,0 +1,46 @@
+"""Tests for ranking by a bounded heap (student_records.top_k_indices)."""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from student_records import top_k_indices
+
+
+class TopKIndicesTest(unittest.TestCase):
+
+    def test_best_first(self):
+        values = [40, 90, 10, 75, 60]
+        self.assertEqual(top_k_indices(values, 3), [1, 3, 4])
+        self.assertEqual(top_k_indices(values, 2, largest=False), [2, 0])
+
+    def test_ties_keep_their_original_order(self):
+        values = [50, 70, 50, 70, 50]
+        self.assertEqual(top_k_indices(values, 3), [1, 3, 0])
+        self.assertEqual(top_k_indices(values, 4, largest=False), [0, 2, 4, 1])
+
+    def test_k_beyond_the_length_and_empty_input(self):
+        self.assertEqual(top_k_indices([3, 1, 2], 10), [0, 2, 1])
+        self.assertEqual(top_k_indices([3, 1, 2], 0), [])
+        self.assertEqual(top_k_indices([], 5), [])
+
+    def test_matches_a_stable_sort(self):
+        generator = random.Random(7)
+        values = [generator.randint(0, 20) for _ in range(500)]
+        for k in (1, 10, 499, 500):
+            for largest in (True, False):
+                sign = -1 if largest else 1
+                expected = sorted(range(len(values)), key=lambda i: sign * values[i])
+                self.assertEqual(top_k_indices(values, k, largest), expected[:k], (k, largest))
+
+    def test_values_are_left_untouched(self):
+        values = [5, 3, 9]
+        top_k_indices(values, 2)
+        self.assertEqual(values, [5, 3, 9])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,62 @@
+import argparse
+import contextlib
+import io
+import json
 import os
+import pydoc
+import shlex
+import shutil
 import sys
+import time
+from itertools import islice
 
+# The record helpers are shared with the Ex3 GUI app, which lives next door
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Ex3'))
+from student_core import (EXAM_GRADES as GRADES, ExamRepository,
+                          exam_grade as calculate_grade, parse_exam_import_row,
+                          record_text_error, validate_exam_record)
+from student_records import (DEFAULT_BATCH_SIZE, ExamTable, LoadReport, atomic_write,
+                             grade_range, import_records, top_k_indices)
+from student_stats import histogram_lines
+
+
+# Keep a binary snapshot next to the data file so start-up skips parsing
+USE_SNAPSHOT = True
+
+# How often saves are fsynced: "always", "batched" (every few saves) or
+# "off" (left to the operating system)
+FSYNC_POLICY = "always"
+
+# Edits (options 6-8) are not saved one by one: the roster is saved once
+# AUTOSAVE_MAX_EDITS edits are waiting, or at the first menu action after
+# the oldest unsaved edit is AUTOSAVE_DELAY seconds old, and always on exit
+AUTOSAVE_DELAY = 30.0
+AUTOSAVE_MAX_EDITS = 10
+_unsaved_edits = []  # (op, student) edits not saved yet; see mark_dirty
+_dirty_since = None  # time.monotonic() of the oldest unsaved edit
+
+# Where records are kept: "text" (the studentMarks.txt file) or "sqlite"
+# (DATABASE_FILE, which answers sorts and rankings with indexed queries)
+STORAGE_BACKEND = "text"
+DATABASE_FILE = "studentMarks.db"
+
+# Reading and writing the roster is done by student_core.ExamRepository,
+# one per data file. Other sessions (this CLI or the GUI) may share the
+# file; the repository remembers what it last read or wrote, so a save can
+# spot changes made elsewhere and merge them instead of overwriting them.
+_repositories = {}
+
+def get_repository(filename="studentMarks.txt"):
+    """Return the repository for `filename`, set up from the options above."""
+    if filename not in _repositories:
+        _repositories[filename] = ExamRepository(
+            filename, DATABASE_FILE if STORAGE_BACKEND == "sqlite" else None,
+            fsync_policy=FSYNC_POLICY, use_snapshot=USE_SNAPSHOT)
+    return _repositories[filename]
+
+def get_store():
+    """Return the SQLite store when that backend is selected, else None."""
+    return get_repository().store
 
 # Terminal color helpers: use ANSI escape sequences where supported.
 # Some Windows consoles require enabling VT processing; we attempt that.
@@ -44,6 +100,17 @@ if os.name == 'nt':
 else:
     USE_COLOR = True
 
+# Listings are formatted into a buffer and written DISPLAY_CHUNK_ROWS rows
+# at a time, a few large writes rather than one per line. Setting
+# PAGE_LONG_LISTINGS shows a listing taller than the terminal through a
+# pager (the PAGER environment variable, else less or more); it is off by
+# default so listings print exactly as they always have.
+DISPLAY_CHUNK_ROWS = 5000
+PAGE_LONG_LISTINGS = False
+TABLE_RULE = "-" * 60
+TABLE_TITLE = f"{'Code':<10} {'Name':<20} {'Exam Mark':<10} {'Grade':<5}"
+ROW_FORMAT = "{:<10} {:<20} {:<10} {:<5}\n"
+
 def styled_bg(text, bg_code):
     """Return text wrapped in a background color if colors are enabled.
 
@@ -54,91 +121,168 @@ def styled_bg(text, bg_code):
         return text
     return f"{bg_code}{ANSI_BOLD}{text}{ANSI_RESET}"
 
-def load_students(filename="studentMarks.txt"):
+def load_students(filename="studentMarks.txt", batch_size=DEFAULT_BATCH_SIZE):
     """Load student records from file.
 
     Each non-empty line is expected to be CSV with at least 4 fields:
     code,name,exam_mark,grade
-    The function skips empty/malformed lines and returns a list of student
+    Records are streamed from disk in batches (see
+    `student_records.stream_records`) rather than read in one go. Empty
+    lines are skipped; malformed ones are skipped and counted, with a
+    warning printed if any were found. The records are returned in an
+    ExamTable, a column-wise store that behaves like a list of student
     dictionaries. FileNotFoundError is handled gracefully by returning an
-    empty list and printing a warning.
+    empty table and printing a warning. When a binary snapshot (see
+    `ExamTable.load_snapshot`) matches the file it is used instead.
+
+    The file is read under a shared lock, and its generation is noted so
+    that `save_students` can detect changes made by other sessions.
+
+    With the SQLite backend the records come from the database; a new
+    database is first filled from `filename`, if that file exists.
     """
-    students = []
-    try:
-        with open(filename, 'r') as file:
-            for line in file:
-                # Skip empty lines
-                if line.strip():
-                    parts = line.strip().split(',')
-                    # Only accept lines that have at least the four expected fields
-                    if len(parts) >= 4:
-                        # Convert the numeric exam field to int, allow exceptions to bubble
-                        student = {
-                            'code': parts[0],
-                            'name': parts[1],
-                            'exam_mark': int(parts[2]),
-                            'grade': parts[3]
-                        }
-                        students.append(student)
-    except FileNotFoundError:
+    report = LoadReport()
+    students = get_repository(filename).load(report, batch_size)
+    if report.missing:
         print(f"Warning: {filename} not found. Starting with empty student list.")
+    if report.malformed:
+        print(f"Warning: skipped {report.malformed} malformed line(s) in {filename} "
+              f"(first at line {report.malformed_lines[0]}).")
     return students
 
-def save_students(students, filename="studentMarks.txt"):
+def save_students(students, filename="studentMarks.txt", durable=False):
     """Save student records to a CSV file.
 
     Overwrites the file with one student per line in the same format used by
-    `load_students`. This keeps persistence simple and human-readable.
+    `load_students`. This keeps persistence simple and human-readable. The
+    lines are written to a temporary file that then replaces `filename`
+    (see `student_core.ExamRepository.save`), so the whole roster is
+    swapped in at once and a crash never leaves a truncated file. FSYNC_POLICY decides
+    whether the save is synced to the disk; `durable=True` always syncs it
+    (used for the final save on exit). With the SQLite backend only the
+    records edited since the last save are written, in a single transaction.
+
+    The file is written under an exclusive lock. If another session changed
+    it since this one last read or wrote it, their changes are merged into
+    `students` (which is updated in place) and a report is printed; where
+    both sessions changed the same student, this session's version wins.
     """
-    with open(filename, 'w') as file:
-        for student in students:
-            # Write a CSV line for each student (no escaping is implemented)
-            file.write(f"{student['code']},{student['name']},{student['exam_mark']},{student['grade']}\n")
+    merge_report = get_repository(filename).write_edits(students, take_unsaved_edits(), durable)
+    if merge_report is not None:
+        print(f"\n{filename} was changed by another session; the changes were merged:")
+        for line in merge_report.summary_lines():
+            print(line)
+
+def mark_dirty(edits):
+    """Note (op, student) edits made to the in-memory roster but not saved yet.
 
-def calculate_grade(mark):
-    """Return a grade string for a numeric mark using simple cutoffs.
+    `op` is 'A' (add), 'U' (update) or 'D' (delete), as for
+    `student_core.ExamRepository.write_edits`.
+    """
+    global _dirty_since
+    _unsaved_edits.extend(edits)
+    if _dirty_since is None:
+        _dirty_since = time.monotonic()
+
+def take_unsaved_edits():
+    """Return the unsaved edits and start a new batch (the caller saves them)."""
+    global _unsaved_edits, _dirty_since
+    edits, _unsaved_edits = _unsaved_edits, []
+    _dirty_since = None
+    return edits
+
+def autosave(students, force=False):
+    """Save the roster if it has unsaved edits and a save is due.
 
-    This mapping is intentionally simple: >=90 => A+, >=80 => A, etc.
+    A save is due once AUTOSAVE_MAX_EDITS edits are waiting or the oldest
+    one is AUTOSAVE_DELAY seconds old; `force` saves any pending edits
+    straight away. Returns True if the roster was saved.
     """
-    if mark >= 90:
-        return "A+"
-    elif mark >= 80:
-        return "A"
-    elif mark >= 70:
-        return "B"
-    elif mark >= 60:
-        return "C"
-    elif mark >= 50:
-        return "D"
+    if not _unsaved_edits:
+        return False
+    if (force or len(_unsaved_edits) >= AUTOSAVE_MAX_EDITS
+            or time.monotonic() - _dirty_since >= AUTOSAVE_DELAY):
+        save_students(students)
+        return True
+    return False
+
+def import_students(students, filename=None):
+    """Bulk-import students from a CSV/TSV file, then save once.
+
+    Rows are streamed and validated in a single pass (exam mark range and
+    unique codes). Accepted rows are added together and written with one
+    save; a summary with throughput and rejected-row reasons is printed.
+    """
+    if filename is None:
+        filename = input("Enter path of CSV/TSV file to import: ").strip()
+    staging = ExamTable()
+    try:
+        report = import_records(filename, parse_exam_import_row, validate_exam_record,
+                                students, staging)
+    except OSError as e:
+        print(f"Could not read {filename}: {e}")
+        return students
+
+    students.extend(staging)
+    if report.accepted:
+        mark_dirty([('A', student) for student in staging])
+        save_students(students)
+    print(f"\nImport from {filename}:")
+    for line in report.summary_lines():
+        print(line)
+    return students
+
+def student_rows(students):
+    """Yield each student's table line (newline included)."""
+    if isinstance(students, ExamTable):
+        # Read the columns directly rather than building a dict per row
+        rows = zip(students.column('code'), students.column('name'),
+                   students.column('exam_mark'), students.column('grade'))
     else:
-        return "F"
+        rows = ((s['code'], s['name'], s['exam_mark'], s['grade']) for s in students)
+    line = ROW_FORMAT.format
+    for row in rows:
+        yield line(*row)
 
-def display_students(students):
+def display_students(students, stream=None, page=PAGE_LONG_LISTINGS):
     """Pretty-print a list of students to the console.
 
     The table uses fixed-width columns for a consistent look in monospaced
-    terminals.
+    terminals. Rows are joined into chunks of DISPLAY_CHUNK_ROWS and each
+    chunk is written in one call, so output to a terminal, pipe or file
+    costs a few writes whatever the roster size. With `page`, a listing
+    taller than the terminal goes through the pager.
+    `stream` defaults to standard output.
     """
+    if stream is None:
+        stream = sys.stdout
     if not students:
-        print("No student records found.")
+        stream.write("No student records found.\n")
         return
 
-    # Header block
-    print("\nStudent Records:")
-    print("-" * 60)
-    print(f"{'Code':<10} {'Name':<20} {'Exam Mark':<10} {'Grade':<5}")
-    print("-" * 60)
+    to_terminal = hasattr(stream, 'isatty') and stream.isatty()
+    if page and to_terminal and len(students) + 5 > shutil.get_terminal_size().lines:
+        pydoc.pager(f"Student Records:\n{TABLE_RULE}\n{TABLE_TITLE}\n{TABLE_RULE}\n"
+                    + "".join(student_rows(students)) + TABLE_RULE)
+        return
 
-    # Rows: each student's displayed in a formatted line
-    for student in students:
-        print(f"{student['code']:<10} {student['name']:<20} {student['exam_mark']:<10} {student['grade']:<5}")
-    print("-" * 60)
+    stream.write(f"\nStudent Records:\n{TABLE_RULE}\n{TABLE_TITLE}\n{TABLE_RULE}\n")
+    rows = student_rows(students)
+    while True:
+        chunk = "".join(islice(rows, DISPLAY_CHUNK_ROWS))
+        if not chunk:
+            break
+        stream.write(chunk)
+    stream.write(TABLE_RULE + "\n")
+    stream.flush()
 
 def sort_students(students):
-    """Present sorting options and sort the in-memory students list.
+    """Present sorting options and return the students in the chosen order.
 
-    The function prompts the user for a choice and sorts the list in place.
-    It returns the updated list so callers can reassign the variable if desired.
+    The function prompts the user for a choice and reads the records from
+    the table's sorted view for that field, which is maintained as records
+    change. The stored order is left alone, so nothing needs saving. On an
+    invalid choice the records are returned in their stored order.
     """
     if not students:
         print("No student records to sort.")
@@ -156,30 +300,62 @@ def sort_students(students):
     
     # Sorting uses simple keys. If codes are numeric strings, lexicographic
     # order will be used (the code field is treated as text in this script).
-    if choice == '1':
-        students.sort(key=lambda x: x['code'])
-    elif choice == '2':
-        students.sort(key=lambda x: x['code'], reverse=True)
-    elif choice == '3':
-        students.sort(key=lambda x: x['name'])
-    elif choice == '4':
-        students.sort(key=lambda x: x['name'], reverse=True)
-    elif choice == '5':
-        students.sort(key=lambda x: x['exam_mark'])
-    elif choice == '6':
-        students.sort(key=lambda x: x['exam_mark'], reverse=True)
-    else:
+    options = {
+        '1': ('code', False),
+        '2': ('code', True),
+        '3': ('name', False),
+        '4': ('name', True),
+        '5': ('exam_mark', False),
+        '6': ('exam_mark', True)
+    }
+    if choice not in options:
         print("Invalid choice — returning to the main menu.")
         return students
-    
+
+    field, reverse = options[choice]
     print("Students sorted successfully.")
-    return students
+    store = get_store()
+    if store is not None:
+        # The database reads the rows along its index for this field
+        return list(store.sorted_records(field, reverse))
+    return list(students.sorted_records(field, reverse))
+
+def show_ranked_students(students):
+    """Prompt for top or bottom k and display those students by exam mark.
+
+    The k students are picked with a bounded heap (O(N log k)); the stored
+    order of `students` is left alone and nothing is saved.
+    """
+    if not students:
+        print("No student records found.")
+        return
+
+    print("\nRanking Options:")
+    print("1. Top K students (highest exam marks)")
+    print("2. Bottom K students (lowest exam marks)")
+    choice = input("Choose an option (1-2): ")
+    if choice not in ('1', '2'):
+        print("Invalid choice — returning to the main menu.")
+        return
+
+    try:
+        k = int(input("How many students? "))
+        if k < 1:
+            print("Please enter a number greater than zero.")
+            return
+    except ValueError:
+        print("Please enter a valid integer.")
+        return
+
+    indices = top_k_indices(students.column('exam_mark'), k, largest=(choice == '1'))
+    display_students([students[index] for index in indices])
 
 def add_student(students):
     """Interactive routine to prompt for and add a new student.
 
     Performs basic validation (unique code, exam mark bounds) and appends a
-    dictionary representing the student to the `students` list.
+    dictionary representing the student to the `students` list. Returns
+    the edits made (see `mark_dirty`), an empty list if none.
     """
     print("\nAdd New Student")
     print("-" * 20)
@@ -187,21 +363,26 @@ def add_student(students):
     code = input("Enter student code: ").strip()
     name = input("Enter student name: ").strip()
     
-    # Check for duplicate student code to enforce uniqueness
-    for student in students:
-        if student['code'] == code:
-            print("That student code already exists. Please use a unique code.")
-            return students
+    # Fields are saved in comma-separated lines without escaping
+    error = record_text_error(code, "Student code") or record_text_error(name, "Student name")
+    if error:
+        print(f"{error}.")
+        return []
+
+    # Check for duplicate student code to enforce uniqueness (hash lookup)
+    if code in students:
+        print("That student code already exists. Please use a unique code.")
+        return []
     
     # Validate and get exam mark (ensure numeric and within expected range)
     try:
         exam_mark = int(input("Enter exam mark (0-100): "))
         if exam_mark < 0 or exam_mark > 100:
             print("Please enter an exam mark between 0 and 100.")
-            return students
+            return []
     except ValueError:
         print("Please enter a valid integer for the exam mark.")
-        return students
+        return []
     
     # Calculate grade
     grade = calculate_grade(exam_mark)
@@ -216,17 +397,36 @@ def add_student(students):
     students.append(new_student)
     
     print(f"Student '{name}' added successfully.")
-    return students
+    return [('A', new_student)]
+
+def find_students_by_name(students, name, suggestions=5):
+    """Return the students called `name` (ignoring case).
+
+    Names are looked up in the table's search index (see
+    `ExamTable.search_index`) instead of comparing every record. When no
+    one has exactly that name, the closest matches are printed as
+    suggestions and an empty list is returned.
+    """
+    table = students if isinstance(students, ExamTable) else ExamTable(students)
+    index = table.search_index()
+    found = [table.find(code) for code in index.named(name)]
+    if not found and name:
+        close = [table.find(code) for code in index.search(name, suggestions)]
+        if close:
+            print("No exact match. Did you mean: "
+                  + ", ".join(f"{s['name']} ({s['code']})" for s in close) + "?")
+    return found
 
 def delete_student(students):
     """Interactive deletion: search for student(s), ask confirmation, remove.
 
     Supports searching by code or by (case-insensitive) name. If multiple
-    matches are found the user is asked to select the exact record.
+    matches are found the user is asked to select the exact record. Returns
+    the edits made (see `mark_dirty`), an empty list if none.
     """
     if not students:
         print("No student records to delete.")
-        return students
+        return []
     
     print("\nDelete Student")
     print("-" * 20)
@@ -238,17 +438,19 @@ def delete_student(students):
     
     if choice == '1':
         code = input("Enter student code to delete: ").strip()
-        found = [s for s in students if s['code'] == code]
+        # Codes are unique, so the code index gives at most one match
+        student = students.find(code)
+        found = [student] if student is not None else []
     elif choice == '2':
         name = input("Enter student name to delete: ").strip()
-        found = [s for s in students if s['name'].lower() == name.lower()]
+        found = find_students_by_name(students, name)
     else:
         print("Invalid choice.")
-        return students
+        return []
     
     if not found:
         print("No matching student found.")
-        return students
+        return []
     
     if len(found) > 1:
         print("Multiple students found:")
@@ -262,10 +464,10 @@ def delete_student(students):
                 student_to_delete = found[selection]
             else:
                 print("Invalid selection.")
-                return students
+                return []
         except ValueError:
             print("Invalid input.")
-            return students
+            return []
     else:
         student_to_delete = found[0]
     
@@ -276,21 +478,20 @@ def delete_student(students):
     if confirm == 'y':
         students.remove(student_to_delete)
         print("Student deleted successfully.")
-    else:
-        print("Deletion cancelled.")
-    
-    return students
+        return [('D', student_to_delete)]
+    print("Deletion cancelled.")
+    return []
 
 def update_student(students):
     """Interactive update routine for student records.
 
     Finds a target student (by code or name), then offers a small menu to
-    update fields one at a time. Changes are applied in memory and returned
-    to the caller for persistence.
+    update fields one at a time. Changes are applied in memory; returns
+    the edits made (see `mark_dirty`), an empty list if none.
     """
     if not students:
         print("No student records to update.")
-        return students
+        return []
     
     print("\nUpdate Student")
     print("-" * 20)
@@ -302,17 +503,19 @@ def update_student(students):
     
     if choice == '1':
         code = input("Enter student code to update: ").strip()
-        found = [s for s in students if s['code'] == code]
+        # Codes are unique, so the code index gives at most one match
+        student = students.find(code)
+        found = [student] if student is not None else []
     elif choice == '2':
         name = input("Enter student name to update: ").strip()
-        found = [s for s in students if s['name'].lower() == name.lower()]
+        found = find_students_by_name(students, name)
     else:
         print("Invalid choice.")
-        return students
+        return []
     
     if not found:
         print("No matching student found.")
-        return students
+        return []
     
     if len(found) > 1:
         print("Multiple students found:")
@@ -325,14 +528,19 @@ def update_student(students):
                 student_to_update = found[selection]
             else:
                 print("Invalid selection.")
-                return students
+                return []
         except ValueError:
             print("Invalid input.")
-            return students
+            return []
     else:
         student_to_update = found[0]
+
+    # Rows are stored column-wise, so edits are written back by position
+    position = students.index_of(student_to_update['code'])
     
+    original_code = student_to_update['code']
     print(f"\nUpdating student: {student_to_update['code']} - {student_to_update['name']}")
+    changed = False
     
     # Sub-menu for updating specific fields
     while True:
@@ -346,9 +554,14 @@ def update_student(students):
         
         if update_choice == '1':
             new_name = input("Enter new name: ").strip()
-            if new_name:
+            error = record_text_error(new_name, "Name")
+            if error:
+                print(f"{error}.")
+            elif new_name:
                 student_to_update['name'] = new_name
+                students[position] = student_to_update
                 print("Name updated successfully.")
+                changed = True
             else:
                 print("Name cannot be empty.")
 
@@ -358,7 +571,9 @@ def update_student(students):
                 if 0 <= new_mark <= 100:
                     student_to_update['exam_mark'] = new_mark
                     student_to_update['grade'] = calculate_grade(new_mark)
+                    students[position] = student_to_update
                     print("Exam mark and grade updated successfully.")
+                    changed = True
                 else:
                     print("Please enter an exam mark between 0 and 100.")
             except ValueError:
@@ -366,13 +581,19 @@ def update_student(students):
 
         elif update_choice == '3':
             new_code = input("Enter new student code: ").strip()
-            if new_code:
+            error = record_text_error(new_code, "Student code")
+            if error:
+                print(f"{error}.")
+            elif new_code:
                 # Check if new code already exists (excluding current student)
-                if any(s['code'] == new_code and s != student_to_update for s in students):
+                existing = students.index_of(new_code)
+                if existing is not None and existing != position:
                     print("That student code already exists. Please use a different code.")
                 else:
                     student_to_update['code'] = new_code
+                    students[position] = student_to_update
                     print("Student code updated successfully.")
+                    changed = True
             else:
                 print("Student code cannot be empty.")
         
@@ -383,103 +604,486 @@ def update_student(students):
         else:
             print("Invalid choice. Please try again.")
     
-    return students
+    if not changed:
+        return []
+    # A new code is stored as a new record, so the old one is deleted
+    edits = [('U', dict(student_to_update))]
+    if student_to_update['code'] != original_code:
+        edits.insert(0, ('D', {'code': original_code}))
+    return edits
+
+# The menu text is built once, with the colored header when the terminal
+# supports it, and printed with a single write
+MENU_BORDER = "=" * 40
+MENU_TITLE = "        Student Manager System"
+MENU_HEADER = "\n".join(styled_bg(line, ANSI_BLUE_BG)
+                        for line in (MENU_BORDER, MENU_TITLE, MENU_BORDER))
+MENU_TEXT = "\n".join([
+    "",
+    MENU_HEADER,
+    "1. Display all student records",
+    "2. Display students with grade A+ or A",
+    "3. Display students with grade F",
+    "4. Display class statistics",
+    "5. Sort student records",
+    "6. Add a student record",
+    "7. Delete a student record",
+    "8. Update a student record",
+    "9. Display top/bottom K students",
+    "10. Import students from a CSV/TSV file",
+    "11. Display students by grade or grade range",
+    "12. Exit",
+    "-" * 40,
+    ""
+])
 
 def display_menu():
     """Display the main menu"""
-    # Print a colored header when terminal supports it, fallback to plain text
-    if USE_COLOR:
-        # Centered title on blue background
-        title = "        Student Manager System"
-        border = "=" * 40
-        print("\n" + styled_bg(border, ANSI_BLUE_BG))
-        print(styled_bg(title, ANSI_BLUE_BG))
-        print(styled_bg(border, ANSI_BLUE_BG))
-    else:
-        print("\n" + "=" * 40)
-        print("        Student Manager System")
-        print("=" * 40)
-    print("1. Display all student records")
-    print("2. Display students with grade A+ or A")
-    print("3. Display students with grade F")
-    print("4. Display class average and standard deviation")
-    print("5. Sort student records")
-    print("6. Add a student record")
-    print("7. Delete a student record")
-    print("8. Update a student record")
-    print("9. Exit")
-    print("-" * 40)
+    sys.stdout.write(MENU_TEXT)
 
     # Note: If desired, green highlights can be added to specific menu lines
     # using `styled_bg(line, ANSI_GREEN_BG)` where `USE_COLOR` is True.
 
+def students_with_grades(students, grades):
+    """Return the students whose grade is one of `grades`, best grade first.
+
+    Grades are `calculate_grade` of the exam mark. They are read from the
+    table's grade index (see `ExamTable.grade_index`), which is kept up to
+    date as marks change, so a filter never scans the whole roster.
+    """
+    table = students if isinstance(students, ExamTable) else ExamTable(students)
+    return list(table.records_graded('exam_mark', calculate_grade, grades))
+
+def filter_by_grade(students):
+    """Ask for a grade or grade range (e.g. "B", "A-C", "A+, A") and show those students."""
+    text = input(f"Enter a grade or range of grades ({', '.join(GRADES)}), e.g. A-C: ").strip()
+    try:
+        grades = grade_range(text, GRADES)
+    except ValueError as e:
+        print(f"Invalid grade selection: {e}")
+        return
+    selected = students_with_grades(students, grades)
+    print(f"\n{len(selected)} student(s) with grade {', '.join(grades)}:")
+    display_students(selected)
+
 def calculate_statistics(students):
-    """Calculate class average and standard deviation"""
+    """Display class statistics for the exam marks.
+
+    Average and standard deviation, median and quartiles, a few
+    percentiles, the grade distribution and a histogram. They are read from
+    running statistics that the table keeps up to date as students are
+    added, updated and deleted (see `ExamTable.statistics`), so asking
+    again later in the session does not go over the roster again.
+    """
     if not students:
         print("No student records available for statistics.")
         return
     
-    marks = [student['exam_mark'] for student in students]
-    average = sum(marks) / len(marks)
+    table = students if isinstance(students, ExamTable) else ExamTable(students)
+    stats = table.statistics('exam_mark', 100, grade_for=calculate_grade)
+    summary = stats.summary()
     
-    # Calculate standard deviation
-    variance = sum((mark - average) ** 2 for mark in marks) / len(marks)
-    std_dev = variance ** 0.5
-    
-    print(f"\nClass Statistics:")
-    print(f"Average Mark: {average:.2f}")
-    print(f"Standard Deviation: {std_dev:.2f}")
+    print(f"\nClass Statistics ({summary['count']} students):")
+    print(f"Average Mark: {summary['mean']:.2f}")
+    print(f"Standard Deviation: {summary['std']:.2f}")
+    print(f"Lowest / Highest: {summary['minimum']:.0f} / {summary['maximum']:.0f}")
+    print(f"Median: {summary['median']:.1f}  (Q1 {summary['q1']:.1f}, Q3 {summary['q3']:.1f})")
+    print("Percentiles: " + ", ".join(f"P{point} {value:.1f}"
+                                      for point, value in summary['percentiles'].items()))
+
+    print("\nGrade Distribution:")
+    distribution = stats.grade_distribution(grades=GRADES)
+    for grade, count in distribution.items():
+        print(f"  {grade:<3} {count:>6}  ({count / stats.count * 100:.1f}%)")
+
+    print("\nExam Mark Histogram:")
+    for line in histogram_lines(stats.histogram(), width=30, label_format="{:3.0f}-{:3.0f}"):
+        print("  " + line)
 
     # Tip: If you want these statistics highlighted in green on supporting
     # terminals, wrap the printed strings with styled_bg(..., ANSI_GREEN_BG).
 
+# Batch mode: with command-line arguments the program runs subcommands
+# instead of the menu, e.g.
+#     python student-manager-extention.py stats
+#     python student-manager-extention.py sort --by exam --desc --limit 5
+#     python student-manager-extention.py batch commands.txt   (or "-" for stdin)
+# A batch file holds one subcommand per line (blank lines and # comments
+# are skipped). The roster is loaded once, every command runs against it
+# in memory, and it is saved once at the end if anything changed. Each
+# command prints one JSON object on its own line (JSON Lines), with
+# "ok": false and an "error" message if it failed; later commands still
+# run, and the exit status is 1 if any failed.
+
+SORT_FIELDS = {'code': 'code', 'name': 'name', 'exam': 'exam_mark'}
+
+class CommandError(Exception):
+    """A batch command that cannot be carried out."""
+
+class HelpShown(CommandError):
+    """-h/--help was given, so argparse printed help instead of a command."""
+
+class CommandParser(argparse.ArgumentParser):
+    """ArgumentParser that raises CommandError instead of exiting.
+
+    A mistyped line in a batch is then reported like any other failed
+    command rather than ending the run, and so is -h/--help, which would
+    otherwise exit the whole batch before its edits are saved.
+    """
+
+    def error(self, message):
+        raise CommandError(message)
+
+    def exit(self, status=0, message=None):
+        # Only reached after printing help: errors go through `error`
+        raise HelpShown("-h/--help cannot be used on a batch line")
+
+def positive_int(text):
+    """argparse type for counts and limits."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be greater than zero")
+    return value
+
+def build_parser(batch_line=False):
+    """Return the parser for the batch-mode subcommands.
+
+    With `batch_line`, the parser is for a line of a batch file: options
+    that apply to the whole run (--file) and the batch command itself are
+    left out, so giving them there is an error rather than ignored.
+    """
+    parser = CommandParser(
+        prog="student-manager-extention.py",
+        description="Run student record commands without the menu. Output is one "
+                    "JSON object per command.")
+    if not batch_line:
+        parser.add_argument('--file', default="studentMarks.txt",
+                            help="data file to load and save (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('list', help="list students in stored order")
+    command.add_argument('--grade', help="only these grades, e.g. A or A-C")
+    command.add_argument('--limit', type=positive_int, help="list at most this many")
+
+    command = commands.add_parser('get', help="show one student")
+    command.add_argument('code')
+
+    commands.add_parser('stats', help="class statistics")
+
+    command = commands.add_parser('sort', help="list students in sorted order")
+    command.add_argument('--by', choices=sorted(SORT_FIELDS), default='code')
+    command.add_argument('--desc', action='store_true', help="descending order")
+    command.add_argument('--limit', type=positive_int, help="list at most this many")
+
+    command = commands.add_parser('top', help="top (or bottom) k students by exam mark")
+    command.add_argument('-k', type=positive_int, default=10)
+    command.add_argument('--lowest', action='store_true', help="bottom k instead")
+
+    command = commands.add_parser('add', help="add a student")
+    command.add_argument('code')
+    command.add_argument('name')
+    command.add_argument('exam_mark', type=int)
+
+    command = commands.add_parser('update', help="change a student's name or exam mark")
+    command.add_argument('code')
+    command.add_argument('--name')
+    command.add_argument('--exam', type=int, dest='exam_mark')
+
+    command = commands.add_parser('delete', help="delete a student")
+    command.add_argument('code')
+
+    command = commands.add_parser('import', help="import students from a CSV/TSV file")
+    command.add_argument('path')
+
+    command = commands.add_parser('export', help="write the roster to a file")
+    command.add_argument('path')
+    command.add_argument('--format', choices=('csv', 'json'), default='csv')
+
+    if not batch_line:
+        command = commands.add_parser('batch', help="run the commands in a file, one per line")
+        command.add_argument('path', nargs='?', default='-', help='command file ("-" for stdin)')
+    return parser
+
+def require_student(students, code):
+    student = students.find(code)
+    if student is None:
+        raise CommandError(f"no student with code {code}")
+    return student
+
+def command_list(students, args):
+    if args.grade:
+        try:
+            grades = grade_range(args.grade, GRADES)
+        except ValueError as e:
+            raise CommandError(str(e))
+        records = students_with_grades(students, grades)
+    else:
+        records = students
+    return {'students': list(islice(records, args.limit))}
+
+def command_get(students, args):
+    return {'student': require_student(students, args.code)}
+
+def command_stats(students, args):
+    stats = students.statistics('exam_mark', 100, grade_for=calculate_grade)
+    summary = stats.summary()
+    summary['grades'] = stats.grade_distribution(grades=GRADES)
+    summary['histogram'] = [{'low': low, 'high': high, 'count': count}
+                            for low, high, count in stats.histogram()]
+    return summary
+
+def command_sort(students, args):
+    records = students.sorted_records(SORT_FIELDS[args.by], args.desc)
+    return {'students': list(islice(records, args.limit))}
+
+def command_top(students, args):
+    # Read from the maintained sorted view, so each call costs O(k) however
+    # many edits came before it in the batch
+    records = students.sorted_records('exam_mark', reverse=not args.lowest)
+    return {'students': list(islice(records, args.k))}
+
+def checked_student(student):
+    error = validate_exam_record(student)
+    if error:
+        raise CommandError(error)
+    return student
+
+def command_add(students, args):
+    if args.code in students:
+        raise CommandError(f"student code {args.code} already exists")
+    student = checked_student({
+        'code': args.code,
+        'name': args.name.strip(),
+        'exam_mark': args.exam_mark,
+        'grade': calculate_grade(args.exam_mark)
+    })
+    students.append(student)
+    mark_dirty([('A', student)])
+    return {'student': student}
+
+def command_update(students, args):
+    student = dict(require_student(students, args.code))
+    if args.name is not None:
+        student['name'] = args.name.strip()
+    if args.exam_mark is not None:
+        student['exam_mark'] = args.exam_mark
+        student['grade'] = calculate_grade(args.exam_mark)
+    students[students.index_of(args.code)] = checked_student(student)
+    mark_dirty([('U', student)])
+    return {'student': student}
+
+def command_delete(students, args):
+    student = require_student(students, args.code)
+    students.remove(student)
+    mark_dirty([('D', student)])
+    return {'deleted': args.code}
+
+def command_import(students, args):
+    staging = ExamTable()
+    try:
+        report = import_records(args.path, parse_exam_import_row, validate_exam_record,
+                                students, staging)
+    except OSError as e:
+        raise CommandError(f"could not read {args.path}: {e}")
+    students.extend(staging)
+    mark_dirty([('A', student) for student in staging])
+    return {
+        'rows': report.rows,
+        'accepted': report.accepted,
+        'rejected': report.rejected_count,
+        'rejected_rows': [{'line': line, 'reason': reason} for line, reason in report.rejected]
+    }
+
+def command_export(students, args):
+    def write_rows(file):
+        if args.format == 'json':
+            json.dump(list(students), file)
+            file.write("\n")
+            return
+        for student in students:
+            file.write(f"{student['code']},{student['name']},{student['exam_mark']},{student['grade']}\n")
+
+    try:
+        atomic_write(args.path, write_rows, sync=False)
+    except OSError as e:
+        raise CommandError(f"could not write {args.path}: {e}")
+    return {'path': args.path, 'students': len(students)}
+
+COMMANDS = {
+    'list': command_list,
+    'get': command_get,
+    'stats': command_stats,
+    'sort': command_sort,
+    'top': command_top,
+    'add': command_add,
+    'update': command_update,
+    'delete': command_delete,
+    'import': command_import,
+    'export': command_export
+}
+
+def emit(result):
+    """Write one result as a line of JSON."""
+    sys.stdout.write(json.dumps(result) + "\n")
+
+def run_command(students, args):
+    """Run one parsed command and print its result; returns True if it succeeded."""
+    try:
+        result = COMMANDS[args.command](students, args)
+    except CommandError as e:
+        emit({'command': args.command, 'ok': False, 'error': str(e)})
+        return False
+    emit({'command': args.command, 'ok': True, **result})
+    return True
+
+def batch_lines(path):
+    """Yield (line number, arguments) for each command in a batch file."""
+    file = sys.stdin if path == '-' else open(path, 'r')
+    try:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line_number, line
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+def run_batch(argv):
+    """Run the subcommand given in `argv` (batch mode); returns the exit status."""
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except HelpShown:
+        return 0
+    except CommandError as e:
+        parser.print_usage(sys.stderr)
+        print(f"{parser.prog}: error: {e}", file=sys.stderr)
+        return 2
+
+    repository = get_repository(args.file)
+    report = LoadReport()
+    students = repository.load(report)
+    # Warnings go to stderr so stdout stays JSON
+    if report.missing:
+        print(f"Warning: {args.file} not found. Starting with empty student list.",
+              file=sys.stderr)
+    if report.malformed:
+        print(f"Warning: skipped {report.malformed} malformed line(s) in {args.file}.",
+              file=sys.stderr)
+
+    # Edit commands note their changes with mark_dirty, and they are saved once at the end
+    failed = False
+    if args.command == 'batch':
+        line_parser = build_parser(batch_line=True)
+        try:
+            for line_number, line in batch_lines(args.path):
+                try:
+                    arguments = shlex.split(line)
+                    if (arguments and arguments[0].startswith('-')
+                            and arguments[0] not in ('-h', '--help')):
+                        raise CommandError(f"{arguments[0].split('=')[0]} applies to the whole run "
+                                           "and cannot be given on a batch line")
+                    # Help text would corrupt the JSON output; it is reported instead
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        command = line_parser.parse_args(arguments)
+                except (CommandError, ValueError) as e:
+                    emit({'line': line_number, 'ok': False, 'error': str(e)})
+                    failed = True
+                    continue
+                failed |= not run_command(students, command)
+        except OSError as e:
+            emit({'command': 'batch', 'ok': False, 'error': f"could not read {args.path}: {e}"})
+            failed = True
+    else:
+        failed = not run_command(students, args)
+
+    if _unsaved_edits:
+        merge_report = repository.write_edits(students, take_unsaved_edits(), durable=True)
+        result = {'command': 'save', 'ok': True, 'students': len(students)}
+        if merge_report is not None:
+            result['merged'] = merge_report.summary_lines()
+        emit(result)
+    repository.close()
+    return 1 if failed else 0
+
 def main():
     """Main program function"""
     students = load_students()
     
-    while True:
-        display_menu()
-        choice = input("Choose an option (1-9): ")
-        
-        if choice == '1':
-            display_students(students)
-        
-        elif choice == '2':
-            top_students = [s for s in students if s['grade'] in ['A+', 'A']]
-            display_students(top_students)
-        
-        elif choice == '3':
-            failing_students = [s for s in students if s['grade'] == 'F']
-            display_students(failing_students)
-        
-        elif choice == '4':
-            calculate_statistics(students)
-        
-        elif choice == '5':
-            students = sort_students(students)
-            display_students(students)
-        
-        elif choice == '6':
-            students = add_student(students)
-            save_students(students)
-        
-        elif choice == '7':
-            students = delete_student(students)
-            save_students(students)
-        
-        elif choice == '8':
-            students = update_student(students)
-            save_students(students)
-        
-        elif choice == '9':
-            save_students(students)
-            print("Student records saved. Goodbye!")
-            break
-        
+    try:
+        while True:
+            display_menu()
+            choice = input("Choose an option (1-12): ")
+
+            # Database queries must see edits that are still waiting to be saved
+            if choice == '5' and get_store() is not None:
+                autosave(students, force=True)
+            
+            if choice == '1':
+                display_students(students)
+            
+            elif choice == '2':
+                top_students = students_with_grades(students, ["A+", "A"])
+                display_students(top_students)
+            
+            elif choice == '3':
+                failing_students = students_with_grades(students, ["F"])
+                display_students(failing_students)
+            
+            elif choice == '4':
+                calculate_statistics(students)
+            
+            elif choice == '5':
+                # Sorting only changes what is displayed, not the stored order
+                display_students(sort_students(students))
+            
+            # Only edits that went through need saving
+            elif choice == '6':
+                edits = add_student(students)
+                if edits:
+                    mark_dirty(edits)
+            
+            elif choice == '7':
+                edits = delete_student(students)
+                if edits:
+                    mark_dirty(edits)
+            
+            elif choice == '8':
+                edits = update_student(students)
+                if edits:
+                    mark_dirty(edits)
+            
+            elif choice == '9':
+                show_ranked_students(students)
+
+            elif choice == '10':
+                students = import_students(students)
+
+            elif choice == '11':
+                filter_by_grade(students)
+
+            elif choice == '12':
+                save_students(students, durable=True)
+                print("Student records saved. Goodbye!")
+                break
+            
+            else:
+                print("Invalid choice — please try again.")
+
+            # Coalesced save of recent edits, once enough have piled up
+            if autosave(students):
+                print("(Changes saved.)")
+            
+            input("\nPress Enter to continue...")
+    except (KeyboardInterrupt, EOFError):
+        # Leaving without the Exit option must not lose edits waiting for autosave
+        if _unsaved_edits:
+            save_students(students, durable=True)
+            print("\nUnsaved changes were saved. Goodbye!")
         else:
-            print("Invalid choice — please try again.")
-        
-        input("\nPress Enter to continue...")
+            print("\nGoodbye!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        sys.exit(run_batch(sys.argv[1:]))
+    main()
@@ -0,0 +1,112 @@
+"""Tests for the CLI's batch mode (student-manager-extention.py with arguments)."""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      'student-manager-extention.py')
+
+ROSTER = "S1,Ann Lee,82,A\nS2,Bob Ray,45,D\nS3,Cat Day,91,A+\n"
+
+
+class BatchModeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.directory, 'marks.txt')
+        with open(self.data_file, 'w') as file:
+            file.write(ROSTER)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_cli(self, *arguments, commands=None):
+        """Run the script in the temporary folder; returns (status, JSON results, stderr)."""
+        if commands is not None:
+            arguments += ('batch',)
+        completed = subprocess.run(
+            [sys.executable, SCRIPT, '--file', self.data_file, *arguments],
+            input=commands, capture_output=True, text=True, cwd=self.directory, timeout=60)
+        results = [json.loads(line) for line in completed.stdout.splitlines()]
+        return completed.returncode, results, completed.stderr
+
+    def saved_lines(self):
+        with open(self.data_file) as file:
+            return file.read().splitlines()
+
+    def test_single_command(self):
+        status, results, _ = self.run_cli('get', 'S2')
+        self.assertEqual(status, 0)
+        self.assertEqual(results, [{'command': 'get', 'ok': True,
+                                    'student': {'code': 'S2', 'name': 'Bob Ray',
+                                                'exam_mark': 45, 'grade': 'D'}}])
+
+    def test_edits_are_saved_once_at_the_end(self):
+        status, results, _ = self.run_cli(commands="add S4 'Dee Fox' 67\n"
+                                                   "update S2 --exam 55\n"
+                                                   "# a comment\n"
+                                                   "delete S1\n")
+        self.assertEqual(status, 0)
+        self.assertEqual([result['command'] for result in results],
+                         ['add', 'update', 'delete', 'save'])
+        self.assertEqual(self.saved_lines(), ["S2,Bob Ray,55,D", "S3,Cat Day,91,A+",
+                                              "S4,Dee Fox,67,C"])
+
+    def test_failed_line_is_reported_and_the_rest_still_run(self):
+        status, results, _ = self.run_cli(commands="get S9\nadd S4 Dee 67\n")
+        self.assertEqual(status, 1)
+        self.assertEqual(results[0], {'command': 'get', 'ok': False,
+                                      'error': "no student with code S9"})
+        self.assertTrue(results[1]['ok'])
+        self.assertIn("S4,Dee,67,C", self.saved_lines())
+
+    def test_parse_errors_name_the_line(self):
+        status, results, _ = self.run_cli(commands="add S4 Dee\nfrobnicate\nadd S5 'Unclosed\n")
+        self.assertEqual(status, 1)
+        self.assertEqual([(result['line'], result['ok']) for result in results],
+                         [(1, False), (2, False), (3, False)])
+        self.assertEqual(self.saved_lines(), ROSTER.splitlines())
+
+    def test_help_on_a_batch_line_does_not_end_the_batch(self):
+        status, results, _ = self.run_cli(commands="add S4 Dee 67\n--help\nadd -h\n"
+                                                   "add S5 Eve 12\n")
+        self.assertEqual(status, 1)
+        self.assertEqual([result['ok'] for result in results], [True, False, False, True, True])
+        self.assertIn('-h/--help', results[1]['error'])
+        self.assertEqual(self.saved_lines()[-2:], ["S4,Dee,67,C", "S5,Eve,12,F"])
+
+    def test_global_options_are_rejected_on_batch_lines(self):
+        status, results, _ = self.run_cli(commands="--file other.txt add S4 Dee 67\n")
+        self.assertEqual(status, 1)
+        self.assertEqual(results, [{'line': 1, 'ok': False,
+                                    'error': "--file applies to the whole run and cannot "
+                                             "be given on a batch line"}])
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'other.txt')))
+        self.assertEqual(self.saved_lines(), ROSTER.splitlines())
+
+    def test_commas_and_control_characters_are_rejected(self):
+        status, results, _ = self.run_cli(commands="add 12 'A,B' 50\nadd 'S,9' Dee 50\n"
+                                                   "update S1 --name 'Ann\tLee'\n")
+        self.assertEqual(status, 1)
+        self.assertEqual([result['ok'] for result in results], [False, False, False])
+        self.assertEqual(self.saved_lines(), ROSTER.splitlines())
+
+    def test_usage_errors_exit_with_status_2(self):
+        status, results, stderr = self.run_cli('get')
+        self.assertEqual((status, results), (2, []))
+        self.assertIn('usage:', stderr)
+
+    def test_top_level_help_exits_with_status_0(self):
+        completed = subprocess.run([sys.executable, SCRIPT, '--help'], capture_output=True,
+                                   text=True, cwd=self.directory, timeout=60)
+        self.assertEqual(completed.returncode, 0)
+        self.assertIn('usage:', completed.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()